@@ -1,17 +1,63 @@
+import hashlib
 import requests
 import logging
-import time
-import random
+import os
 import re
-
-from urllib.parse import urljoin
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from django import db
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from typing import NamedTuple, Optional
+from sponsoredissues.github_rate_limit import github_rate_limit_acquire, github_rate_limit_update
+from urllib.parse import parse_qs, urlencode, urljoin, urlparse, urlunparse
 
 logger = logging.getLogger(__name__)
 
-def random_sleep_for_rate_limiting():
-    seconds = random.uniform(2, 10)
-    logger.info(f"Sleeping {seconds:.1f}s (for rate limiting)...")
-    time.sleep(seconds)
+# Per-process HTTP session shared by all GitHub requests. See
+# `github_session()` below.
+_github_session = None
+_github_session_pid = None
+_github_session_lock = threading.Lock()
+
+def github_session():
+    """
+    Return the shared `requests.Session` that is used for all HTTP
+    traffic to GitHub (REST API, GraphQL API, and github.com itself).
+
+    Reusing a single session means that connections are pooled and
+    kept alive between requests, so we only pay for the TCP/TLS
+    handshake with api.github.com once per connection rather than
+    once per request. The size of the connection pool is set by
+    `settings.GITHUB_HTTP_POOL_SIZE`.
+
+    The session is created lazily, and is re-created if the current
+    process ID changes. This matters for Celery's prefork worker pool:
+    the child processes are forked from the parent after modules are
+    imported, and they must not share open sockets with the parent
+    (or with each other).
+    """
+    global _github_session, _github_session_pid
+
+    pid = os.getpid()
+    if _github_session is not None and _github_session_pid == pid:
+        return _github_session
+
+    with _github_session_lock:
+        if _github_session is None or _github_session_pid != pid:
+            pool_size = settings.GITHUB_HTTP_POOL_SIZE
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = 'sponsoredissues.org'
+            _github_session = session
+            _github_session_pid = pid
+            logger.debug(f'created GitHub HTTP session (pid: {pid}, pool size: {pool_size})')
+
+    return _github_session
 
 def _parse_link_header(link_header):
     """
@@ -36,7 +82,173 @@ def _parse_link_header(link_header):
 
     return links
 
-def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, per_page=100, rate_limit=True):
+# Keys that hold the list of items in paginated REST API responses
+# that are dicts rather than lists (e.g. `/installation/repositories`
+# returns `{"total_count": ..., "repositories": [...]}`).
+_GITHUB_PAGINATION_KEYS = ['repositories', 'items', 'issues', 'pulls', 'users']
+
+def _github_page_number(url):
+    """
+    Return the value of the `page` query parameter in `url`, or None
+    if there is no `page` parameter.
+    """
+    values = parse_qs(urlparse(url).query).get('page')
+    if not values:
+        return None
+    try:
+        return int(values[0])
+    except ValueError:
+        return None
+
+def _github_page_url(url, page):
+    """
+    Return `url` with its `page` query parameter set to `page`.
+    """
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    query['page'] = [str(page)]
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+def _github_page_urls(next_url, last_url):
+    """
+    Given the `next` and `last` pagination links from the first page
+    of a paginated REST API response, return the URLs of all
+    remaining pages (in order), or None if the URLs can't be worked
+    out in advance.
+
+    GitHub only includes a `last` link for endpoints with numbered
+    pages (`?page=N`). Endpoints with cursor-based pagination only
+    have a `next` link, and must be fetched one page at a time.
+    """
+    if not next_url or not last_url:
+        return None
+    next_page = _github_page_number(next_url)
+    last_page = _github_page_number(last_url)
+    if next_page is None or last_page is None or last_page < next_page:
+        return None
+    return [_github_page_url(next_url, page) for page in range(next_page, last_page + 1)]
+
+def github_parallel_map(func, items, max_workers=None):
+    """
+    Call `func` on each of `items` using a bounded pool of threads,
+    and return the results in the same order as `items`.
+
+    This is intended for running independent GitHub API requests
+    concurrently. The requests still wait for the shared GitHub rate
+    limit budget (see `github_rate_limit.py`), so the size of the
+    thread pool only bounds how many requests are in flight at once.
+
+    If any call raises an exception, the first exception (in the
+    order of `items`) is re-raised after all calls have finished.
+
+    Args:
+        func: Function to call with each item
+        items: Iterable of items
+        max_workers: Size of the thread pool [settings.GITHUB_API_MAX_WORKERS]
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = settings.GITHUB_API_MAX_WORKERS
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(lambda item: _github_thread_call(func, item), items))
+
+def _github_thread_call(func, item):
+    """
+    Call `func(item)` in a worker thread of a thread pool.
+    """
+    try:
+        return func(item)
+    finally:
+        # Django opens a separate database connection for each
+        # thread (e.g. when using the database cache backend),
+        # which would otherwise be leaked when the thread exits.
+        db.connections.close_all()
+
+def _github_etag_cache_key(url, access_token, cache_identity):
+    """
+    Return the cache key for the conditional request cache entry of
+    `url`, as seen by `access_token`.
+
+    Responses are cached separately for each token identity, because
+    GitHub may return different data for the same URL depending on
+    who is asking (e.g. private repos). By default the identity is a
+    hash of `access_token`, but callers can pass an explicit
+    `cache_identity` for tokens that change frequently while
+    representing the same identity (e.g. the GitHub App JWT, or app
+    installation tokens, see `github_app_installation_cache_identity`).
+    """
+    if cache_identity is None:
+        cache_identity = hashlib.sha256((access_token or '').encode()).hexdigest()
+    url_hash = hashlib.sha256(f'{cache_identity}:{url}'.encode()).hexdigest()
+    return f'github:etag:{url_hash}'
+
+def _github_api_get(url, headers, access_token=None, rate_limit=True, conditional=True, cache_identity=None):
+    """
+    Fetch a single page from the GitHub REST API.
+
+    If `conditional` is True, we remember the `ETag` and
+    `Last-Modified` headers of each response, along with the response
+    body, and send them back as `If-None-Match` / `If-Modified-Since`
+    on the next request for the same URL. If the data hasn't changed,
+    GitHub responds with HTTP 304 and an empty body, and we return
+    the cached body instead. HTTP 304 responses don't count against
+    the GitHub rate limit [1].
+
+    The cache uses Django's default cache backend, so that cached
+    responses survive process restarts.
+
+    [1]: https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api#use-conditional-requests-if-appropriate
+
+    Returns: Tuple of (data, links)
+        - data: Response JSON data
+        - links: Pagination links from the `Link` header, as returned
+                 by `_parse_link_header`
+    """
+    cache_key = None
+    cached = None
+    if conditional:
+        cache_key = _github_etag_cache_key(url, access_token, cache_identity)
+        cached = cache.get(cache_key)
+        if cached:
+            headers = dict(headers)
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+    if rate_limit:
+        github_rate_limit_acquire(access_token, 'core')
+    response = github_session().get(
+        url,
+        headers=headers,
+        timeout=10 # seconds
+    )
+    github_rate_limit_update(access_token, 'core', response)
+
+    if response.status_code == 304 and cached:
+        logger.debug(f'Not modified (HTTP 304), using cached response: {url}')
+        return cached['data'], _parse_link_header(cached.get('link'))
+
+    response.raise_for_status()
+    data = response.json()
+
+    if cache_key:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            cache.set(cache_key, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'link': response.headers.get('Link'),
+                'data': data,
+            }, timeout=settings.GITHUB_ETAG_CACHE_TTL)
+
+    return data, _parse_link_header(response.headers.get('Link'))
+
+def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=None, per_page=100, rate_limit=True, conditional=True, cache_identity=None):
     """
     Make REST API call to GitHub with automatic pagination support.
 
@@ -44,17 +256,22 @@ def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, pe
         endpoint: API endpoint path (e.g. "/users/octocat")
         access_token (optional): GitHub user/app access token
         auto_paginate (bool): If True, automatically fetch all pages. Default: True
-        max_pages (int): Maximum number of pages to fetch. Default: 10
+        max_pages (int): Maximum number of pages to fetch, or None to
+                fetch all pages. Default: None
         per_page (int): Items per page (max 100). Default: 100
+        rate_limit (bool): If True, wait for the shared GitHub rate limit
+                budget before each request. Default: True
+        conditional (bool): If True, revalidate cached responses with
+                conditional requests (`If-None-Match`), instead of
+                re-fetching unchanged data. Default: True
+        cache_identity (optional): Identity used to key cached responses.
+                Defaults to a hash of `access_token`.
 
     Returns: Tuple of (status_code, data)
         - status_code: HTTP status code from first request
         - data: Response JSON data. If auto_paginate=True and response is a list or
                 dict with 'repositories', 'items', etc., all pages are merged.
     """
-    if rate_limit:
-        random_sleep_for_rate_limiting()
-
     headers = {
         'Accept': 'application/vnd.github.v3+json',
         'User-Agent': 'sponsoredissues.org'
@@ -69,36 +286,29 @@ def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, pe
     elif auto_paginate:
         endpoint = f"{endpoint}?per_page={per_page}"
 
-    try:
-        url = urljoin("https://api.github.com", endpoint)
-        response = requests.get(
+    def get(url):
+        return _github_api_get(
             url,
-            headers=headers,
-            timeout=10 # seconds
+            headers,
+            access_token=access_token,
+            rate_limit=rate_limit,
+            conditional=conditional,
+            cache_identity=cache_identity,
         )
-        response.raise_for_status()
-
-        # Log GitHub API rate limit info
-        remaining = response.headers.get('X-RateLimit-Remaining')
-        reset_time = response.headers.get('X-RateLimit-Reset')
-        if remaining:
-            logger.debug(f"GitHub API rate limit: {remaining} remaining (resets at {reset_time})")
 
-        # Parse initial response
-        data = response.json()
+    try:
+        url = urljoin("https://api.github.com", endpoint)
+        data, links = get(url)
 
         # If not auto-paginating or request failed, return as-is
         if not auto_paginate:
             return data
 
         # Check if response is paginated (has Link header with 'next')
-        link_header = response.headers.get('Link')
-        if not link_header:
+        if not links:
             # No pagination, return as-is
             return data
 
-        links = _parse_link_header(link_header)
-
         # Determine if we need to merge results
         # GitHub typically returns lists or dicts with a key containing items
         if isinstance(data, list):
@@ -107,7 +317,7 @@ def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, pe
         elif isinstance(data, dict):
             # Check for common pagination keys
             pagination_key = None
-            for key in ['repositories', 'items', 'issues', 'pulls', 'users']:
+            for key in _GITHUB_PAGINATION_KEYS:
                 if key in data and isinstance(data[key], list):
                     pagination_key = key
                     break
@@ -122,50 +332,42 @@ def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, pe
             # Not a format we can paginate
             return data
 
+        def page_items(page_data):
+            return page_data if is_list_response else page_data[pagination_key]
+
         # Fetch additional pages
         page_count = 1
         next_url = links.get('next')
+        page_urls = _github_page_urls(next_url, links.get('last'))
+        truncated = False
+
+        if page_urls is not None:
+            # The `last` link tells us how many pages there are, so we
+            # can fetch the remaining pages concurrently.
+            if max_pages is not None and len(page_urls) >= max_pages:
+                page_urls = page_urls[:max_pages - 1]
+                truncated = True
+
+            logger.debug(f"Fetching {len(page_urls)} more page(s) in parallel")
+            for page_data, _ in github_parallel_map(get, page_urls):
+                all_items.extend(page_items(page_data))
+                page_count += 1
+        else:
+            # No `last` link (e.g. cursor-based pagination), so we
+            # have to follow the `next` links one page at a time.
+            while next_url and (max_pages is None or page_count < max_pages):
+                logger.debug(f"Fetching page {page_count + 1}")
 
-        while next_url and page_count < max_pages:
-            # Rate limiting delay
-            random_sleep_for_rate_limiting()
-            logger.debug(f"Fetching page {page_count + 1}")
-
-            response = requests.get(
-                next_url,
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-
-            # Log rate limit info
-            remaining = response.headers.get('X-RateLimit-Remaining')
-            if remaining:
-                logger.debug(f"GitHub API rate limit: {remaining} remaining")
-
-            if response.status_code != 200:
-                logger.warning(f"Pagination failed on page {page_count + 1}: status {response.status_code}")
-                break
-
-            page_data = response.json()
-
-            # Merge results
-            if is_list_response:
-                all_items.extend(page_data)
-            else:
-                all_items.extend(page_data[pagination_key])
-
-            page_count += 1
+                page_data, links = get(next_url)
+                all_items.extend(page_items(page_data))
+                page_count += 1
 
-            # Check for next page
-            link_header = response.headers.get('Link')
-            if link_header:
-                links = _parse_link_header(link_header)
+                # Check for next page
                 next_url = links.get('next')
-            else:
-                next_url = None
 
-        if page_count >= max_pages and next_url:
+            truncated = bool(next_url)
+
+        if truncated:
             logger.warning(f"Reached max_pages limit ({max_pages}). More pages available but not fetched.")
 
         logger.info(f"Fetched {page_count} page(s), total items: {len(all_items)}")
@@ -181,6 +383,161 @@ def github_api(endpoint, access_token=None, auto_paginate=True, max_pages=10, pe
     except requests.exceptions.RequestException as e:
         raise RuntimeError(f"GitHub API request failed") from e
 
+class GitHubPage(NamedTuple):
+    """
+    A single page of results from a paginated REST API endpoint, as
+    yielded by `github_api_pages()`.
+
+    Attributes:
+        items: The list of items on this page
+        next_url: URL of the next page, or None if this is the last
+                  page. Pass this as `start_url` to `github_api_pages()`
+                  to resume fetching from the next page.
+    """
+    items: list
+    next_url: Optional[str]
+
+def github_api_pages(endpoint, access_token=None, per_page=100, start_url=None, rate_limit=True, conditional=True, cache_identity=None, max_workers=None):
+    """
+    Generator that fetches a paginated REST API endpoint page by page,
+    and yields each page (in order) as soon as it arrives.
+
+    Unlike `github_api()`, this only holds a bounded number of pages
+    in memory, and lets the caller start processing results before
+    the last page has been fetched.
+
+    If the first page has a `last` link (i.e. the endpoint uses
+    numbered pages), the following pages are prefetched concurrently,
+    keeping up to `max_workers` requests in flight ahead of the
+    caller (see `github_parallel_map()`). Otherwise the `next` links
+    are followed one page at a time.
+
+    Pagination can be resumed (e.g. after an error, or in a later
+    task) by passing the `next_url` of the last page that was
+    processed as `start_url`.
+
+    Args:
+        endpoint: API endpoint path (e.g. "/app/installations")
+        access_token (optional): GitHub user/app access token
+        per_page (int): Items per page (max 100). Default: 100
+        start_url (optional): Full URL of the page to start from, as
+                returned in `GitHubPage.next_url`. If set, `endpoint`
+                and `per_page` are ignored.
+        rate_limit (bool): See `github_api()`. Default: True
+        conditional (bool): See `github_api()`. Default: True
+        cache_identity (optional): See `github_api()`.
+        max_workers (int): Maximum number of pages to prefetch
+                concurrently [settings.GITHUB_API_MAX_WORKERS]
+
+    Yields: `GitHubPage` tuples of (items, next_url)
+    """
+    headers = {
+        'Accept': 'application/vnd.github.v3+json',
+        'User-Agent': 'sponsoredissues.org'
+    }
+
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+
+    if start_url:
+        url = start_url
+    else:
+        separator = '&' if '?' in endpoint else '?'
+        url = urljoin("https://api.github.com", f"{endpoint}{separator}per_page={per_page}")
+
+    if max_workers is None:
+        max_workers = settings.GITHUB_API_MAX_WORKERS
+
+    def get(url):
+        try:
+            return _github_api_get(
+                url,
+                headers,
+                access_token=access_token,
+                rate_limit=rate_limit,
+                conditional=conditional,
+                cache_identity=cache_identity,
+            )
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"GitHub API request failed") from e
+
+    def page(url, data, links):
+        if isinstance(data, dict):
+            items = next((data[key] for key in _GITHUB_PAGINATION_KEYS if isinstance(data.get(key), list)), None)
+        else:
+            items = data
+        if not isinstance(items, list):
+            raise RuntimeError(f"GitHub API response is not a paginated list: {url}")
+        return GitHubPage(items, links.get('next'))
+
+    data, links = get(url)
+    yield page(url, data, links)
+
+    page_urls = _github_page_urls(links.get('next'), links.get('last'))
+    if page_urls is None or max_workers <= 1:
+        # No `last` link (e.g. cursor-based pagination), so we have
+        # to follow the `next` links one page at a time.
+        url = links.get('next')
+        while url:
+            data, links = get(url)
+            yield page(url, data, links)
+            url = links.get('next')
+        return
+
+    # The `last` link tells us the URLs of the remaining pages, so we
+    # can prefetch them concurrently. We keep at most `max_workers`
+    # pages in flight, so that a caller that stops early (or consumes
+    # pages slowly) doesn't make us fetch and buffer all of them.
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(page_urls)))
+    try:
+        remaining_urls = iter(page_urls)
+        in_flight = deque()
+
+        def prefetch():
+            url = next(remaining_urls, None)
+            if url:
+                in_flight.append((url, executor.submit(_github_thread_call, get, url)))
+
+        for _ in range(max_workers):
+            prefetch()
+        while in_flight:
+            url, future = in_flight.popleft()
+            data, links = future.result()
+            prefetch()
+            yield page(url, data, links)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def github_api_items(endpoint, access_token=None, **kwargs):
+    """
+    Generator that yields the individual items from a paginated REST
+    API endpoint, fetching one page at a time.
+
+    Takes the same arguments as `github_api_pages()`.
+    """
+    for page in github_api_pages(endpoint, access_token=access_token, **kwargs):
+        yield from page.items
+
+class GitHubGraphQLError(RuntimeError):
+    """
+    Raised by `github_graphql` when the response contains GraphQL
+    errors.
+
+    GitHub may return partial results alongside the errors, e.g. when
+    one of several aliased fields in a query refers to an issue that
+    doesn't exist [1]. The fields that failed are `null` in `data`.
+
+    Attributes:
+        errors: The `errors` list from the response
+        data: The (partial) `data` from the response, or None
+
+    [1]: https://docs.github.com/en/graphql/guides/forming-calls-with-graphql
+    """
+    def __init__(self, message, errors, data):
+        super().__init__(message)
+        self.errors = errors
+        self.data = data
+
 def github_graphql(query, access_token, variables=None, timeout=30, rate_limit=True):
     """
     Send a query to the GitHub GraphQL API.
@@ -190,13 +547,14 @@ def github_graphql(query, access_token, variables=None, timeout=30, rate_limit=T
         access_token:  GitHub user/app access token [required]
         variables: Dictionary of GraphQL variable values [None]
         timeout: Request timeout in seconds [30]
+        rate_limit: Wait for the shared GitHub rate limit budget [True]
 
     Returns:
         data: The value of the `data` key in the response JSON
-    """
-    if rate_limit:
-        random_sleep_for_rate_limiting()
 
+    Raises `GitHubGraphQLError` if the response contains GraphQL
+    errors.
+    """
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
@@ -207,20 +565,24 @@ def github_graphql(query, access_token, variables=None, timeout=30, rate_limit=T
         'variables': variables
     }
 
-    response = requests.post(
+    if rate_limit:
+        github_rate_limit_acquire(access_token, 'graphql')
+
+    response = github_session().post(
         'https://api.github.com/graphql',
         json=payload,
         headers=headers,
         timeout=timeout,
     )
 
+    github_rate_limit_update(access_token, 'graphql', response)
     response.raise_for_status()
 
     response_json = response.json()
 
     graphql_errors = response_json.get('errors')
     if graphql_errors:
-        raise RuntimeError(f'GraphQL errors: {graphql_errors}')
+        raise GitHubGraphQLError(f'GraphQL errors: {graphql_errors}', graphql_errors, response_json.get('data'))
 
     return response_json.get('data')
 
@@ -1,37 +1,105 @@
 import requests
 import jwt
 import logging
-from datetime import datetime, timedelta
+import redis
+import threading
+import time
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from datetime import datetime, timezone
 from django.conf import settings
-from sponsoredissues.github_api import github_api, github_graphql
+from sponsoredissues.github_api import GitHubGraphQLError, github_api_items, github_graphql, github_parallel_map, github_session
 from typing import Any, Optional, Dict, List
 
 logger = logging.getLogger(__name__)
 
-def github_app_token():
-    """Generate GitHub App JWT token"""
+# Refresh cached installation access tokens this many seconds before
+# they expire (see `github_app_installation_query_token`).
+INSTALLATION_TOKEN_REFRESH_MARGIN = 60 * 5
+
+# Lifetime of GitHub App JWTs, in seconds. (GitHub allows at most
+# 10 minutes.)
+APP_TOKEN_LIFETIME = 60 * 5
+
+# Replace the cached GitHub App JWT this many seconds before it
+# expires (see `github_app_token`).
+APP_TOKEN_REFRESH_MARGIN = 60
+
+redis_client = redis.Redis.from_url(url=settings.REDIS_URL, decode_responses=True)
+
+# Per-process caches for `github_app_token`.
+_app_private_key = None
+_app_token = None
+_app_token_expires_at = 0
+_app_token_lock = threading.Lock()
+
+def _github_app_private_key():
+    """
+    Return the parsed GitHub App private key.
+
+    Parsing the PEM key is relatively expensive, so we only do it
+    once per process.
+    """
+    global _app_private_key
 
-    app_id = settings.GITHUB_APP_ID
-    private_key = settings.GITHUB_APP_PRIVATE_KEY
+    if _app_private_key is None:
+        private_key = settings.GITHUB_APP_PRIVATE_KEY
 
-    if not app_id or not private_key:
-        raise RuntimeError("Failed to generate GitHub App token: GITHUB_APP_ID or GITHUB_APP_PRIVATE_KEY not set")
+        if not settings.GITHUB_APP_ID or not private_key:
+            raise RuntimeError("Failed to generate GitHub App token: GITHUB_APP_ID or GITHUB_APP_PRIVATE_KEY not set")
 
-    # Handle both single-line (with \\n) and multiline PEM formats
-    if '\\n' in private_key:
-        private_key = private_key.replace('\\n', '\n')
+        # Handle both single-line (with \\n) and multiline PEM formats
+        if '\\n' in private_key:
+            private_key = private_key.replace('\\n', '\n')
 
+        try:
+            _app_private_key = load_pem_private_key(private_key.encode(), password=None)
+        except Exception as e:
+            raise RuntimeError("Failed to generate GitHub App token: Check format of GITHUB_APP_PRIVATE_KEY") from e
+
+    return _app_private_key
+
+def _github_app_create_token(now):
+    """
+    Sign a new GitHub App JWT that is valid from `now`.
+
+    Returns: Tuple of (token, expires_at)
+        - token: The JWT
+        - expires_at: Expiry time of the token, as a Unix timestamp
+    """
+    # Backdate the issue time to allow for clock drift between us
+    # and GitHub, as recommended by the GitHub docs [1].
+    #
+    # [1]: https://docs.github.com/en/apps/creating-github-apps/authenticating-with-a-github-app/generating-a-json-web-token-jwt-for-a-github-app
+    private_key = _github_app_private_key()
+    expires_at = now + APP_TOKEN_LIFETIME
     payload = {
-        'iat': int(datetime.utcnow().timestamp()),
-        'exp': int((datetime.utcnow() + timedelta(minutes=5)).timestamp()),
-        'iss': app_id
+        'iat': now - 60,
+        'exp': expires_at,
+        'iss': str(settings.GITHUB_APP_ID)
     }
 
     try:
-        return jwt.encode(payload, private_key.encode(), algorithm='RS256')
+        return (jwt.encode(payload, private_key, algorithm='RS256'), expires_at)
     except Exception as e:
         raise RuntimeError("Failed to generate GitHub App token: Check format of GITHUB_APP_PRIVATE_KEY") from e
 
+def github_app_token():
+    """
+    Return a GitHub App JWT token.
+
+    Signing a JWT with RS256 is relatively expensive, and we need an
+    app token for several requests per installation sync, so we reuse
+    the same token (per process) until `APP_TOKEN_REFRESH_MARGIN`
+    seconds before it expires.
+    """
+    global _app_token, _app_token_expires_at
+
+    with _app_token_lock:
+        now = int(time.time())
+        if _app_token is None or now >= _app_token_expires_at - APP_TOKEN_REFRESH_MARGIN:
+            _app_token, _app_token_expires_at = _github_app_create_token(now)
+        return _app_token
+
 def github_app_request_headers(**kwargs):
     app_token = github_app_token()
     return {
@@ -45,7 +113,7 @@ def github_app_query_installation_for_github_account(github_account_name):
     # TODO: Handle case where `github_account_name` is an orgname
     # rather than a username. (We need to do a separate query for
     # that.)
-    response = requests.get(
+    response = github_session().get(
         f'https://api.github.com/users/{github_account_name}/installation',
         headers=github_app_request_headers(username=github_account_name),
         timeout=30
@@ -57,7 +125,7 @@ def github_app_query_installation_for_github_account(github_account_name):
 def github_app_query_installations(target_installation_id: Optional[int] = None):
     """Get all GitHub App installations"""
     try:
-        response = requests.get(
+        response = github_session().get(
             'https://api.github.com/app/installations',
             headers=github_app_request_headers(),
             timeout=30
@@ -75,14 +143,96 @@ def github_app_query_installations(target_installation_id: Optional[int] = None)
         logger.error(f'Failed to get GitHub App installations: {e}')
         return []
 
-def github_app_installation_query_token(installation_id: int):
-    response = requests.post(
+def _github_app_installation_create_token(installation_id: int):
+    """
+    Create a new access token for an app installation.
+
+    Returns: Tuple of (token, expires_at)
+        - token: The installation access token
+        - expires_at: Expiry time of the token, as a datetime
+    """
+    response = github_session().post(
         f'https://api.github.com/app/installations/{installation_id}/access_tokens',
         headers=github_app_request_headers(),
         timeout=30
     )
     response.raise_for_status()
-    return response.json()['token']
+    token_json = response.json()
+    return (token_json['token'], datetime.fromisoformat(token_json['expires_at']))
+
+def github_app_installation_cache_identity(installation_id: int):
+    """
+    Return the `cache_identity` (see `github_api()`) for conditional
+    requests made with the access token of an app installation.
+
+    Installation access tokens are replaced every hour (see
+    `github_app_installation_query_token`), so keying the cached
+    responses by the token itself would throw them away on every
+    refresh.
+    """
+    return f'installation:{installation_id}'
+
+def _github_app_installation_token_key(installation_id: int):
+    return f'github:installation_token:{installation_id}'
+
+def github_app_installation_query_token(installation_id: int):
+    """
+    Return an access token for an app installation.
+
+    Installation access tokens are valid for one hour [1], so we cache
+    them in Redis (shared by all processes) rather than creating a
+    new token for every sync. Cached tokens are refreshed
+    `INSTALLATION_TOKEN_REFRESH_MARGIN` seconds before they expire,
+    so that a token never expires in the middle of a sync.
+
+    When the cached token is missing or due for refresh, only one
+    process creates a new token ("single-flight"), while any other
+    processes that need a token for the same installation wait for
+    it, rather than each creating their own.
+
+    If Redis is unavailable, we fall back to creating a new token
+    on every call.
+
+    [1]: https://docs.github.com/en/apps/creating-github-apps/authenticating-with-a-github-app/generating-an-installation-access-token-for-a-github-app
+    """
+    key = _github_app_installation_token_key(installation_id)
+
+    try:
+        token = redis_client.get(key)
+        if token:
+            return token
+
+        with redis_client.lock(f'lock:{key}', timeout=30, blocking_timeout=30):
+            # Another process may have created a token while we were
+            # waiting for the lock.
+            token = redis_client.get(key)
+            if token:
+                return token
+
+            token, expires_at = _github_app_installation_create_token(installation_id)
+            seconds = int((expires_at - datetime.now(timezone.utc)).total_seconds()) - INSTALLATION_TOKEN_REFRESH_MARGIN
+            if seconds > 0:
+                redis_client.set(key, token, ex=seconds)
+            logger.debug(f'created access token for installation {installation_id} (cached for {seconds}s)')
+            return token
+
+    except redis.RedisError as e:
+        logger.warning(f'installation token cache unavailable, creating uncached token: {e}')
+        token, _ = _github_app_installation_create_token(installation_id)
+        return token
+
+def github_app_installation_forget_token(installation_id: int):
+    """
+    Remove the cached access token for an app installation (if any).
+
+    GitHub revokes installation access tokens when the app is
+    uninstalled or suspended, so we must not reuse a cached token
+    if the maintainer later reinstalls/unsuspends the app.
+    """
+    try:
+        redis_client.delete(_github_app_installation_token_key(installation_id))
+    except redis.RedisError as e:
+        logger.warning(f'failed to remove cached token for installation {installation_id}: {e}')
 
 def github_app_query_installation_token_any():
     """
@@ -105,7 +255,7 @@ def github_app_query_installation_token_any():
     return access_token
 
 def github_app_installation_query_json(installation_id):
-    response = requests.get(
+    response = github_session().get(
         f'https://api.github.com/app/installations/{installation_id}',
         headers=github_app_request_headers(),
         timeout=30
@@ -113,10 +263,166 @@ def github_app_installation_query_json(installation_id):
     response.raise_for_status()
     return response.json()
 
-def github_app_installation_query_issues_with_sponsoredissues_label(installation_token, github_username):
-    """Query user's public repositories and issues with sponsoredissues.org label"""
+def _github_datetime(value):
+    """
+    Format a datetime (or `None`) as a UTC ISO 8601 timestamp, for use
+    in GitHub queries.
+    """
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _github_issue_graphql_to_rest(issue):
+    """
+    Convert the GraphQL data for an issue to the format of the REST API,
+    which is what we store in `GitHubIssue.data`.
+    """
+    return {
+        'number': issue['number'],
+        'title': issue['title'],
+        'body': issue['body'],
+        'state': issue['state'].lower(),
+        'repository': {
+            'html_url': issue['repository']['homepageUrl'],
+            'url': issue['repository']['url'],
+        },
+        'html_url': issue['url'],
+        'created_at': issue['createdAt'],
+        'updated_at': issue['updatedAt'],
+        'labels': [
+            {
+                'name': label['name'],
+                'color': label['color']
+            }
+            for label in issue.get('labels', {}).get('nodes', [])
+        ],
+        'user': {
+            'login': (issue.get('author') or {}).get('login', '')
+        }
+    }
+
+# GitHub search only returns the first 1000 results for a query [1].
+#
+# [1]: https://docs.github.com/en/rest/search/search#about-search
+GITHUB_SEARCH_MAX_RESULTS = 1000
+
+class _GitHubSearchTooManyResults(Exception):
+    pass
+
+def _github_app_installation_query_labeled_issues_by_search(installation_token, github_username, since=None):
+    """
+    Find issues with the sponsoredissues.org label with GitHub issue
+    search.
+
+    Raises `_GitHubSearchTooManyResults` if there are more matching
+    issues than GitHub search can return.
+    """
     query = """
-    query($username: String!, $issueFirst: Int!, $cursor: String) {
+    query($searchQuery: String!, $cursor: String) {
+        search(type: ISSUE, query: $searchQuery, first: 100, after: $cursor) {
+            issueCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                ... on Issue {
+                    number
+                    title
+                    body
+                    repository {
+                        homepageUrl
+                        url
+                    }
+                    state
+                    url
+                    createdAt
+                    updatedAt
+                    labels(first: 20) {
+                        nodes {
+                            name
+                            color
+                        }
+                    }
+                    author {
+                        login
+                    }
+                }
+            }
+        }
+    }
+    """
+
+    search_query = f'label:"sponsoredissues.org" user:{github_username} is:issue is:public'
+    if since:
+        search_query += f' updated:>={_github_datetime(since)}'
+
+    variables = {
+        'searchQuery': search_query,
+        'cursor': None
+    }
+
+    issues = []
+    page_info = {'hasNextPage': True, 'endCursor': None}
+
+    while page_info.get('hasNextPage'):
+        variables['cursor'] = page_info.get('endCursor')
+
+        data = github_graphql(query, installation_token, variables=variables, timeout=30)
+        search = data['search']
+
+        issue_count = search['issueCount']
+        if issue_count > GITHUB_SEARCH_MAX_RESULTS:
+            raise _GitHubSearchTooManyResults(f'search matched {issue_count} issues')
+
+        # `... on Issue` gives an empty object for any search result that
+        # is not an issue.
+        for issue in search['nodes']:
+            if issue:
+                issues.append(_github_issue_graphql_to_rest(issue))
+
+        logger.info(f'Searching issues (found {len(issues)} of {issue_count} so far)...')
+
+        page_info = search['pageInfo']
+
+    return issues
+
+def github_app_installation_query_issues_with_sponsoredissues_label(installation_token, github_username, discovery=None, since=None):
+    """
+    Query the user's public issues with the sponsoredissues.org label.
+
+    If `since` (a datetime) is given, only issues that were updated at
+    or after `since` are returned.
+
+    `discovery` chooses how the issues are found (default:
+    `settings.GITHUB_ISSUE_DISCOVERY`):
+
+    'search': Use GitHub issue search, which only touches the labeled
+    issues. If there are more labeled issues than GitHub search can
+    return, we fall back to 'repos'.
+
+    'repos': Walk all of the user's public repos, 30 repos per query,
+    and get the labeled issues from each repo. The cost of this grows
+    with the number of repos, rather than the number of labeled issues.
+    """
+    if discovery is None:
+        discovery = settings.GITHUB_ISSUE_DISCOVERY
+
+    if discovery == 'search':
+        try:
+            return _github_app_installation_query_labeled_issues_by_search(installation_token, github_username, since)
+        except _GitHubSearchTooManyResults as e:
+            logger.warning(f'issue search for "{github_username}" is incomplete ({e}), falling back to walking repos')
+
+    return _github_app_installation_query_labeled_issues_by_repos(installation_token, github_username, since)
+
+def _github_app_installation_query_labeled_issues_by_repos(installation_token, github_username, since=None):
+    """
+    Find issues with the sponsoredissues.org label by walking all of
+    the user's public repositories.
+    """
+    query = """
+    query($username: String!, $issueFirst: Int!, $cursor: String, $since: DateTime) {
         user(login: $username) {
             repositories(
                 first: 30
@@ -137,6 +443,7 @@ def github_app_installation_query_issues_with_sponsoredissues_label(installation
                         first: $issueFirst
                         states: [OPEN, CLOSED]
                         labels: ["sponsoredissues.org"]
+                        filterBy: {since: $since}
                     ) {
                         nodes {
                             number
@@ -170,7 +477,8 @@ def github_app_installation_query_issues_with_sponsoredissues_label(installation
     variables = {
         'username': github_username,
         'issueFirst': 100,  # Get up to 100 issues per repo
-        'cursor': None
+        'cursor': None,
+        'since': _github_datetime(since),
     }
 
     issues = []
@@ -201,31 +509,7 @@ def github_app_installation_query_issues_with_sponsoredissues_label(installation
                 logger.info(f'  {owner_login}/{repo_name}: {len(repo_issues)} issues')
 
             for issue in repo_issues:
-                # Convert GraphQL response to REST API format for compatibility
-                issue_data = {
-                    'number': issue['number'],
-                    'title': issue['title'],
-                    'body': issue['body'],
-                    'state': issue['state'].lower(),
-                    'repository': {
-                        'html_url': issue['repository']['homepageUrl'],
-                        'url': issue['repository']['url'],
-                    },
-                    'html_url': issue['url'],
-                    'created_at': issue['createdAt'],
-                    'updated_at': issue['updatedAt'],
-                    'labels': [
-                        {
-                            'name': label['name'],
-                            'color': label['color']
-                        }
-                        for label in issue.get('labels', {}).get('nodes', [])
-                    ],
-                    'user': {
-                        'login': issue.get('author', {}).get('login', '')
-                    }
-                }
-                issues.append(issue_data)
+                issues.append(_github_issue_graphql_to_rest(issue))
 
         repos_processed += len(repos)
 
@@ -238,6 +522,13 @@ def _github_app_installation_build_query_for_issue_urls(issue_urls):
     """
     Build a GitHub GraphQL query that gets the latest data for
     given issue URLs.
+
+    Returns: Tuple of (query, aliases)
+        - query: The GraphQL query
+        - aliases: Dictionary that maps the (repo alias, issue alias)
+                   of each issue in the query to its issue URL, in
+                   the same order as `issue_urls` (after grouping by
+                   repo)
     """
     from urllib.parse import urlparse
 
@@ -253,6 +544,7 @@ def _github_app_installation_build_query_for_issue_urls(issue_urls):
     # Monotonically-increasing indices for GraphQL aliases.
     repo_index = 0
     issue_index = 0
+    aliases = {}
 
     query = """query {"""
     for (repo_url, issue_urls) in repos.items():
@@ -260,16 +552,19 @@ def _github_app_installation_build_query_for_issue_urls(issue_urls):
         owner = path.split('/')[-2]
         repo_name = path.split('/')[-1]
 
+        repo_alias = f'repo{repo_index}'
         query += f"""
-        repo{repo_index}: repository(owner: "{owner}", name: "{repo_name}") {{"""
+        {repo_alias}: repository(owner: "{owner}", name: "{repo_name}") {{"""
         repo_index += 1
 
         for issue_url in issue_urls:
             path = urlparse(issue_url).path.strip('/')
             issue_number = path.split('/')[-1]
 
+            issue_alias = f'issue{issue_index}'
+            aliases[(repo_alias, issue_alias)] = issue_url
             query += f"""
-            issue{issue_index}: issue(number: {issue_number}) {{"""
+            {issue_alias}: issue(number: {issue_number}) {{"""
             query += """
                 number
                 title
@@ -300,65 +595,119 @@ def _github_app_installation_build_query_for_issue_urls(issue_urls):
     query += """
     }
     """
-    return query
+    return (query, aliases)
+
+class GitHubIssueQueryError(RuntimeError):
+    """
+    Raised by `github_app_installation_query_issue_urls` when some of
+    the issues could not be queried.
+
+    Attributes:
+        issues: Issue data for the issues that were queried successfully
+        failed_issue_urls: Issue URLs that failed to query
+    """
+    def __init__(self, message, issues, failed_issue_urls):
+        super().__init__(message)
+        self.issues = issues
+        self.failed_issue_urls = failed_issue_urls
+
+# Maximum number of issues to query in a single GraphQL query, to
+# avoid exceeding GitHub API limits.
+ISSUE_URLS_BATCH_SIZE = 100
 
 def github_app_installation_query_issue_urls(installation_token, issue_urls):
     """
     Get latest issue data queries for GitHub issues that have received
     non-zero user funding on sponsoredissues.org.
+
+    The issues are queried in batches, which are sent concurrently
+    (see `github_parallel_map`). The results are returned in order of
+    issue URL, regardless of the order in which the batches complete.
+
+    If any issues fail to query, the other issues (and batches) still
+    run to completion, and then `GitHubIssueQueryError` is raised,
+    carrying the data of the successful issues and the URLs of the
+    failed issues. An error for one issue in a batch (GraphQL
+    "partial" errors) only fails that issue, rather than the whole
+    batch.
+
+    Issues (or repos) that GitHub reports as `NOT_FOUND` (e.g. issues
+    that were deleted, or transferred to another repo) are logged and
+    left out of the results, but are not counted as failed, because
+    querying them again would fail in the same way.
     """
     from itertools import islice
 
-    # Query in batches to avoid exceeding GitHub API limits.
-    queries = []
+    issue_urls = sorted(issue_urls)
     iterator = iter(issue_urls)
+    batches = []
     while True:
-        batch = list(islice(iterator, 100))
+        batch = list(islice(iterator, ISSUE_URLS_BATCH_SIZE))
         if not batch:
             break
-        query = _github_app_installation_build_query_for_issue_urls(batch)
-        queries.append(query)
+        batches.append(batch)
 
-    issues = []
-    for query in queries:
+    def query_batch(batch):
+        query, aliases = _github_app_installation_build_query_for_issue_urls(batch)
+        errors = []
         try:
             data = github_graphql(query, installation_token, timeout=30)
-        except requests.RequestException as e:
-            logger.error(f'GraphQL request failed: {e}')
-            continue
-
-        for i in range(len(data)):
-            repo = data.get(f'repo{i}')
-            for j in range(len(repo)):
-                issue = repo.get(f'issue{j}')
-                # Convert GraphQL response to REST API format for compatibility
-                issue_data = {
-                    'number': issue['number'],
-                    'title': issue['title'],
-                    'body': issue['body'],
-                    'repository': {
-                        'html_url': issue['repository']['homepageUrl'],
-                        'url': issue['repository']['url'],
-                    },
-                    'state': issue['state'].lower(),
-                    'html_url': issue['url'],
-                    'created_at': issue['createdAt'],
-                    'updated_at': issue['updatedAt'],
-                    'labels': [
-                        {
-                            'name': label['name'],
-                            'color': label['color']
-                        }
-                        for label in issue.get('labels', {}).get('nodes', [])
-                    ],
-                    'user': {
-                        'login': issue.get('author', {}).get('login', '')
-                    }
-                }
-                issues.append(issue_data)
+        except GitHubGraphQLError as e:
+            logger.error(f'GraphQL query for batch of {len(batch)} issues ({batch[0]} ...) returned errors: {e}')
+            data = e.data
+            errors = e.errors
+        except (requests.RequestException, RuntimeError) as e:
+            logger.error(f'GraphQL query for batch of {len(batch)} issues ({batch[0]} ...) failed: {e}')
+            data = None
+
+        # Aliases (e.g. `('repo0', 'issue3')`, or `('repo0',)` for a
+        # whole repo) that GitHub reported as not found
+        not_found_paths = {
+            tuple(error['path']) for error in errors
+            if error.get('type') == 'NOT_FOUND' and error.get('path')
+        }
+
+        issues = []
+        failed_issue_urls = []
+        for (repo_alias, issue_alias), issue_url in aliases.items():
+            repo = (data or {}).get(repo_alias)
+            issue = repo.get(issue_alias) if repo else None
+            if issue is not None:
+                issues.append(_github_issue_graphql_to_rest(issue))
+            elif (repo_alias,) in not_found_paths or (repo_alias, issue_alias) in not_found_paths:
+                logger.warning(f'issue not found on GitHub, skipping: {issue_url}')
+            else:
+                failed_issue_urls.append(issue_url)
+        return (issues, failed_issue_urls)
+
+    results = github_parallel_map(query_batch, batches)
+
+    issues = []
+    failed_issue_urls = []
+    for batch_issues, batch_failed_issue_urls in results:
+        issues.extend(batch_issues)
+        failed_issue_urls.extend(batch_failed_issue_urls)
+
+    if failed_issue_urls:
+        failed_batches = sum(1 for _, batch_failed_issue_urls in results if batch_failed_issue_urls)
+        raise GitHubIssueQueryError(
+            f'failed to query {len(failed_issue_urls)} issues (in {failed_batches} of {len(batches)} batches)',
+            issues,
+            failed_issue_urls,
+        )
 
     return issues
 
-def github_app_installation_query_repos(installation_token):
-    data = github_api(f'/installation/repositories', installation_token)
-    return data['repositories']
\ No newline at end of file
+def github_app_installation_query_repos(installation_token, installation_id):
+    """
+    Return an iterator over the JSON data for the repos that are
+    enabled for the app installation with ID `installation_id`.
+
+    The repos are fetched one page at a time as the iterator is
+    consumed, rather than all at once.
+    """
+    return github_api_items(
+        '/installation/repositories',
+        installation_token,
+        cache_identity=github_app_installation_cache_identity(installation_id),
+    )
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Rate limiting for GitHub API requests, shared between all processes
+via Redis.
+
+GitHub tells us how much of our rate limit budget is left in the
+`X-RateLimit-Remaining` and `X-RateLimit-Reset` headers of every API
+response [1]. The budget belongs to the access token (not to the
+process making the request), and each API "resource" (e.g. `core`
+for the REST API, `graphql` for the GraphQL API, `search` for the
+search API) has its own separate budget.
+
+We keep a token bucket for each (resource, access token) pair in
+Redis, so that all webserver and Celery worker processes draw from
+the same budget:
+
+* Before each request, `github_rate_limit_acquire()` takes one token
+  from the bucket. If the bucket is empty, it waits until GitHub
+  resets the budget.
+
+* After each response, `github_rate_limit_update()` refills the
+  bucket with the authoritative values from the response headers.
+
+This means that we only ever wait when GitHub says that the budget
+is used up, rather than sleeping before every request.
+
+For GraphQL queries, the headers report the remaining budget in
+points rather than requests, and a single query may cost more than
+one point [2]. We can't know the cost of a query before sending it,
+so we take one token per query up front, and then let the headers
+from the response correct the bucket to the actual remaining budget.
+
+[1]: https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api
+[2]: https://docs.github.com/en/graphql/overview/rate-limits-and-query-limits-for-the-graphql-api
+"""
+
+import hashlib
+import logging
+import random
+import redis
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+redis_client = redis.Redis.from_url(url=settings.REDIS_URL, decode_responses=True)
+
+# Atomically take one token from a rate limit bucket.
+#
+# Returns:
+#   0   if a token was taken
+#   -1  if the bucket is unknown (no response seen yet for this token,
+#       or the budget has since been reset by GitHub)
+#   N>0 the Unix timestamp at which GitHub will reset the budget, if
+#       the bucket is empty
+#
+# KEYS[1]: bucket key
+# ARGV[1]: number of tokens to keep in reserve
+# ARGV[2]: current Unix timestamp
+_ACQUIRE_SCRIPT = """
+local remaining = redis.call('HGET', KEYS[1], 'remaining')
+local reset = redis.call('HGET', KEYS[1], 'reset')
+if not remaining or not reset then
+    return -1
+end
+remaining = tonumber(remaining)
+reset = tonumber(reset)
+if reset <= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+if remaining > tonumber(ARGV[1]) then
+    redis.call('HINCRBY', KEYS[1], 'remaining', -1)
+    return 0
+end
+return reset
+"""
+
+_acquire_script = redis_client.register_script(_ACQUIRE_SCRIPT)
+
+class GitHubRateLimitError(RuntimeError):
+    """
+    Raised when the GitHub rate limit budget is used up, and the time
+    until GitHub resets the budget is longer than we are willing to
+    wait (`settings.GITHUB_RATE_LIMIT_MAX_WAIT`).
+    """
+
+def github_rate_limit_key(access_token, resource):
+    """
+    Return the Redis key for the rate limit bucket of `access_token`
+    and `resource` (e.g. `core`, `graphql`, `search`).
+
+    We store a hash of the access token rather than the token itself,
+    so that the tokens are not readable by anyone with access to
+    Redis.
+    """
+    if access_token:
+        token_id = hashlib.sha256(access_token.encode()).hexdigest()[:16]
+    else:
+        token_id = 'anonymous'
+    return f'github:ratelimit:{resource}:{token_id}'
+
+def github_rate_limit_acquire(access_token, resource):
+    """
+    Take one request from the shared rate limit budget for
+    `access_token` and `resource`, waiting until GitHub resets the
+    budget if necessary.
+
+    Raises `GitHubRateLimitError` if the budget is used up and the
+    reset is further away than `settings.GITHUB_RATE_LIMIT_MAX_WAIT`
+    seconds.
+
+    If Redis is unavailable, we log a warning and let the request go
+    ahead. GitHub enforces the rate limit anyway, so the worst case
+    is that the request fails with HTTP 403/429.
+    """
+    key = github_rate_limit_key(access_token, resource)
+
+    while True:
+        now = time.time()
+        try:
+            reset = int(_acquire_script(keys=[key], args=[settings.GITHUB_RATE_LIMIT_RESERVE, int(now)]))
+        except redis.RedisError as e:
+            logger.warning(f'GitHub rate limiter unavailable, not limiting request: {e}')
+            return
+
+        if reset <= 0:
+            return
+
+        # Add a little jitter, so that all of the workers that are
+        # waiting on the same budget don't wake up at the exact same
+        # moment.
+        seconds = reset - now + random.uniform(0, 1)
+        if seconds > settings.GITHUB_RATE_LIMIT_MAX_WAIT:
+            raise GitHubRateLimitError(f'GitHub rate limit exceeded for resource "{resource}" (resets in {seconds:.0f}s)')
+
+        logger.info(f'GitHub rate limit budget for resource "{resource}" is used up, sleeping {seconds:.1f}s until reset...')
+        time.sleep(seconds)
+
+def github_rate_limit_update(access_token, resource, response):
+    """
+    Update the shared rate limit budget for `access_token` and
+    `resource` from the headers of a GitHub API response.
+
+    `resource` must be the same resource that was passed to
+    `github_rate_limit_acquire()` for the request. If the
+    `X-RateLimit-Resource` header reports a different resource (e.g.
+    `search` for a search request made with the `core` budget), the
+    remaining/reset headers describe a budget that we never draw
+    from, so we only log them.
+
+    Also handles GitHub's "secondary" rate limits [1], which are
+    signalled by a `Retry-After` header on an HTTP 403 or 429
+    response. In that case, we empty the bucket until the retry time
+    has passed.
+
+    [1]: https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api#about-secondary-rate-limits
+    """
+    headers = response.headers
+    header_resource = headers.get('X-RateLimit-Resource', resource)
+    remaining = headers.get('X-RateLimit-Remaining')
+    reset = headers.get('X-RateLimit-Reset')
+    retry_after = headers.get('Retry-After')
+
+    if response.status_code in (403, 429) and retry_after:
+        remaining = 0
+        reset = int(time.time()) + int(retry_after)
+        logger.warning(f'GitHub secondary rate limit hit for resource "{resource}" (retry after {retry_after}s)')
+    elif remaining is None or reset is None:
+        return
+    elif header_resource != resource:
+        logger.debug(f'GitHub API rate limit for resource "{header_resource}" (requested with resource "{resource}"): {remaining} remaining (resets at {reset})')
+        return
+
+    logger.debug(f'GitHub API rate limit for resource "{resource}": {remaining} remaining (resets at {reset})')
+
+    key = github_rate_limit_key(access_token, resource)
+    try:
+        pipeline = redis_client.pipeline()
+        pipeline.hset(key, mapping={'remaining': int(remaining), 'reset': int(reset)})
+        pipeline.expireat(key, int(reset) + 1)
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f'GitHub rate limiter unavailable, failed to record rate limit: {e}')
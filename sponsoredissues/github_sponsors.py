@@ -6,7 +6,7 @@ from django.core.cache import cache
 from django.db.models import Sum
 from typing import Dict, List, Optional
 from decimal import Decimal
-from sponsoredissues.github_api import github_graphql
+from sponsoredissues.github_api import github_graphql, github_session
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +42,11 @@ class GitHubSponsorService:
         """
 
         variables = {'recipient_github_username': recipient_github_username}
-        # TODO: Setting `rate_limit=False` here is a bit hacky. The
-        # reason I added it is because I currently run this query
+        # Note: We set `rate_limit=False` here because this query runs
         # while loading the sponsored issues page (in the
-        # `owner_issues` view function), and the default rate-limiting
-        # behaviour makes the page load really slowly.
+        # `owner_issues` view function). If the user's rate limit
+        # budget is used up, we would rather fail fast than make the
+        # page load hang until GitHub resets the budget.
         data = github_graphql(query, access_token, variables, rate_limit=False)
 
         return data['viewer']['totalSponsorshipAmountAsSponsorInCents']
@@ -69,7 +69,7 @@ class GitHubSponsorService:
         # issues owned by `recipient_github_username`.
         allocated_amounts = IssueSponsorship.objects.filter(
             sponsor_id=sponsor,
-            issue__url__contains=f"github.com/{recipient_github_username}/"
+            issue__owner_login=recipient_github_username
         ).aggregate(total=Sum('cents_usd'))
         allocated_sponsor_cents = allocated_amounts['total'] or Decimal('0')
 
@@ -109,7 +109,7 @@ class GitHubSponsorService:
 
         try:
             # Make HEAD request with allow_redirects=False to detect redirects
-            response = requests.head(
+            response = github_session().head(
                 sponsors_url,
                 allow_redirects=False,
                 timeout=self.REQUEST_TIMEOUT
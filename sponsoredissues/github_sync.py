@@ -1,16 +1,28 @@
 import logging
 
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from enum import Enum
 from requests.exceptions import HTTPError
 from sponsoredissues.github_api import github_api, github_app_installation_is_suspended, github_issue_has_sponsoredissues_label
-from sponsoredissues.github_app import github_app_installation_query_json, github_app_installation_query_issues_with_sponsoredissues_label, github_app_installation_query_issue_urls, github_app_installation_query_repos, github_app_installation_query_token
+from sponsoredissues.github_app import GitHubIssueQueryError, github_app_installation_cache_identity, github_app_installation_query_json, github_app_installation_query_issues_with_sponsoredissues_label, github_app_installation_query_issue_urls, github_app_installation_query_repos, github_app_installation_query_token
 from sponsoredissues.github_sponsors import GitHubSponsorService
 from sponsoredissues.logging import PrefixLoggerAdapter
-from sponsoredissues.models import GitHubAppInstallation, GitHubIssue, GitHubRepo, Maintainer
+from sponsoredissues.models import GitHubAppInstallation, GitHubIssue, GitHubRepo, Maintainer, SiteStats
 
 default_logger = logging.getLogger(__name__)
 
+# Incremental issue syncs re-fetch issues that were updated up to
+# this long before the watermark, in case GitHub's search index
+# (or our previous sync) missed updates that happened around the same
+# time as the watermark.
+INCREMENTAL_SYNC_OVERLAP = timedelta(minutes=5)
+
 class SyncResult(Enum):
     """
     What happened to an individual issue in the database, after the latest
@@ -20,10 +32,11 @@ class SyncResult(Enum):
     UPDATED = 1
     REMOVED = 2
     IGNORED = 3
+    UNCHANGED = 4
 
-def github_sync_maintainer(github_account_id: int, access_token=None, logger=default_logger):
+def github_sync_maintainer(github_account_id: int, access_token=None, cache_identity=None, logger=default_logger):
     # get JSON data for GitHub user
-    github_user_json = github_api(f'/user/{github_account_id}', access_token=access_token)
+    github_user_json = github_api(f'/user/{github_account_id}', access_token=access_token, cache_identity=cache_identity)
     github_account_name = github_user_json['login']
 
     # check if maintainer has created a GitHub Sponsors profile
@@ -55,7 +68,121 @@ def github_sync_app_installation_remove(installation, logger=default_logger):
     issues_removed = deleted_by_object.get('GitHubIssue', 0)
     logger.info(f'removed installation from database: {installation_url} (removed: {repos_removed} repos, {issues_removed} unfunded issues)')
 
-def github_sync_app_installation(installation_id, base_logger=default_logger):
+def github_sync_app_installation_needs_full_sync(installation):
+    """
+    Return True if the next issue sync for `installation` should be a
+    full sync rather than an incremental sync.
+    """
+    if installation.issues_full_sync_at is None:
+        return True
+    full_sync_interval = timedelta(seconds=settings.GITHUB_SYNC_FULL_INTERVAL)
+    return timezone.now() - installation.issues_full_sync_at >= full_sync_interval
+
+# Webhook activity within this period counts as "recent" for
+# `github_sync_interval()`.
+RECENT_WEBHOOK_PERIOD = timedelta(days=1)
+
+def github_sync_interval(previous_interval, changes, has_funded_open_issues, last_webhook_at, now):
+    """
+    Return the number of seconds to wait before the next routine sync
+    of an app installation.
+
+    The goal is to spend our GitHub API budget on the installations
+    where data actually changes:
+
+    * If the last sync found changes, sync again soon
+    (`GITHUB_SYNC_MIN_INTERVAL`).
+    * Otherwise, back off gradually, by doubling the previous interval
+    up to `GITHUB_SYNC_MAX_INTERVAL`.
+    * Installations with funded open issues (where stale data matters
+    most to sponsors), or with recent webhook activity (an active
+    maintainer), are synced at least every
+    `GITHUB_SYNC_ACTIVE_INTERVAL`.
+
+    Args:
+        previous_interval: The previous sync interval in seconds, or `None`
+        changes: Number of changes (added/updated/removed issues and repos) found by the last sync
+        has_funded_open_issues: True if the installation has any funded open issues
+        last_webhook_at: Time of the last webhook event for the installation, or `None`
+        now: Current time
+    """
+    min_interval = settings.GITHUB_SYNC_MIN_INTERVAL
+    max_interval = settings.GITHUB_SYNC_MAX_INTERVAL
+
+    if changes > 0 or previous_interval is None:
+        interval = min_interval
+    else:
+        interval = min(max(previous_interval, min_interval) * 2, max_interval)
+
+    recent_webhook = last_webhook_at is not None and now - last_webhook_at < RECENT_WEBHOOK_PERIOD
+    if has_funded_open_issues or recent_webhook:
+        interval = min(interval, max(settings.GITHUB_SYNC_ACTIVE_INTERVAL, min_interval))
+
+    return interval
+
+def github_sync_app_installation_schedule_next(installation, changes, logger=default_logger):
+    """
+    Set `sync_interval` and `next_sync_at` for `installation` (without
+    saving it), after a sync that found `changes` changes.
+    """
+    has_funded_open_issues = GitHubIssue.objects.filter(
+        owner_login=installation.account_login,
+        state='open',
+        sponsor_count__gt=0,
+    ).exists()
+
+    now = timezone.now()
+    installation.sync_interval = github_sync_interval(
+        installation.sync_interval,
+        changes,
+        has_funded_open_issues,
+        installation.last_webhook_at,
+        now)
+    installation.next_sync_at = now + timedelta(seconds=installation.sync_interval)
+    logger.info(f'next sync in {installation.sync_interval} seconds ({changes} changes found)')
+
+def github_sync_app_installation_record_webhook(installation_id):
+    """
+    Record webhook activity for an app installation.
+
+    This makes the installation count as "active" for
+    `github_sync_interval()`, and brings its next routine sync forward
+    to at most `GITHUB_SYNC_ACTIVE_INTERVAL` from now.
+    """
+    now = timezone.now()
+    active_sync_at = now + timedelta(seconds=settings.GITHUB_SYNC_ACTIVE_INTERVAL)
+    GitHubAppInstallation.objects.filter(
+        url=f'https://github.com/settings/installations/{installation_id}'
+    ).update(
+        last_webhook_at=now,
+        next_sync_at=Least(Coalesce('next_sync_at', Value(now)), Value(active_sync_at)),
+    )
+
+def github_sync_app_installation_record_failure(installation_id, retry_after):
+    """
+    Record a failed sync of an app installation.
+
+    This pushes its next routine sync back to at least `retry_after`
+    seconds from now, so that the scheduler doesn't pick the
+    installation up again while the failed sync is waiting to be
+    retried.
+    """
+    retry_at = timezone.now() + timedelta(seconds=retry_after)
+    GitHubAppInstallation.objects.filter(
+        url=f'https://github.com/settings/installations/{installation_id}'
+    ).update(
+        next_sync_at=Greatest(Coalesce('next_sync_at', Value(retry_at)), Value(retry_at)),
+    )
+
+def github_sync_app_installation(installation_id, full=None, base_logger=default_logger):
+    """
+    Sync an app installation, and its repos and issues, with GitHub.
+
+    If `full` is None, we do a full issue sync if one is due (see
+    `GITHUB_SYNC_FULL_INTERVAL` in `settings.py`), and otherwise an
+    incremental issue sync.
+    """
+    sync_started_at = timezone.now()
     installation_url = f'https://github.com/settings/installations/{installation_id}'
     installation_token = github_app_installation_query_token(installation_id)
 
@@ -80,6 +207,8 @@ def github_sync_app_installation(installation_id, base_logger=default_logger):
         # GitHub API outage).
         if e.response.status_code == 404 and installation:
             logger.info('query for installation JSON returned HTTP 404, skipping sync')
+            github_sync_app_installation_schedule_next(installation, changes=0, logger=logger)
+            installation.save(update_fields=['sync_interval', 'next_sync_at'])
             return
         else:
             raise
@@ -98,7 +227,12 @@ def github_sync_app_installation(installation_id, base_logger=default_logger):
     account_id = installation_json['account']['id']
     installation_url = installation_json['html_url']
 
-    maintainer = github_sync_maintainer(account_id, access_token=installation_token, logger=logger)
+    maintainer = github_sync_maintainer(
+        account_id,
+        access_token=installation_token,
+        cache_identity=github_app_installation_cache_identity(installation_id),
+        logger=logger
+    )
 
     # check if maintainer has suspended the app installation
 
@@ -120,20 +254,44 @@ def github_sync_app_installation(installation_id, base_logger=default_logger):
     if created:
         logger.info(f'added (empty) installation to DB')
 
-    github_sync_app_installation_repos(installation_token, installation, logger)
-    github_sync_app_installation_issues(installation_token, installation, logger)
+    repos_changed = github_sync_app_installation_repos(installation_token, installation, logger)
+
+    # Issues in newly enabled repos (and issues in newly disabled
+    # repos) need to be added/removed even if they were not updated on
+    # GitHub, so we can't use an incremental sync for those.
+    if full is None:
+        full = repos_changed or github_sync_app_installation_needs_full_sync(installation)
+
+    issue_changes = github_sync_app_installation_issues(installation_token, installation, logger, full=full)
+
+    # Webhooks may have arrived while we were syncing (see
+    # `github_sync_app_installation_record_webhook()`). Reload the
+    # fields they update, so that the next sync is scheduled with them
+    # in mind, and only save the fields that this sync owns.
+    installation.refresh_from_db(fields=['last_webhook_at', 'next_sync_at'])
+    webhook_sync_at = None
+    if installation.last_webhook_at is not None and installation.last_webhook_at >= sync_started_at:
+        webhook_sync_at = installation.next_sync_at
 
+    github_sync_app_installation_schedule_next(installation, changes=issue_changes + int(repos_changed), logger=logger)
+    if webhook_sync_at is not None:
+        installation.next_sync_at = min(installation.next_sync_at, webhook_sync_at)
     installation.updated_at = timezone.now()
-    installation.save()
+    installation.save(update_fields=['sync_interval', 'next_sync_at', 'updated_at'])
     logger.info(f'successfully synced installation')
 
 def github_sync_app_installation_repos(installation_token, installation, logger=default_logger):
-    """Sync repos for a single GitHub App installation"""
+    """
+    Sync repos for a single GitHub App installation.
+
+    Returns True if any repos were added or removed.
+    """
 
     # query currently enabled repositories for app installation
     logger.info(f'querying GitHub for enabled repos')
-    repos_from_github = github_app_installation_query_repos(installation_token)
-    logger.info(f'found {len(repos_from_github)} enabled repos')
+    repos_from_github = github_app_installation_query_repos(installation_token, installation.installation_id())
+    repo_urls_from_github = {repo['html_url'] for repo in repos_from_github if not repo['private']}
+    logger.info(f'found {len(repo_urls_from_github)} enabled public repos')
 
     # Get current repo URLs for this installation's account
     repo_urls_in_db = set(
@@ -142,27 +300,58 @@ def github_sync_app_installation_repos(installation_token, installation, logger=
         ).values_list('url', flat=True)
     )
 
-    repo_urls_from_github = {repo['html_url'] for repo in repos_from_github if not repo['private']}
     repo_urls_to_add = repo_urls_from_github - repo_urls_in_db
     repo_urls_to_update = repo_urls_from_github & repo_urls_in_db
     repo_urls_to_remove = repo_urls_in_db - repo_urls_from_github
 
+    # Apply the changes with set-based queries, rather than one query
+    # per repo.
+    #
+    # Note: Deleting repos with `QuerySet.delete()` still applies the
+    # `on_delete=models.SET_NULL` rule of `GitHubIssue.repo`, so the
+    # issues of removed repos are kept (with `repo=NULL`) until the
+    # issue sync decides what to do with them.
+
+    with transaction.atomic():
+        GitHubRepo.objects.bulk_create([
+            GitHubRepo(url=repo_url, app_installation=installation)
+            for repo_url in repo_urls_to_add
+        ])
+        GitHubRepo.objects.filter(url__in=repo_urls_to_update).update(updated_at=timezone.now())
+        GitHubRepo.objects.filter(app_installation=installation, url__in=repo_urls_to_remove).delete()
+
     for repo_url in repo_urls_to_add:
-        GitHubRepo.objects.create(url=repo_url, app_installation=installation)
         logger.info(f'added repo {repo_url}')
 
     for repo_url in repo_urls_to_update:
-        GitHubRepo.objects.filter(url=repo_url).update(updated_at=timezone.now())
         logger.info(f'updated repo {repo_url}')
 
     for repo_url in repo_urls_to_remove:
-        GitHubRepo.objects.get(url=repo_url).delete()
         logger.info(f'removed repo {repo_url}')
 
     logger.info(f'repo sync stats: +{len(repo_urls_to_add)} ~{len(repo_urls_to_update)} -{len(repo_urls_to_remove)}')
 
-def github_sync_app_installation_issues(installation_token, installation, logger=default_logger):
-    """Sync issues for a single GitHub App installation"""
+    return bool(repo_urls_to_add or repo_urls_to_remove)
+
+def github_sync_app_installation_issues(installation_token, installation, logger=default_logger, full=True):
+    """
+    Sync issues for a single GitHub App installation.
+
+    A full sync (`full=True`) fetches all labeled and funded issues
+    from GitHub, and reconciles them with all of the installation's
+    issues in the database.
+
+    An incremental sync (`full=False`) only fetches the labeled issues
+    that were updated on GitHub since the installation's
+    `issues_updated_at_watermark`, so that its cost scales with the
+    rate of change rather than the total number of issues. It does not
+    remove issues that are missing from the GitHub query results,
+    because an incremental sync can't tell a deleted or unlabeled
+    issue apart from an unchanged one. Those changes are picked up by
+    webhooks, or by the next full sync.
+
+    Returns the number of issues that were added, updated, or removed.
+    """
     installation_json = installation.data
     github_username = installation_json['account']['login']
 
@@ -170,8 +359,8 @@ def github_sync_app_installation_issues(installation_token, installation, logger
     #
     # Note:
     #
-    # It is important to query issues by URL here
-    # (i.e. `url__startswith==...`), rather than with a join query
+    # It is important to query issues by owner here
+    # (i.e. `owner_login=...`), rather than with a join query
     # like `repo__app_installation=installation`, because latter will
     # omit issues where `GitHubIssue.repo == NULL`, which we also want
     # to include in our issue data updates.
@@ -184,9 +373,7 @@ def github_sync_app_installation_issues(installation_token, installation, logger
     # the latest issue data from deselected repos because all repos
     # used with `sponsoredissues.org` are public.
 
-    issues_in_db = GitHubIssue.objects.filter(
-        url__startswith = f'https://github.com/{github_username}/'
-    )
+    issues_in_db = GitHubIssue.objects.filter(owner_login=github_username)
     issue_urls_in_db = set(
         issues_in_db.distinct().values_list('url', flat=True)
     )
@@ -242,11 +429,36 @@ def github_sync_app_installation_issues(installation_token, installation, logger
     # issue is shown in a special "frozen" state, with the "Add or
     # Remove Funds" button disabled.
 
-    logger.info(f'querying GitHub for issues with "sponsoredissues.org" label')
-    issues_from_github_with_label = github_app_installation_query_issues_with_sponsoredissues_label(installation_token, github_username)
-
-    logger.info(f'querying GitHub for issues with funding')
-    issues_from_github_with_funding = github_app_installation_query_issue_urls(installation_token, funded_issue_urls_in_db)
+    # If we haven't seen any issues yet, the last full sync is as
+    # far back as we need to look.
+    watermark = installation.issues_updated_at_watermark or installation.issues_full_sync_at
+    funded_issues_complete = True
+    if full or watermark is None:
+        full = True
+        since = None
+        logger.info(f'querying GitHub for issues with "sponsoredissues.org" label (full sync)')
+    else:
+        since = watermark - INCREMENTAL_SYNC_OVERLAP
+        logger.info(f'querying GitHub for issues with "sponsoredissues.org" label updated since {since.isoformat()}')
+    issues_from_github_with_label = github_app_installation_query_issues_with_sponsoredissues_label(installation_token, github_username, since=since)
+
+    # Funded issues can't be filtered by update time, so we only
+    # query them during full syncs. (Funded issues that still have
+    # the label are included in the query above.)
+    if full:
+        logger.info(f'querying GitHub for issues with funding')
+        try:
+            issues_from_github_with_funding = github_app_installation_query_issue_urls(installation_token, funded_issue_urls_in_db)
+        except GitHubIssueQueryError as e:
+            # Sync the funded issues that we did get. (The funded
+            # issues that we didn't get are left untouched, since
+            # funded issues are never removed below.) We don't count
+            # this as a full sync, so that the next sync tries again.
+            logger.error(f'failed to query {len(e.failed_issue_urls)} funded issues, will retry on next sync: {e}')
+            issues_from_github_with_funding = e.issues
+            funded_issues_complete = False
+    else:
+        issues_from_github_with_funding = []
 
     # Merge results from two queries above
     issues_from_github = {issue['html_url']: issue for issue in issues_from_github_with_label}
@@ -263,19 +475,6 @@ def github_sync_app_installation_issues(installation_token, installation, logger
     # (3) The "sponsoredissues-maintainer" GitHub App must be enabled
     # on the repo that contains the issue.
 
-    issue_urls_added = set()
-    issue_urls_updated = set()
-    issue_urls_removed = set()
-
-    for issue_url in issue_urls_from_github:
-        result = github_sync_issue(issues_from_github[issue_url])
-        if result is SyncResult.ADDED:
-            issue_urls_added.add(issue_url)
-        elif result is SyncResult.UPDATED:
-            issue_urls_updated.add(issue_url)
-        elif result is SyncResult.REMOVED:
-            issue_urls_removed.add(issue_url)
-
     # Remove issues from database that were not included in the GitHub
     # query results for labeled/funded issues above
     # (i.e. `issue_urls_from_github`).
@@ -289,16 +488,41 @@ def github_sync_app_installation_issues(installation_token, installation, logger
     # bottom right corner of the GitHub issue page.)
     # (3) The maintainer deleted the repo that contains the issue.
 
-    issue_urls_to_remove = (issue_urls_in_db
-                        - funded_issue_urls_in_db
-                        - issue_urls_from_github)
-
-    for issue_url in issue_urls_to_remove:
-        GitHubIssue.objects.get(url=issue_url).delete()
-        issue_urls_removed.add(issue_url)
-        logger.info(f'removed issue {issue_url}')
-
-    logger.info(f'issue sync stats: +{len(issue_urls_added)} ~{len(issue_urls_updated)} -{len(issue_urls_removed)}')
+    if full:
+        issue_urls_to_remove = (issue_urls_in_db
+                            - funded_issue_urls_in_db
+                            - issue_urls_from_github)
+    else:
+        issue_urls_to_remove = set()
+
+    results = github_sync_issues(issues_from_github.values(), issue_urls_to_remove, logger=logger)
+
+    issue_urls_added = {url for url, result in results.items() if result is SyncResult.ADDED}
+    issue_urls_updated = {url for url, result in results.items() if result is SyncResult.UPDATED}
+    issue_urls_removed = {url for url, result in results.items() if result is SyncResult.REMOVED}
+    issue_urls_unchanged = {url for url, result in results.items() if result is SyncResult.UNCHANGED}
+
+    logger.info(f'issue sync stats: +{len(issue_urls_added)} ~{len(issue_urls_updated)} -{len(issue_urls_removed)} ={len(issue_urls_unchanged)}')
+
+    # Advance the watermark to the latest issue update that we have
+    # seen. We use GitHub's timestamps rather than our own clock, so
+    # that clock skew between us and GitHub can't cause us to miss
+    # updates.
+    updated_ats = [parse_datetime(issue['updated_at']) for issue in issues_from_github.values()]
+    updated_ats = [t for t in updated_ats if t is not None]
+    if installation.issues_updated_at_watermark:
+        updated_ats.append(installation.issues_updated_at_watermark)
+    update_fields = []
+    if updated_ats:
+        installation.issues_updated_at_watermark = max(updated_ats)
+        update_fields.append('issues_updated_at_watermark')
+    if full and funded_issues_complete:
+        installation.issues_full_sync_at = timezone.now()
+        update_fields.append('issues_full_sync_at')
+    if update_fields:
+        installation.save(update_fields=update_fields)
+
+    return len(issue_urls_added) + len(issue_urls_updated) + len(issue_urls_removed)
 
 def github_sync_issue(issue_json, logger=default_logger) -> SyncResult:
     """
@@ -374,10 +598,19 @@ def github_sync_issue(issue_json, logger=default_logger) -> SyncResult:
         logger.info(f"added issue: {issue_url}")
         return SyncResult.ADDED
     elif should_exist and github_issue:
+        # Skip the write if nothing has changed
+        if github_issue.fingerprint == GitHubIssue.fingerprint_for(issue_json, github_repo.id if github_repo else None):
+            return SyncResult.UNCHANGED
         # Update existing issue
+        old_state = github_issue.state
         github_issue.data = issue_json
         github_issue.repo = github_repo
-        github_issue.save()
+        with transaction.atomic():
+            # Note: `update_fields` avoids overwriting the funding
+            # counters (see `GitHubIssue.total_cents`).
+            github_issue.save(update_fields=['data', 'repo', 'updated_at'])
+            if old_state != issue_state:
+                SiteStats.record_issue_state_changes({github_issue.id: (old_state, issue_state)})
         logger.info(f"updated issue: {issue_url}")
         return SyncResult.UPDATED
     elif not should_exist and github_issue:
@@ -388,4 +621,121 @@ def github_sync_issue(issue_json, logger=default_logger) -> SyncResult:
     else:
         # Final case: Issue does not exist in database and should not
         # be added. (i.e. `not should_exist and not github_issue`)
-        return SyncResult.IGNORED
\ No newline at end of file
+        return SyncResult.IGNORED
+
+# Maximum number of rows per `bulk_update` query in `github_sync_issues`.
+BULK_UPDATE_BATCH_SIZE = 500
+
+def github_sync_issues(issue_jsons, issue_urls_to_remove=(), logger=default_logger) -> dict[str, SyncResult]:
+    """
+    Add, update, or remove many GitHubIssues in the database, given the
+    latest JSON issue data from GitHub.
+
+    This has exactly the same effect as calling `github_sync_issue`
+    for each issue in `issue_jsons`, but uses a constant number of
+    queries rather than several queries per issue: the existing
+    issues, their repos, and their funded state are fetched up front,
+    and the changes are applied with `bulk_create`, `bulk_update`, and
+    a bulk delete, inside one transaction.
+
+    `issue_urls_to_remove` are additional issue URLs to remove from the
+    database (e.g. issues that are no longer returned by GitHub). As
+    always, funded issues are never removed.
+
+    Returns: A dictionary that maps issue URL -> `SyncResult`, for all
+    issues in `issue_jsons` and all removed issues.
+    """
+    issues_from_github = {issue_json['html_url']: issue_json for issue_json in issue_jsons}
+    issue_urls = issues_from_github.keys()
+
+    existing_issues = {
+        issue.url: issue for issue in GitHubIssue.objects.filter(url__in=issue_urls)
+    }
+    funded_issue_urls = set(
+        GitHubIssue.objects.filter(
+            url__in=existing_issues.keys(),
+            sponsor_amounts__isnull=False
+        ).order_by().distinct().values_list('url', flat=True)
+    )
+    repos = {
+        repo.url: repo for repo in GitHubRepo.objects.filter(
+            url__in={GitHubRepo.url_for_issue_url(url) for url in issue_urls}
+        )
+    }
+
+    results = {}
+    issues_to_create = []
+    issues_to_update = []
+    # Maps issue ID -> (old state, new state), for funded issues that
+    # were closed or reopened
+    state_changes = {}
+    issue_urls_to_delete = set(issue_urls_to_remove) - funded_issue_urls
+    now = timezone.now()
+
+    for issue_url, issue_json in issues_from_github.items():
+        github_issue = existing_issues.get(issue_url)
+        github_repo = repos.get(GitHubRepo.url_for_issue_url(issue_url))
+
+        # See `github_sync_issue` for an explanation of these rules.
+        should_exist = (
+            issue_url in funded_issue_urls
+            or (github_repo != None and issue_json['state'] == 'open' and github_issue_has_sponsoredissues_label(issue_json))
+        )
+
+        fingerprint = GitHubIssue.fingerprint_for(issue_json, github_repo.id if github_repo else None)
+
+        if should_exist and not github_issue:
+            assert github_repo
+            github_issue = GitHubIssue(url=issue_url, data=issue_json, repo=github_repo, fingerprint=fingerprint)
+            github_issue.set_extracted_fields()
+            issues_to_create.append(github_issue)
+            results[issue_url] = SyncResult.ADDED
+            logger.info(f"added issue: {issue_url}")
+        elif should_exist and github_issue and github_issue.fingerprint == fingerprint:
+            results[issue_url] = SyncResult.UNCHANGED
+        elif should_exist and github_issue:
+            if issue_url in funded_issue_urls and github_issue.state != issue_json['state']:
+                state_changes[github_issue.id] = (github_issue.state, issue_json['state'])
+            github_issue.data = issue_json
+            github_issue.repo = github_repo
+            github_issue.fingerprint = fingerprint
+            github_issue.set_extracted_fields()
+            # `bulk_update` doesn't apply `auto_now`
+            github_issue.updated_at = now
+            issues_to_update.append(github_issue)
+            results[issue_url] = SyncResult.UPDATED
+            logger.info(f"updated issue: {issue_url}")
+        elif not should_exist and github_issue:
+            issue_urls_to_delete.add(issue_url)
+        else:
+            results[issue_url] = SyncResult.IGNORED
+
+    with transaction.atomic():
+        GitHubIssue.objects.bulk_create(issues_to_create)
+        GitHubIssue.objects.bulk_update(
+            issues_to_update,
+            ['data', 'repo', 'fingerprint', 'updated_at', *GitHubIssue.EXTRACTED_FIELDS],
+            batch_size=BULK_UPDATE_BATCH_SIZE
+        )
+        SiteStats.record_issue_state_changes(state_changes)
+
+        # Note: We filter on `sponsor_amounts__isnull=True` again here,
+        # in case an issue received funding since we checked above.
+        issues_to_delete = GitHubIssue.objects.filter(
+            url__in=issue_urls_to_delete,
+            sponsor_amounts__isnull=True
+        )
+        deleted_issue_urls = set(issues_to_delete.values_list('url', flat=True))
+        GitHubIssue.objects.filter(url__in=deleted_issue_urls).delete()
+
+    for issue_url in issue_urls_to_delete:
+        if issue_url in deleted_issue_urls:
+            results[issue_url] = SyncResult.REMOVED
+            if issue_url in issues_from_github:
+                logger.info(f"deleted issue: {issue_url} (issue closed or label removed, and issue does not have existing funding)")
+            else:
+                logger.info(f'removed issue {issue_url}')
+        elif issue_url in issues_from_github:
+            results[issue_url] = SyncResult.IGNORED
+
+    return results
@@ -0,0 +1,64 @@
+import jwt
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from sponsoredissues import github_app
+
+def _uncached_github_app_token(app_id, private_key):
+    """
+    Generate a GitHub App JWT the way that `github_app_token` used to:
+    parse the PEM key and sign a new JWT on every call.
+    """
+    private_key = private_key.replace('\\n', '\n')
+    now = int(time.time())
+    payload = {'iat': now - 60, 'exp': now + github_app.APP_TOKEN_LIFETIME, 'iss': str(app_id)}
+    return jwt.encode(payload, private_key.encode(), algorithm='RS256')
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark for `github_app_token`, comparing a cached JWT '
+        'against parsing the private key and signing a new JWT per call. '
+        'Uses a throwaway RSA key, so no GitHub credentials are needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='number of tokens to generate (default: 200)')
+
+    def _time(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # GitHub generates 2048-bit RSA keys for apps.
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        ).decode()
+        app_id = 12345
+
+        uncached = self._time(lambda: _uncached_github_app_token(app_id, pem), iterations)
+
+        with override_settings(GITHUB_APP_ID=app_id, GITHUB_APP_PRIVATE_KEY=pem):
+            saved = (github_app._app_private_key, github_app._app_token, github_app._app_token_expires_at)
+            github_app._app_private_key = None
+            github_app._app_token = None
+            github_app._app_token_expires_at = 0
+            try:
+                cached = self._time(github_app.github_app_token, iterations)
+            finally:
+                (github_app._app_private_key, github_app._app_token, github_app._app_token_expires_at) = saved
+
+        self.stdout.write(f'{iterations} iterations\n')
+        self.stdout.write(f'parse key + sign per call: {uncached * 1e6:10.1f} us/call\n')
+        self.stdout.write(f'github_app_token (cached): {cached * 1e6:10.1f} us/call\n')
+        self.stdout.write(f'speedup: {uncached / cached:.0f}x\n')
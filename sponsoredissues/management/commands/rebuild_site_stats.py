@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sponsoredissues.models import SiteStats
+
+class Command(BaseCommand):
+    help = 'Recompute the site-wide stats shown on the homepage from scratch'
+
+    def handle(self, *args, **kwargs):
+        stats = SiteStats.rebuild()
+        self.stdout.write(
+            f'Rebuilt site stats: total_funded_cents={stats.total_funded_cents} '
+            f'num_funded_repos={stats.num_funded_repos} '
+            f'num_resolved_issues={stats.num_resolved_issues} '
+            f'resolved_funded_cents={stats.resolved_funded_cents}\n')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from sponsoredissues.models import GitHubIssue
+
+class Command(BaseCommand):
+    help = 'Recompute the funding counters of issues that have drifted from their donations'
+
+    def handle(self, *args, **kwargs):
+        fixed_issue_urls = GitHubIssue.reconcile_funding()
+        for issue_url in fixed_issue_urls:
+            self.stdout.write(f'Fixed funding counters for issue: {issue_url}\n')
+        self.stdout.write(f'Reconciled funding counters ({len(fixed_issue_urls)} issues fixed)\n')
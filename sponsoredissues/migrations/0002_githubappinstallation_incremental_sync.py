@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='issues_full_sync_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='issues_updated_at_watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
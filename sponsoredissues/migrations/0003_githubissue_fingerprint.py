@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0002_githubappinstallation_incremental_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubissue',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
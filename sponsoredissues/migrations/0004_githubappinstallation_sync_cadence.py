@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0003_githubissue_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='last_webhook_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='sync_interval',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
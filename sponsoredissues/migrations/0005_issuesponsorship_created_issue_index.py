@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0004_githubappinstallation_sync_cadence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issuesponsorship',
+            index=models.Index(fields=['created_at', 'issue'], name='sponsorship_created_issue_idx'),
+        ),
+    ]
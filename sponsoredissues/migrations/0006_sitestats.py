@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0005_issuesponsorship_created_issue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_funded_cents', models.BigIntegerField(default=0)),
+                ('num_funded_repos', models.IntegerField(default=0)),
+                ('num_resolved_issues', models.IntegerField(default=0)),
+                ('resolved_funded_cents', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Site Stats',
+                'verbose_name_plural': 'Site Stats',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+
+def populate_funding_counters(apps, schema_editor):
+    # Note: Only funded issues need updating, since the counters
+    # default to zero.
+    GitHubIssue = apps.get_model('sponsoredissues', 'GitHubIssue')
+    IssueSponsorship = apps.get_model('sponsoredissues', 'IssueSponsorship')
+    sponsorships = IssueSponsorship.objects.filter(issue=OuterRef('pk')).order_by().values('issue')
+    GitHubIssue.objects.filter(sponsor_amounts__isnull=False).update(
+        total_cents=Subquery(sponsorships.annotate(total=Sum('cents_usd')).values('total')),
+        sponsor_count=Subquery(sponsorships.annotate(count=Count('id')).values('count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0006_sitestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubissue',
+            name='sponsor_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='total_cents',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='githubissue',
+            index=models.Index(fields=['-total_cents', '-created_at'], name='issue_total_cents_idx'),
+        ),
+        migrations.RunPython(populate_funding_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:03
+
+# Note: The indexes for these columns are created after the columns
+# are backfilled (see 0010_extracted_lookup_column_indexes).
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0007_githubissue_funding_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='githubappinstallation',
+            name='account_login',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='has_label',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='number',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='owner_login',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='repo_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='githubissue',
+            name='state',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='maintainer',
+            name='login',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:05
+
+from django.db import migrations, transaction
+
+# Number of rows to update per batch. Each batch is committed in its
+# own transaction, so that backfilling a large table doesn't hold
+# locks on all of its rows (or build one huge transaction) until the
+# end of the migration.
+BATCH_SIZE = 1000
+
+
+def backfill_in_batches(model, fields, extract):
+    """
+    Set `fields` of all rows of `model`, in batches ordered by primary
+    key. `extract(obj)` sets the fields of `obj` (without saving).
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+            if not batch:
+                return
+            for obj in batch:
+                extract(obj)
+            model.objects.bulk_update(batch, fields)
+        last_pk = batch[-1].pk
+
+
+# Note: These duplicate the extraction in the `save()` methods of the
+# models (e.g. `GitHubIssue.set_extracted_fields`), because
+# migrations can't use model methods.
+
+def extract_issue_fields(issue):
+    data = issue.data if isinstance(issue.data, dict) else {}
+    url_parts = issue.url.split('/')
+    issue.state = data.get('state') or ''
+    issue.number = data.get('number')
+    issue.owner_login = url_parts[3] if len(url_parts) > 3 else ''
+    issue.repo_name = url_parts[4] if len(url_parts) > 4 else ''
+    issue.has_label = any(
+        label.get('name') == 'sponsoredissues.org' for label in data.get('labels', [])
+    )
+
+
+def extract_maintainer_fields(maintainer):
+    user_json = maintainer.github_user_json if isinstance(maintainer.github_user_json, dict) else {}
+    maintainer.login = user_json.get('login', '')
+
+
+def extract_installation_fields(installation):
+    data = installation.data if isinstance(installation.data, dict) else {}
+    installation.account_login = data.get('account', {}).get('login', '')
+
+
+def backfill_extracted_lookup_columns(apps, schema_editor):
+    backfill_in_batches(
+        apps.get_model('sponsoredissues', 'GitHubIssue'),
+        ['state', 'number', 'owner_login', 'repo_name', 'has_label'],
+        extract_issue_fields,
+    )
+    backfill_in_batches(
+        apps.get_model('sponsoredissues', 'Maintainer'),
+        ['login'],
+        extract_maintainer_fields,
+    )
+    backfill_in_batches(
+        apps.get_model('sponsoredissues', 'GitHubAppInstallation'),
+        ['account_login'],
+        extract_installation_fields,
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Commit each batch separately (see `BATCH_SIZE`)
+    atomic = False
+
+    dependencies = [
+        ('sponsoredissues', '0008_extracted_lookup_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_extracted_lookup_columns, migrations.RunPython.noop),
+    ]
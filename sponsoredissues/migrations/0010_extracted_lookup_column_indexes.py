@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sponsoredissues', '0009_backfill_extracted_lookup_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='githubappinstallation',
+            name='account_login',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='maintainer',
+            name='login',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='githubissue',
+            index=models.Index(fields=['owner_login', 'state', '-total_cents', '-created_at'], name='issue_owner_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='githubissue',
+            index=models.Index(fields=['owner_login', 'repo_name'], name='issue_owner_repo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='githubissue',
+            index=models.Index(fields=['state', 'sponsor_count'], name='issue_state_sponsor_count_idx'),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+import hashlib
+import json
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_delete
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, pre_delete
 from django.dispatch import receiver
+from sponsoredissues.github_api import github_issue_has_sponsoredissues_label
 
 class Maintainer(models.Model):
     """
@@ -27,6 +32,19 @@ class Maintainer(models.Model):
     github_user_json = models.JSONField()
     github_sponsors_profile_url = models.URLField(null=True, max_length=500)
 
+    # GitHub username, extracted from `github_user_json` so that
+    # maintainers can be looked up by username with an index.
+    login = models.CharField(max_length=100, blank=True, default='', db_index=True)
+
+    def save(self, *args, **kwargs):
+        # Keep `login` in sync with `github_user_json`.
+        user_json = self.github_user_json if isinstance(self.github_user_json, dict) else {}
+        self.login = user_json.get('login', '')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'github_user_json' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'login'}
+        super().save(*args, **kwargs)
+
 class GitHubAppInstallationQuerySet(models.QuerySet):
     def delete(self):
         """
@@ -121,6 +139,31 @@ class GitHubAppInstallation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # GitHub username of the account that owns the installation,
+    # extracted from `data` so that installations can be looked up by
+    # username with an index.
+    account_login = models.CharField(max_length=100, blank=True, default='', db_index=True)
+
+    # High-water mark for incremental issue syncs: the latest GitHub
+    # `updated_at` time of any issue that we have synced for this
+    # installation. Routine syncs only query issues that were updated
+    # since this time (see `github_sync_app_installation_issues`).
+    issues_updated_at_watermark = models.DateTimeField(null=True, blank=True)
+
+    # Time of the last full (non-incremental) issue sync, which
+    # reconciles all issues in the database with GitHub.
+    issues_full_sync_at = models.DateTimeField(null=True, blank=True)
+
+    # Adaptive sync cadence (see `github_sync_interval()` in
+    # `github_sync.py`). The scheduler syncs installations once their
+    # `next_sync_at` has passed (or is NULL, i.e. never synced).
+    sync_interval = models.IntegerField(null=True, blank=True)
+    next_sync_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # Time of the last webhook event that we received for this
+    # installation.
+    last_webhook_at = models.DateTimeField(null=True, blank=True)
+
     objects = GitHubAppInstallationManager()
 
     def installation_id(self):
@@ -130,6 +173,15 @@ class GitHubAppInstallation(models.Model):
         """
         return int(self.url.split('/')[-1])
 
+    def save(self, *args, **kwargs):
+        # Keep `account_login` in sync with `data`.
+        data = self.data if isinstance(self.data, dict) else {}
+        self.account_login = data.get('account', {}).get('login', '')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'data' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'account_login'}
+        super().save(*args, **kwargs)
+
     def delete(self, *args, **kwargs):
         """
         Override `GitHubAppInstallation.delete()` method so that it
@@ -175,9 +227,18 @@ class GitHubRepo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @staticmethod
+    def url_for_issue_url(issue_url: str):
+        """
+        Return the repo URL for an issue URL (e.g.
+        https://github.com/owner/repo/issues/1 ->
+        https://github.com/owner/repo).
+        """
+        return '/'.join(issue_url.split('/')[:-2])
+
     @staticmethod
     def get_by_issue_url(issue_url: str):
-        repo_url = '/'.join(issue_url.split('/')[:-2])
+        repo_url = GitHubRepo.url_for_issue_url(issue_url)
         return GitHubRepo.objects.filter(url=repo_url).first()
 
 class GitHubIssue(models.Model):
@@ -231,18 +292,156 @@ class GitHubIssue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Hash of `data` and `repo`, which lets the GitHub sync skip
+    # writing issues that haven't changed (see `fingerprint_for()`).
+    fingerprint = models.CharField(max_length=64, blank=True, default='')
+
+    # Total funding of the issue in cents (USD), and the number of
+    # donations to it, denormalized from `IssueSponsorship`
+    # so that pages can show and sort issues by funding without
+    # aggregating over all donations.
+    #
+    # These are updated in the same transaction as the donations (see
+    # `IssueSponsorship.save` and `IssueSponsorship_post_delete`), and
+    # can be recomputed with `GitHubIssue.reconcile_funding` (or
+    # `python manage.py reconcile_issue_funding`).
+    #
+    # Note: Because the counters are updated with separate queries,
+    # code that saves a `GitHubIssue` it loaded earlier should use
+    # `update_fields`, so it doesn't overwrite them with stale values.
+    total_cents = models.IntegerField(default=0)
+    sponsor_count = models.IntegerField(default=0)
+
+    # Values extracted from `url` and `data`, so that the hot queries
+    # (e.g. the open issues of a maintainer) can filter on indexed
+    # columns rather than on JSON keys and URL prefixes. These are
+    # kept in sync by `set_extracted_fields()`.
+    state = models.CharField(max_length=20, blank=True, default='')
+    number = models.IntegerField(null=True)
+    owner_login = models.CharField(max_length=100, blank=True, default='')
+    repo_name = models.CharField(max_length=100, blank=True, default='')
+    has_label = models.BooleanField(default=False)
+
+    EXTRACTED_FIELDS = ['state', 'number', 'owner_login', 'repo_name', 'has_label']
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'GitHub Issue'
         verbose_name_plural = 'GitHub Issues'
+        indexes = [
+            models.Index(fields=['-total_cents', '-created_at'], name='issue_total_cents_idx'),
+            # Open issues of a maintainer, sorted by funding (see
+            # `owner_issues` in `views.py`)
+            models.Index(fields=['owner_login', 'state', '-total_cents', '-created_at'], name='issue_owner_state_idx'),
+            # Issues of a repo (see `GitHubIssue.get_by_repo_url`)
+            models.Index(fields=['owner_login', 'repo_name'], name='issue_owner_repo_idx'),
+            # Open funded issues (see `calculate_trending_issues` in
+            # `views.py`)
+            models.Index(fields=['state', 'sponsor_count'], name='issue_state_sponsor_count_idx'),
+        ]
+
+    @staticmethod
+    def fingerprint_for(data, repo_id):
+        """
+        Return the fingerprint for an issue with JSON data `data` that
+        belongs to the repo with ID `repo_id` (or `None`).
+
+        Writing an issue rewrites the whole `data` JSON value (including
+        the potentially large issue `body`), so the GitHub sync compares
+        fingerprints to skip writing issues where nothing has changed.
+        """
+        normalized_data = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f'{repo_id}:{normalized_data}'.encode()).hexdigest()
+
+    def set_extracted_fields(self):
+        """
+        Set the fields that are extracted from `url` and `data` (see
+        `EXTRACTED_FIELDS`), without saving.
+        """
+        data = self.data if isinstance(self.data, dict) else {}
+        url_parts = self.url.split('/')
+        self.state = data.get('state') or ''
+        self.number = data.get('number')
+        self.owner_login = url_parts[3] if len(url_parts) > 3 else ''
+        self.repo_name = url_parts[4] if len(url_parts) > 4 else ''
+        self.has_label = github_issue_has_sponsoredissues_label(data)
+
+    def save(self, *args, **kwargs):
+        # Keep the fingerprint and the extracted fields in sync with
+        # `url`, `data` and `repo`.
+        #
+        # Note: `save()` is not called by `bulk_create`/`bulk_update`,
+        # so code that uses those must set these fields itself.
+        self.fingerprint = GitHubIssue.fingerprint_for(self.data, self.repo_id)
+        self.set_extracted_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if 'data' in update_fields or 'repo' in update_fields:
+                update_fields = {*update_fields, 'fingerprint'}
+            if 'data' in update_fields or 'url' in update_fields:
+                update_fields = {*update_fields, *GitHubIssue.EXTRACTED_FIELDS}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     @staticmethod
     def get_by_repo_url(repo_url):
-        return GitHubIssue.objects.filter(url__startswith=f'{repo_url}/')
+        owner_login, repo_name = repo_url.split('/')[3:5]
+        return GitHubIssue.objects.filter(owner_login=owner_login, repo_name=repo_name)
 
     def __str__(self):
         return self.url
 
+    @staticmethod
+    def update_funding(issue_id, cents_delta, sponsor_count_delta):
+        """
+        Add `cents_delta` and `sponsor_count_delta` to the funding
+        counters of the issue with ID `issue_id`, and update the site
+        stats to match (see `SiteStats.record_donation_change`).
+
+        Should be called in the same transaction as the change.
+        """
+        GitHubIssue.objects.filter(pk=issue_id).update(
+            total_cents=models.F('total_cents') + cents_delta,
+            sponsor_count=models.F('sponsor_count') + sponsor_count_delta,
+        )
+        # Note: The update above locks the issue row until the end of
+        # the transaction, so concurrent donations to the same issue
+        # can't both see it become funded (or unfunded).
+        issue = GitHubIssue.objects.only('url', 'state', 'owner_login', 'repo_name', 'sponsor_count').get(pk=issue_id)
+        SiteStats.record_donation_change(
+            issue,
+            cents_delta,
+            was_funded=issue.sponsor_count - sponsor_count_delta > 0,
+            is_funded=issue.sponsor_count > 0,
+        )
+
+    @staticmethod
+    def reconcile_funding():
+        """
+        Recompute the funding counters (`total_cents`,
+        `sponsor_count`) of all issues whose counters don't match their
+        donations. Returns the URLs of the issues that were fixed.
+        """
+        sponsorships = IssueSponsorship.objects.filter(issue=models.OuterRef('pk')).order_by().values('issue')
+        actual_total_cents = Coalesce(
+            models.Subquery(sponsorships.annotate(total=models.Sum('cents_usd')).values('total')), 0)
+        actual_sponsor_count = Coalesce(
+            models.Subquery(sponsorships.annotate(count=models.Count('id')).values('count')), 0)
+
+        with transaction.atomic():
+            mismatched_issues = dict(
+                GitHubIssue.objects
+                .select_for_update()
+                .annotate(actual_total_cents=actual_total_cents, actual_sponsor_count=actual_sponsor_count)
+                .exclude(total_cents=models.F('actual_total_cents'), sponsor_count=models.F('actual_sponsor_count'))
+                .values_list('pk', 'url')
+            )
+            GitHubIssue.objects.filter(pk__in=mismatched_issues.keys()).update(
+                total_cents=actual_total_cents,
+                sponsor_count=actual_sponsor_count,
+            )
+        return sorted(mismatched_issues.values())
+
     def delete_force(self):
         """
         Delete this issue from the database, along with its associated
@@ -256,8 +455,11 @@ class GitHubIssue(models.Model):
         any), e.g.  when the maintainer clicks the red `Delete issue`
         link in the bottom right corner of the GitHub issue page.
         """
-        IssueSponsorship.objects.filter(issue=self).delete()
-        self.delete()
+        with transaction.atomic():
+            # Note: Deleting the donations also updates the site stats
+            # (see `IssueSponsorship_post_delete`).
+            IssueSponsorship.objects.filter(issue=self).delete()
+            self.delete()
 
     def is_funded(self):
         """
@@ -278,6 +480,11 @@ class IssueSponsorship(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Sponsor Amount'
         verbose_name_plural = 'Sponsor Amounts'
+        # Supports queries for recent donations, e.g. trending issues
+        # (see `calculate_trending_issues` in `views.py`).
+        indexes = [
+            models.Index(fields=['created_at', 'issue'], name='sponsorship_created_issue_idx'),
+        ]
         # Don't allow zero amounts. We often want to get the subset
         # of issues that have non-zero funding, and this constraint
         # makes that query simpler and more efficient.
@@ -289,4 +496,185 @@ class IssueSponsorship(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.cents_usd} from {self.sponsor.username} for {self.issue.url}"
\ No newline at end of file
+        return f"{self.cents_usd} from {self.sponsor.username} for {self.issue.url}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the saved amount, so that `save` can update the
+        # funding counters of the issue by the difference.
+        instance._saved_cents_usd = instance.__dict__.get('cents_usd')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the funding counters of the issue (see
+        # `GitHubIssue.total_cents`) and the site stats in sync.
+        with transaction.atomic():
+            adding = self._state.adding
+            if not adding and getattr(self, '_saved_cents_usd', None) is None:
+                self._saved_cents_usd = IssueSponsorship.objects.filter(pk=self.pk).values_list('cents_usd', flat=True).get()
+            super().save(*args, **kwargs)
+            if adding:
+                GitHubIssue.update_funding(self.issue_id, self.cents_usd, 1)
+            elif self.cents_usd != self._saved_cents_usd:
+                GitHubIssue.update_funding(self.issue_id, self.cents_usd - self._saved_cents_usd, 0)
+            self._saved_cents_usd = self.cents_usd
+
+@receiver(post_delete, sender=IssueSponsorship)
+def IssueSponsorship_post_delete(sender, instance, **kwargs):
+    """
+    Keep the funding counters of the issue and the site stats in sync
+    when a donation is deleted, including bulk deletes (e.g.
+    `GitHubIssue.delete_force`) and deletes that cascade from deleting
+    a user.
+    """
+    GitHubIssue.update_funding(instance.issue_id, -instance.cents_usd, -1)
+
+class SiteStats(models.Model):
+    """
+    Site-wide funding stats that are shown on the homepage.
+
+    There is only one row in this table (see `SiteStats.get`). Rather
+    than computing the stats from all funded issues for every page
+    view, the row is updated incrementally whenever the funding of an
+    issue changes (`record_donation_change`, called for every saved or
+    deleted `IssueSponsorship` via `GitHubIssue.update_funding`), or a
+    funded issue is closed/reopened (`record_issue_state_changes`).
+
+    The stats can be rebuilt from scratch with `SiteStats.rebuild`
+    (or `python manage.py rebuild_site_stats`), e.g. in case they
+    have drifted because sponsorships were changed with queries that
+    bypass the model (such as `QuerySet.update`).
+    """
+    # Total funding of all issues, in cents (USD)
+    total_funded_cents = models.BigIntegerField(default=0)
+    # Number of repos with one or more funded issues
+    num_funded_repos = models.IntegerField(default=0)
+    # Number of funded issues that are closed
+    num_resolved_issues = models.IntegerField(default=0)
+    # Total funding of the closed issues, in cents (USD)
+    resolved_funded_cents = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SINGLETON_ID = 1
+
+    class Meta:
+        verbose_name = 'Site Stats'
+        verbose_name_plural = 'Site Stats'
+
+    def avg_resolved_cents(self):
+        if self.num_resolved_issues == 0:
+            return 0
+        return self.resolved_funded_cents // self.num_resolved_issues
+
+    @classmethod
+    def get(cls):
+        """
+        Return the site stats, building them first if they don't exist
+        yet (e.g. right after the table was created).
+        """
+        stats = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        return stats if stats else cls.rebuild()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute the site stats from scratch.
+        """
+        funded_issues = GitHubIssue.objects.filter(sponsor_amounts__isnull=False).order_by()
+        with transaction.atomic():
+            resolved = funded_issues.filter(state='closed').aggregate(
+                num_issues=models.Count('id', distinct=True),
+                total_cents=models.Sum('sponsor_amounts__cents_usd'),
+            )
+            stats, _ = cls.objects.update_or_create(
+                pk=cls.SINGLETON_ID,
+                defaults={
+                    'total_funded_cents': IssueSponsorship.objects.aggregate(total=models.Sum('cents_usd'))['total'] or 0,
+                    'num_funded_repos': funded_issues.values('owner_login', 'repo_name').distinct().count(),
+                    'num_resolved_issues': resolved['num_issues'],
+                    'resolved_funded_cents': resolved['total_cents'] or 0,
+                },
+            )
+        return stats
+
+    @classmethod
+    def record_donation_change(cls, issue, cents_delta, was_funded, is_funded):
+        """
+        Update the site stats after the total funding of `issue`
+        changed by `cents_delta`. `was_funded` and `is_funded` tell
+        whether the issue had any funding before/after the change.
+
+        Should be called in the same transaction as the change.
+        """
+        if cents_delta == 0 and was_funded == is_funded:
+            return
+
+        updates = {'total_funded_cents': models.F('total_funded_cents') + cents_delta}
+
+        if issue.state == 'closed':
+            updates['resolved_funded_cents'] = models.F('resolved_funded_cents') + cents_delta
+            if was_funded != is_funded:
+                updates['num_resolved_issues'] = models.F('num_resolved_issues') + (1 if is_funded else -1)
+
+        # The repo of the issue starts/stops counting as funded if this
+        # is its first/last funded issue.
+        #
+        # Note: We lock the stats row before checking for other funded
+        # issues, so that concurrent first (or last) donations to
+        # different issues in the same repo are serialized, and only
+        # one of them sees no other funded issues. The issue counters
+        # were updated (and committed, for the other transaction)
+        # before the lock, so the check uses `sponsor_count`.
+        with transaction.atomic():
+            if was_funded != is_funded:
+                list(cls.objects.select_for_update().filter(pk=cls.SINGLETON_ID).values_list('pk', flat=True))
+                other_funded_issues = GitHubIssue.objects.filter(
+                    owner_login=issue.owner_login,
+                    repo_name=issue.repo_name,
+                    sponsor_count__gt=0,
+                ).exclude(pk=issue.pk)
+                if not other_funded_issues.exists():
+                    updates['num_funded_repos'] = models.F('num_funded_repos') + (1 if is_funded else -1)
+
+            cls._update(updates)
+
+    @classmethod
+    def record_issue_state_changes(cls, state_changes):
+        """
+        Update the site stats after funded issues were closed or
+        reopened.
+
+        `state_changes` maps issue ID -> (old state, new state).
+        Issues without funding are ignored.
+        """
+        closed_ids = [id for id, (old, new) in state_changes.items() if old != 'closed' and new == 'closed']
+        reopened_ids = [id for id, (old, new) in state_changes.items() if old == 'closed' and new != 'closed']
+        if not closed_ids and not reopened_ids:
+            return
+
+        totals = dict(
+            IssueSponsorship.objects
+            .filter(issue_id__in=closed_ids + reopened_ids)
+            .order_by()
+            .values_list('issue_id')
+            .annotate(total=models.Sum('cents_usd'))
+        )
+        closed_cents = sum(totals.get(id, 0) for id in closed_ids)
+        reopened_cents = sum(totals.get(id, 0) for id in reopened_ids)
+        num_closed = sum(1 for id in closed_ids if id in totals)
+        num_reopened = sum(1 for id in reopened_ids if id in totals)
+        if num_closed == 0 and num_reopened == 0:
+            return
+
+        cls._update({
+            'num_resolved_issues': models.F('num_resolved_issues') + num_closed - num_reopened,
+            'resolved_funded_cents': models.F('resolved_funded_cents') + closed_cents - reopened_cents,
+        })
+
+    @classmethod
+    def _update(cls, updates):
+        # Note: If the stats don't exist yet, there's nothing to
+        # update. They will include this change when they are built.
+        cls.objects.filter(pk=cls.SINGLETON_ID).update(**updates)
+
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from django.core.management.utils import get_random_secret_key
 from pathlib import Path
+from kombu import Queue
 import dj_database_url
 import os
 
@@ -53,6 +54,25 @@ def env_str(env_var_name, default=None, required=True):
         raise RuntimeError(f'required environment variable not set: {env_var_name}')
     return string_value
 
+def env_int(env_var_name, default=None, required=True):
+    """
+    Read and parse an environment variable as an integer.
+    """
+    if default is not None and not type(default) is int:
+        raise RuntimeError(f'default value for `{env_var_name}` must be `None` or int')
+    string_value = os.getenv(env_var_name)
+    if string_value:
+        try:
+            return int(string_value)
+        except ValueError:
+            raise RuntimeError(f'environment variable `{env_var_name}` must be an integer, got: {string_value!r}')
+    elif default is not None:
+        return default
+    elif required:
+        raise RuntimeError(f'required environment variable not set: `{env_var_name}`')
+    else:
+        return
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -119,6 +139,102 @@ SOCIALACCOUNT_PROVIDERS = {
 GITHUB_APP_ID = env_str('GITHUB_APP_ID')
 GITHUB_APP_PRIVATE_KEY = env_str('GITHUB_APP_PRIVATE_KEY')
 
+# Maximum number of pooled keep-alive connections per host for
+# GitHub HTTP traffic (see `github_session()` in `github_api.py`).
+#
+# All GitHub API requests made by a process share one connection
+# pool, so that we don't pay for a new TCP/TLS handshake with
+# api.github.com on every request. The pool size should be at least
+# as large as the number of threads in a process that talk to GitHub
+# concurrently, otherwise surplus connections are opened and then
+# discarded instead of being reused.
+GITHUB_HTTP_POOL_SIZE = env_int('GITHUB_HTTP_POOL_SIZE', default=10)
+
+# GitHub API rate limiting (see `github_rate_limit.py`).
+#
+# `GITHUB_RATE_LIMIT_RESERVE` is the number of requests that we leave
+# unused in each rate limit budget, as a safety margin for requests
+# that are not rate limited by us (e.g. requests made while loading
+# a page in the webserver).
+#
+# `GITHUB_RATE_LIMIT_MAX_WAIT` is the maximum number of seconds that
+# we will wait for GitHub to reset a used-up budget. If the reset is
+# further away than that, the request fails with
+# `GitHubRateLimitError` instead, so that we don't block a Celery
+# worker for up to an hour.
+GITHUB_RATE_LIMIT_RESERVE = env_int('GITHUB_RATE_LIMIT_RESERVE', default=10)
+GITHUB_RATE_LIMIT_MAX_WAIT = env_int('GITHUB_RATE_LIMIT_MAX_WAIT', default=60)
+
+# How long to keep GitHub REST API responses in the conditional
+# request cache, in seconds (see `_github_api_get()` in
+# `github_api.py`).
+#
+# Cached responses are revalidated with GitHub (via `If-None-Match`)
+# every time they are used, so this only limits how long we hold
+# on to responses for URLs that we stop requesting.
+GITHUB_ETAG_CACHE_TTL = env_int('GITHUB_ETAG_CACHE_TTL', default=60 * 60 * 24 * 7)
+
+# Maximum number of GitHub API requests that a single operation sends
+# concurrently (e.g. when fetching the pages of a paginated REST API
+# response, see `github_parallel_map()` in `github_api.py`).
+#
+# This should not be larger than `GITHUB_HTTP_POOL_SIZE`, otherwise
+# some of the concurrent requests can't reuse pooled connections.
+GITHUB_API_MAX_WORKERS = env_int('GITHUB_API_MAX_WORKERS', default=4)
+
+# How installation syncs find the issues with the "sponsoredissues.org"
+# label (see `github_app_installation_query_issues_with_sponsoredissues_label()`
+# in `github_app.py`):
+#
+# 'search': Use GitHub issue search. This only touches the labeled
+# issues, regardless of how many repos the maintainer has. Falls back
+# to 'repos' when there are more results than GitHub search can
+# return.
+#
+# 'repos': Walk all of the maintainer's public repos, and query the
+# labeled issues in each repo.
+GITHUB_ISSUE_DISCOVERY = env_str('GITHUB_ISSUE_DISCOVERY', default='search')
+if GITHUB_ISSUE_DISCOVERY not in ('search', 'repos'):
+    raise RuntimeError(f'GITHUB_ISSUE_DISCOVERY must be "search" or "repos" (got "{GITHUB_ISSUE_DISCOVERY}")')
+
+# Minimum time (in seconds) between full issue syncs of an app
+# installation (default: 6 hours).
+#
+# Routine installation syncs are incremental: they only fetch issues
+# that were updated on GitHub since the last sync. A full sync
+# re-fetches all labeled and funded issues, which also catches changes
+# that an incremental sync can't see, such as deleted issues or a
+# removed "sponsoredissues.org" label.
+GITHUB_SYNC_FULL_INTERVAL = env_int('GITHUB_SYNC_FULL_INTERVAL', default=60 * 60 * 6)
+
+# Scheduling of routine installation syncs (see
+# `task_sync_github_app_installation_least_recently_updated` in
+# `tasks.py`).
+#
+# `GITHUB_SYNC_MAX_IN_FLIGHT` is the maximum number of installation
+# sync tasks that the scheduler keeps queued or running at once,
+# across all Celery workers (default: 8). Raise this when adding
+# Celery workers.
+#
+# `GITHUB_SYNC_DISPATCH_BATCH_SIZE` is the maximum number of sync
+# tasks that the scheduler enqueues per iteration, starting with the
+# installations that were synced least recently (default: 8).
+GITHUB_SYNC_MAX_IN_FLIGHT = env_int('GITHUB_SYNC_MAX_IN_FLIGHT', default=8)
+GITHUB_SYNC_DISPATCH_BATCH_SIZE = env_int('GITHUB_SYNC_DISPATCH_BATCH_SIZE', default=8)
+
+# Adaptive sync cadence for app installations (see
+# `github_sync_interval()` in `github_sync.py`), in seconds.
+#
+# Installations where the last sync found changes are synced again
+# after `GITHUB_SYNC_MIN_INTERVAL` (default: 5 minutes). Each sync that
+# finds no changes doubles the interval, up to
+# `GITHUB_SYNC_MAX_INTERVAL` (default: 6 hours). Installations with
+# funded open issues or recent webhook activity are synced at least
+# every `GITHUB_SYNC_ACTIVE_INTERVAL` (default: 30 minutes).
+GITHUB_SYNC_MIN_INTERVAL = env_int('GITHUB_SYNC_MIN_INTERVAL', default=60 * 5)
+GITHUB_SYNC_MAX_INTERVAL = env_int('GITHUB_SYNC_MAX_INTERVAL', default=60 * 60 * 6)
+GITHUB_SYNC_ACTIVE_INTERVAL = env_int('GITHUB_SYNC_ACTIVE_INTERVAL', default=60 * 30)
+
 # For authenticating webhook notifications from GitHub
 GITHUB_WEBHOOK_SECRET = env_str('GITHUB_WEBHOOK_SECRET')
 
@@ -290,7 +406,7 @@ LOGGING = {
 #
 # For local Redis on standard port, use `redis://localhost`.
 #
-# Redis is required for two purposes:
+# Redis is required for the following purposes:
 #
 # (1) We use Redis as the message queue for Celery background jobs
 # (see `CELERY_BROKER_URL` below).
@@ -299,16 +415,44 @@ LOGGING = {
 # `sponsoredissues/tasks.py` (via `redis-py` package). Distributed
 # locks are used to ensure that two Celery tasks don't try to modify
 # the same GitHub App installation in the database simultaneously.
+#
+# (3) We use Redis to share the GitHub API rate limit budget between
+# all processes (see `sponsoredissues/github_rate_limit.py`).
 
 REDIS_URL = env_str('REDIS_URL')
 
 # Celery settings
 #
-# Note: The only reason I'm configuring `CELERY_RESULT_BACKEND` here
-# is because a results backend is required in order to use a `chord`
-# (task group) in `task_sync_github_app_installations_new_and_removed`
-# (in `tasks.py`). Otherwise, I'm not using the results backend for
-# anything.
+# Note: We don't configure a result backend (`CELERY_RESULT_BACKEND`),
+# because none of our tasks return results. Waiting for a group of
+# tasks to complete is done with counters in Redis instead (see
+# `task_barrier_arrive` in `tasks.py`).
 
 CELERY_BROKER_URL = REDIS_URL
-CELERY_RESULT_BACKEND = REDIS_URL
+
+# Celery queues
+#
+# Tasks are routed to one of two queues (see `TASK_QUEUE_*` in
+# `tasks.py`):
+#
+# (1) `webhook`: user-facing syncs, e.g. after a maintainer installs
+# the app or changes its repos.
+#
+# (2) `sweep`: the background sweeps that keep all installations up
+# to date.
+#
+# By default, a worker consumes both queues, and always drains the
+# `webhook` queue first (`queue_order_strategy`). To give webhooks
+# dedicated capacity, run separate worker pools for each queue, e.g.:
+#
+#   celery -A sponsoredissues worker -Q webhook
+#   celery -A sponsoredissues worker -Q sweep
+#
+# Workers only prefetch one message per process, so that queued
+# webhook syncs aren't held back by sweep tasks that a busy worker
+# has already reserved.
+
+CELERY_TASK_QUEUES = (Queue('webhook'), Queue('sweep'))
+CELERY_TASK_DEFAULT_QUEUE = 'sweep'
+CELERY_BROKER_TRANSPORT_OPTIONS = {'queue_order_strategy': 'priority'}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
@@ -1,15 +1,19 @@
-import logging
+import random
 import redis
+import threading
 import time
+import uuid
 
 from contextlib import contextmanager
-from celery import chord
 from celery.utils.log import get_task_logger
 from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F, Q
+from django.utils import timezone
 from sponsoredissues.celery import app
-from sponsoredissues.github_api import github_api
+from sponsoredissues.github_api import github_api_items
 from sponsoredissues.github_app import github_app_token
-from sponsoredissues.github_sync import github_sync_app_installation, github_sync_app_installation_remove
+from sponsoredissues.github_sync import github_sync_app_installation, github_sync_app_installation_record_failure, github_sync_app_installation_remove
 from sponsoredissues.models import GitHubAppInstallation
 from typing import Any
 
@@ -31,16 +35,93 @@ TASK_SOFT_TIME_LIMIT = 60 * 5
 # (1) There is no available work to do (e.g. no GitHub App
 # installations in database)
 # (2) Another task is holding the lock that we need
-# (3) An unexpected error occurred (e.g. GitHub API outage)
+#
+# Unexpected errors (e.g. GitHub API outage) are retried with an
+# exponential backoff instead (see `task_retry_countdown`).
 TASK_WAIT_RETRY_TIME = 60 * 5
 
-# Default timeout for app installation locks (Redis-based distributed
-# locks).
+# Exponential backoff for retrying a task after an unexpected error,
+# in seconds.
+#
+# The first retry happens after roughly `TASK_RETRY_BACKOFF_BASE`
+# seconds, and the delay doubles after every consecutive failure, up
+# to `TASK_RETRY_BACKOFF_MAX`. The delays are jittered, so that the
+# tasks that failed together (e.g. during a GitHub outage) don't all
+# retry at the same time.
+TASK_RETRY_BACKOFF_BASE = 30
+TASK_RETRY_BACKOFF_MAX = 60 * 30
+
+# Maximum number of times a sync task is retried after an unexpected
+# error. After that, the installation is left to the scheduler.
+TASK_SYNC_MAX_RETRIES = 6
+
+# Time after which a per-installation failure counter is forgotten,
+# in seconds. The counter is also reset after every successful sync.
+TASK_SYNC_FAILURES_TIMEOUT = 60 * 60 * 24
+
+# Timeout for app installation locks (Redis-based distributed
+# locks), in seconds.
+#
+# While a task holds a lock, a heartbeat thread renews the lock every
+# `TASK_LOCK_RENEW_INTERVAL` seconds (see `task_lock_heartbeat`), so
+# that long-running syncs of big installations keep their lock. The
+# timeout only takes effect when the heartbeat stops, e.g. because
+# the Celery worker process crashed while holding the lock, so we
+# keep it short to quickly recover from crashes.
+TASK_LOCK_TIMEOUT = 30
+TASK_LOCK_RENEW_INTERVAL = TASK_LOCK_TIMEOUT / 3
+
+# Redis sorted set of installation URLs that have a scheduled sync
+# task in flight (queued, running, or waiting to be retried), scored
+# by the time the task was enqueued, or by the time its retry is due.
+TASK_IN_FLIGHT_KEY = 'sync:in_flight'
+
+# Time after which an in-flight sync task is presumed lost (e.g. the
+# worker crashed), in seconds. This should be comfortably longer than
+# the time a sync task can spend waiting in the queue plus
+# `TASK_SOFT_TIME_LIMIT`.
+TASK_IN_FLIGHT_TIMEOUT = 60 * 30
+
+# Delay between scheduler iterations, in seconds.
+#
+# `TASK_DISPATCH_INTERVAL` is used when the previous iteration
+# enqueued some syncs, and `TASK_DISPATCH_IDLE_TIME` is used when
+# there was nothing to enqueue (e.g. because the maximum number of
+# syncs are already in flight).
+TASK_DISPATCH_INTERVAL = 5
+TASK_DISPATCH_IDLE_TIME = 30
+
+# Delay before starting a sync that was requested by a webhook, in
+# seconds. Further requests for the same installation within this
+# time are coalesced into the same sync (see
+# `task_sync_github_app_installation_debounced`).
+TASK_DEBOUNCE_TIME = 30
+
+# Time to wait for the syncs of new installations enqueued by
+# `task_sync_github_app_installations_new_and_removed` to complete,
+# before starting the next iteration anyway, in seconds. This covers
+# a sync that has stalled (e.g. stuck in a retry loop) or was lost,
+# and should be comfortably longer than a sync with all its retries
+# normally takes.
+TASK_FAN_OUT_TIMEOUT = 60 * 30
+
+# Celery queues (see `CELERY_TASK_QUEUES` in `settings.py`).
+#
+# User-facing work (e.g. syncing an installation after a webhook, or
+# a new installation) goes to `TASK_QUEUE_WEBHOOK`, and the
+# background sweeps go to `TASK_QUEUE_SWEEP`, so that a new
+# maintainer never waits behind a long sweep.
+TASK_QUEUE_WEBHOOK = 'webhook'
+TASK_QUEUE_SWEEP = 'sweep'
+
+# Message priorities within a queue. With the Redis broker, lower
+# numbers are consumed first.
 #
-# The lock timeout handles the case where the Celery worker processes
-# crash while still holding on to their locks, which should
-# (hopefully) be a rare occurrence.
-TASK_LOCK_TIMEOUT = 60 * 60
+# The sweep loops (scheduler, new/removed installations) use
+# `TASK_PRIORITY_HIGH`, so that they are never stuck behind the
+# routine syncs that they enqueue with `TASK_PRIORITY_LOW`.
+TASK_PRIORITY_HIGH = 0
+TASK_PRIORITY_LOW = 6
 
 redis_client = redis.Redis.from_url(url=settings.REDIS_URL, decode_responses=True)
 
@@ -53,98 +134,498 @@ def task_debug(self):
 @contextmanager
 def task_app_installation_lock_acquire(installation_url: str, **kwargs):
     lock_params: dict[str, Any] = {
-        'timeout': TASK_LOCK_TIMEOUT
+        'timeout': TASK_LOCK_TIMEOUT,
+        # The lock is renewed from the heartbeat thread, so the lock
+        # token must be shared between threads.
+        'thread_local': False,
     }
     lock_params.update(kwargs)
     lock = redis_client.lock(name=f'lock:{installation_url}', **lock_params)
 
+    wait_started_at = time.monotonic()
     acquired = lock.acquire()
+    acquired_at = time.monotonic()
     if not acquired:
+        logger.info(f'lock metrics: name={lock.name} acquired=false wait={acquired_at - wait_started_at:.3f}s')
         yield lock
         return
 
     # Lock successfully acquired
 
-    exception = False
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(
+        target=task_lock_heartbeat,
+        args=(lock, stop_heartbeat),
+        name=f'heartbeat:{lock.name}',
+        daemon=True)
+    heartbeat.start()
+
     try:
         # Note: The body of the `with` block is executed here,
         # and any exceptions that occur will be raised here.
         # See excellent explanation of control flow at:
         # https://docs.python.org/3/library/contextlib.html#contextlib.contextmanager
+        #
+        # Exceptions are passed on to the caller, which decides
+        # whether/when to retry (see `task_retry_countdown`).
         yield lock
-    except:
-        logging.exception('unexpected exception during lock-protected operation')
-        exception = True
     finally:
-        lock.release()
+        stop_heartbeat.set()
+        heartbeat.join()
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # The heartbeat failed to renew the lock in time (e.g.
+            # Redis was unreachable), and it expired. There's nothing
+            # left to release.
+            logger.exception(f'failed to release lock {lock.name}')
+        logger.info(f'lock metrics: name={lock.name} acquired=true wait={acquired_at - wait_started_at:.3f}s hold={time.monotonic() - acquired_at:.3f}s')
+
+def task_lock_heartbeat(lock, stop: threading.Event):
+    """
+    Renew `lock` every `TASK_LOCK_RENEW_INTERVAL` seconds, until `stop`
+    is set.
+
+    Runs in a background thread while a task is holding `lock`.
+    """
+    while not stop.wait(TASK_LOCK_RENEW_INTERVAL):
+        try:
+            lock.reacquire()
+        except redis.exceptions.LockNotOwnedError:
+            logger.error(f'lost lock {lock.name} (expired before it could be renewed)')
+            return
+        except redis.RedisError:
+            # Keep trying: the lock is still ours until it expires.
+            logger.exception(f'failed to renew lock {lock.name}')
+
+def task_retry_countdown(failures: int):
+    """
+    Return the delay in seconds before retrying a task that has failed
+    `failures` times in a row, using exponential backoff with jitter.
+
+    The delay is drawn uniformly from the upper half of the backoff
+    interval, so that retries are spread out, but never retry much
+    sooner than the backoff suggests.
+    """
+    backoff = min(TASK_RETRY_BACKOFF_BASE * 2 ** max(failures - 1, 0), TASK_RETRY_BACKOFF_MAX)
+    return random.uniform(backoff / 2, backoff)
+
+@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT,
+          queue=TASK_QUEUE_WEBHOOK, priority=TASK_PRIORITY_HIGH)
+def task_sync_github_app_installation(self, installation_id: int, scheduled: bool = False, debounced: bool = False, barrier: str | None = None):
+    """
+    Sync a single app installation with GitHub.
 
-    if exception:
-        task_sleep_after_unexpected_exception()
+    `scheduled` is True if the task was enqueued by the scheduler
+    (`task_sync_github_app_installation_least_recently_updated`), and
+    `debounced` is True if the task was enqueued by
+    `task_sync_github_app_installation_debounced` (e.g. for a webhook).
 
-@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT)
-def task_sync_github_app_installation(self, installation_id: int):
+    `barrier` is the key of the completion barrier to arrive at when
+    the task is done (see `task_barrier_arrive`), if the task was
+    enqueued by `task_sync_github_app_installations_new_and_removed`.
+    """
     installation_url = f'https://github.com/settings/installations/{installation_id}'
-    with task_app_installation_lock_acquire(installation_url, blocking=False) as lock:
-        if lock.owned():
-            github_sync_app_installation(installation_id)
-        else:
-            logger.info(f'postponing sync of installation {installation_url}: failed to acquire lock (will retry in {TASK_WAIT_RETRY_TIME} seconds)')
-            self.apply_async(countdown=TASK_WAIT_RETRY_TIME)
-
-def task_sleep_after_unexpected_exception():
-    seconds = 600
-    logger.info(f'sleeping for {seconds} seconds before continuing')
-    time.sleep(seconds)
-
-@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT)
-def task_sync_github_app_installation_least_recently_updated(self):
-    installations = GitHubAppInstallation.objects.all().order_by("updated_at")
-    logger.info(f'database contains {installations.count()} app installations')
 
-    did_work = False
-    for installation in installations:
-        with task_app_installation_lock_acquire(installation.url, blocking=False) as lock:
+    if debounced:
+        # Any triggers from now on need another sync, because this sync
+        # may have already read the data that they changed.
+        task_redis_delete(task_sync_pending_key(installation_id))
+
+    synced = False
+    retry_countdown = None
+    postponed = False
+    try:
+        with task_app_installation_lock_acquire(installation_url, blocking=False) as lock:
             if lock.owned():
-                did_work = True
-                github_sync_app_installation(installation.installation_id())
+                try:
+                    github_sync_app_installation(installation_id)
+                except Exception:
+                    # Note: This includes `SoftTimeLimitExceeded`.
+                    retry_countdown = task_sync_failed(self, installation_id)
+                else:
+                    synced = True
+                    task_sync_failures_reset(installation_id)
+            elif scheduled:
+                # Somebody else (e.g. a webhook) is already syncing this
+                # installation, so there's no need to retry.
+                logger.info(f'skipped scheduled sync of installation {installation_url}: failed to acquire lock')
+            elif debounced:
+                # Another sync is running, which may miss the changes
+                # that triggered this sync. Mark the installation as
+                # dirty, so that the running sync triggers one
+                # follow-up sync when it is done.
+                logger.info(f'installation {installation_url} is already being synced, marking it dirty')
+                task_sync_mark_dirty(installation_id, lock)
             else:
-                logger.info(f'skipped sync of app installation {installation.url}: failed to acquire lock')
+                logger.info(f'postponing sync of installation {installation_url}: failed to acquire lock (will retry in {TASK_WAIT_RETRY_TIME} seconds)')
+                # Note: We don't use `self.retry()` here, because
+                # postponing isn't a failure and shouldn't count towards
+                # `TASK_SYNC_MAX_RETRIES`. Instead, we re-send the task
+                # with the queue and priority that it was originally
+                # sent with, so that e.g. a postponed webhook sync
+                # doesn't end up behind the routine syncs.
+                delivery_info = self.request.delivery_info or {}
+                options = {
+                    'queue': delivery_info.get('routing_key'),
+                    'priority': delivery_info.get('priority'),
+                }
+                self.apply_async(
+                    args=[installation_id],
+                    kwargs={'barrier': barrier},
+                    countdown=TASK_WAIT_RETRY_TIME,
+                    **{key: value for key, value in options.items() if value is not None})
+                postponed = True
+    finally:
+        if retry_countdown is not None:
+            # A scheduled sync stays in flight while it's waiting to be
+            # retried, so that the scheduler doesn't enqueue it again.
+            # The retry can be further away than
+            # `TASK_IN_FLIGHT_TIMEOUT`, so we move the entry forward to
+            # when the retry is due.
+            if scheduled:
+                task_in_flight_postpone(installation_url, retry_countdown)
+        elif not postponed:
+            if scheduled:
+                task_in_flight_remove(installation_url)
+            if barrier:
+                task_barrier_arrive(barrier)
+
+    if retry_countdown is not None:
+        # Free up the worker right away, and run the task again later.
+        raise self.retry(countdown=retry_countdown, max_retries=None)
+
+    if synced and task_redis_delete(task_sync_dirty_key(installation_id)):
+        logger.info(f'installation {installation_url} was marked dirty during sync, scheduling follow-up sync')
+        task_sync_github_app_installation_debounced(installation_id)
+
+def task_sync_failed(task, installation_id: int):
+    """
+    Handle an unexpected error while syncing an app installation, from
+    within the `except` block.
+
+    Returns the number of seconds to wait before retrying the sync, or
+    None if the task has been retried too many times already.
+    """
+    installation_url = f'https://github.com/settings/installations/{installation_id}'
+    logger.exception(f'unexpected exception while syncing installation {installation_url}')
+
+    failures = task_sync_failures_increment(installation_id)
+    countdown = task_retry_countdown(failures)
+
+    # Keep the scheduler from picking the installation up again right
+    # away, while we're backing off.
+    try:
+        github_sync_app_installation_record_failure(installation_id, countdown)
+    except DatabaseError:
+        logger.exception(f'failed to record failed sync of installation {installation_url}')
+
+    if task.request.retries >= TASK_SYNC_MAX_RETRIES:
+        logger.error(f'giving up on sync of installation {installation_url} after {failures} consecutive failures')
+        return None
+
+    logger.info(f'retrying sync of installation {installation_url} in {countdown:.0f} seconds ({failures} consecutive failures)')
+    return countdown
+
+def task_sync_failures_key(installation_id: int):
+    return f'sync:failures:{installation_id}'
+
+def task_sync_failures_increment(installation_id: int):
+    """
+    Increment the number of consecutive failed syncs of an app
+    installation, and return the new count.
+
+    The count is kept across tasks, so that an installation that keeps
+    failing (e.g. a webhook sync after a failed scheduled sync) backs
+    off further each time. If Redis is unavailable, we count it as the
+    first failure.
+    """
+    key = task_sync_failures_key(installation_id)
+    try:
+        failures = redis_client.incr(key)
+        redis_client.expire(key, TASK_SYNC_FAILURES_TIMEOUT)
+        return failures
+    except redis.RedisError:
+        logger.exception(f'failed to count failed sync of installation {installation_id}')
+        return 1
+
+def task_sync_failures_reset(installation_id: int):
+    task_redis_delete(task_sync_failures_key(installation_id))
+
+def task_sync_pending_key(installation_id: int):
+    return f'sync:pending:{installation_id}'
+
+def task_sync_dirty_key(installation_id: int):
+    return f'sync:dirty:{installation_id}'
+
+def task_redis_delete(key: str):
+    """
+    Delete `key` from Redis, and return True if it existed.
+
+    Redis errors are logged rather than raised.
+    """
+    try:
+        return redis_client.delete(key) > 0
+    except redis.RedisError:
+        logger.exception(f'failed to delete Redis key {key}')
+        return False
+
+def task_sync_mark_dirty(installation_id: int, lock):
+    """
+    Mark an installation as dirty while another task is syncing it
+    (i.e. holding `lock`), so that the other task runs one follow-up
+    sync when it is done.
+    """
+    try:
+        # Note: The flag must outlive the running sync, so we can't
+        # use `TASK_LOCK_TIMEOUT` here.
+        redis_client.set(task_sync_dirty_key(installation_id), 1, ex=TASK_IN_FLIGHT_TIMEOUT)
+    except redis.RedisError:
+        logger.exception(f'failed to mark installation {installation_id} dirty')
+        return
+
+    # If the other sync finished before we set the flag, it won't
+    # see it, so we schedule the follow-up sync ourselves.
+    if not lock.locked() and task_redis_delete(task_sync_dirty_key(installation_id)):
+        task_sync_github_app_installation_debounced(installation_id)
+
+def task_sync_github_app_installation_debounced(installation_id: int):
+    """
+    Request a sync of an app installation, e.g. after a webhook event.
+
+    Requests are coalesced: the sync starts `TASK_DEBOUNCE_TIME` seconds
+    after the first request, and any further requests before then are
+    covered by the same sync. For example, when the maintainer
+    enables/disables the app on ten repos, we get ten webhook events
+    but only sync once.
+
+    Requests that arrive while a sync is running result in one
+    follow-up sync (see `task_sync_github_app_installation`).
+    """
+    try:
+        if not redis_client.set(task_sync_pending_key(installation_id), 1, nx=True, ex=TASK_DEBOUNCE_TIME + TASK_SOFT_TIME_LIMIT):
+            logger.info(f'sync of installation {installation_id} is already pending')
+            return
+    except redis.RedisError:
+        logger.exception(f'failed to debounce sync of installation {installation_id}')
+
+    task_sync_github_app_installation.apply_async(
+        args=[installation_id],
+        kwargs={'debounced': True},
+        countdown=TASK_DEBOUNCE_TIME)
+
+def task_in_flight_add(installation_url: str):
+    """
+    Record that a scheduled sync task for `installation_url` has been
+    enqueued. Returns False if one was already in flight.
+    """
+    return bool(redis_client.zadd(TASK_IN_FLIGHT_KEY, {installation_url: time.time()}, nx=True))
+
+def task_in_flight_postpone(installation_url: str, countdown: float):
+    """
+    Record that the scheduled sync task for `installation_url` will be
+    retried in `countdown` seconds, so that its entry doesn't expire
+    while it's waiting.
+    """
+    try:
+        redis_client.zadd(TASK_IN_FLIGHT_KEY, {installation_url: time.time() + countdown}, xx=True)
+    except redis.RedisError:
+        # The entry will expire after `TASK_IN_FLIGHT_TIMEOUT`.
+        logger.exception(f'failed to postpone installation {installation_url} in in-flight set')
+
+def task_in_flight_remove(installation_url: str):
+    """
+    Record that the scheduled sync task for `installation_url` has
+    finished.
+    """
+    try:
+        redis_client.zrem(TASK_IN_FLIGHT_KEY, installation_url)
+    except redis.RedisError:
+        # The entry will expire after `TASK_IN_FLIGHT_TIMEOUT`.
+        logger.exception(f'failed to remove installation {installation_url} from in-flight set')
+
+def task_in_flight_urls():
+    """
+    Return the installation URLs that currently have a scheduled sync
+    task in flight.
+
+    Entries older than `TASK_IN_FLIGHT_TIMEOUT` are discarded first, in
+    case their task was lost (e.g. a worker crashed before it could
+    remove the entry).
+    """
+    redis_client.zremrangebyscore(TASK_IN_FLIGHT_KEY, '-inf', time.time() - TASK_IN_FLIGHT_TIMEOUT)
+    return set(redis_client.zrange(TASK_IN_FLIGHT_KEY, 0, -1))
+
+@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT,
+          queue=TASK_QUEUE_SWEEP, priority=TASK_PRIORITY_HIGH)
+def task_sync_github_app_installation_least_recently_updated(self):
+    """
+    Scheduler for routine installation syncs.
+
+    Each iteration enqueues a separate `task_sync_github_app_installation`
+    task for each of the (up to) `settings.GITHUB_SYNC_DISPATCH_BATCH_SIZE`
+    installations that are due for a sync, so that the syncs are spread
+    across all Celery workers. Installations that have been due the
+    longest go first.
+
+    When an installation is due is decided by its adaptive sync cadence
+    (`GitHubAppInstallation.next_sync_at`, see `github_sync_interval()`
+    in `github_sync.py`).
+
+    The installations with a scheduled sync task in flight are tracked
+    in a Redis sorted set, so that the same installation is never
+    enqueued twice, and so that no more than
+    `settings.GITHUB_SYNC_MAX_IN_FLIGHT` scheduled syncs are queued or
+    running at any time.
+
+    If an iteration fails (e.g. Redis or the database is unavailable),
+    the error is logged and the next iteration is scheduled anyway, so
+    that routine syncs never stop.
+    """
+    try:
+        dispatched = task_sync_github_app_installation_least_recently_updated_iteration()
+    except Exception:
+        logger.exception('unexpected exception while scheduling installation syncs')
+        dispatched = 0
+
+    # Another scheduler iteration is running, and will schedule the
+    # next iteration itself.
+    if dispatched is None:
+        return
 
     # If there's no work to do (e.g. no app installations in the
-    # database), prevent spinning by introducing a delay before the
-    # next task iteration.
-    if not did_work:
-        logger.info(f'no work to do, delaying next task iteration by {TASK_WAIT_RETRY_TIME} seconds')
-        self.apply_async(countdown=TASK_WAIT_RETRY_TIME)
+    # database, or too many syncs in flight), prevent spinning by
+    # introducing a delay before the next task iteration.
+    if not dispatched:
+        logger.info(f'no work to do, delaying next task iteration by {TASK_DISPATCH_IDLE_TIME} seconds')
+        self.apply_async(countdown=TASK_DISPATCH_IDLE_TIME)
     else:
         logger.info(f'scheduling next task iteration')
-        self.apply_async()
+        self.apply_async(countdown=TASK_DISPATCH_INTERVAL)
+
+def task_sync_github_app_installation_least_recently_updated_iteration():
+    """
+    Enqueue sync tasks for the installations that are due for a sync.
 
-@app.task(ignore_result=True)
-def task_sync_github_app_installations_new_and_removed_callback():
+    Returns the number of sync tasks that were enqueued, or None if
+    another scheduler iteration is already running.
     """
-    Callback task that runs after all subtasks complete.  Schedules
-    the next iteration of the
-    `task_sync_github_app_installations_new_and_removed` task.
+    # Make sure that only one scheduler iteration runs at a time, in
+    # case the scheduler was started more than once.
+    lock = redis_client.lock(name='lock:task_sync_scheduler', timeout=TASK_SOFT_TIME_LIMIT)
+    if not lock.acquire(blocking=False):
+        logger.info('another scheduler iteration is running, stopping')
+        return None
+
+    dispatched = 0
+    try:
+        in_flight_urls = task_in_flight_urls()
+        available = min(settings.GITHUB_SYNC_DISPATCH_BATCH_SIZE,
+                        settings.GITHUB_SYNC_MAX_IN_FLIGHT - len(in_flight_urls))
+
+        installation_urls = []
+        if available > 0:
+            installation_urls = list(
+                GitHubAppInstallation.objects
+                .filter(Q(next_sync_at__isnull=True) | Q(next_sync_at__lte=timezone.now()))
+                .exclude(url__in=in_flight_urls)
+                .order_by(F('next_sync_at').asc(nulls_first=True), 'updated_at')
+                .values_list('url', flat=True)[:available]
+            )
+
+        for installation_url in installation_urls:
+            if task_in_flight_add(installation_url):
+                installation_id = int(installation_url.split('/')[-1])
+                task_sync_github_app_installation.apply_async(
+                    args=[installation_id],
+                    kwargs={'scheduled': True},
+                    queue=TASK_QUEUE_SWEEP,
+                    priority=TASK_PRIORITY_LOW)
+                dispatched += 1
+
+        logger.info(f'scheduled {dispatched} installation syncs ({len(in_flight_urls)} already in flight)')
+    finally:
+        lock.release()
+
+    return dispatched
+
+def task_barrier_key():
+    return f'sync:barrier:{uuid.uuid4()}'
+
+def task_barrier_arrive(barrier: str):
     """
-    logger.info('all subtasks completed, starting next task iteration')
-    task_sync_github_app_installations_new_and_removed.apply_async()
+    Record that one of the syncs enqueued by
+    `task_sync_github_app_installations_new_and_removed` is done. The
+    last one to arrive starts the next iteration.
 
-@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT)
+    Redis errors are logged rather than raised; in that case, the next
+    iteration is started by
+    `task_sync_github_app_installations_new_and_removed_timeout`.
+    """
+    try:
+        remaining = redis_client.decr(barrier)
+    except redis.RedisError:
+        logger.exception(f'failed to arrive at barrier {barrier}')
+        return
+
+    if remaining > 0:
+        return
+
+    # Whoever deletes the barrier starts the next iteration: either
+    # the last sync, or the timeout task. If the barrier has already
+    # timed out, DECR has recreated the key with a negative count, and
+    # we're only cleaning up.
+    if task_redis_delete(barrier) and remaining == 0:
+        logger.info('all new installations synced, starting next task iteration')
+        task_sync_github_app_installations_new_and_removed.apply_async()
+
+@app.task(ignore_result=True, queue=TASK_QUEUE_SWEEP, priority=TASK_PRIORITY_HIGH)
+def task_sync_github_app_installations_new_and_removed_timeout(barrier: str):
+    """
+    Start the next iteration of the
+    `task_sync_github_app_installations_new_and_removed` task, if the
+    syncs that it enqueued haven't all completed after
+    `TASK_FAN_OUT_TIMEOUT` seconds.
+    """
+    if task_redis_delete(barrier):
+        logger.warning('timed out waiting for new installations to sync, starting next task iteration')
+        task_sync_github_app_installations_new_and_removed.apply_async()
+
+@app.task(bind=True, ignore_result=True, soft_time_limit=TASK_SOFT_TIME_LIMIT,
+          queue=TASK_QUEUE_SWEEP, priority=TASK_PRIORITY_HIGH)
 def task_sync_github_app_installations_new_and_removed(self):
     """
     Query the latest set of app installations from the GitHub API,
     sync any previously unknown installations to the database, and
     remove any installations from the database that no longer exist
     on GitHub.
+
+    If anything fails (e.g. GitHub API outage), the task is retried
+    with an exponential backoff, so that the next iteration is never
+    lost.
     """
+    try:
+        task_sync_github_app_installations_new_and_removed_iteration(self)
+    except Exception:
+        countdown = task_retry_countdown(self.request.retries + 1)
+        logger.exception(f'unexpected exception while syncing new and removed installations, retrying in {countdown:.0f} seconds')
+        raise self.retry(countdown=countdown, max_retries=None)
+
+def task_sync_github_app_installations_new_and_removed_iteration(task):
     app_token = github_app_token()
 
-    installations_from_github_array = github_api('/app/installations', access_token=app_token)
-    logger.info(f'found {len(installations_from_github_array)} app installations in total')
+    # Map installation URL -> installation ID, for all app
+    # installations on GitHub. We stream the installations one page
+    # at a time, and only keep the fields that we need.
+    #
+    # Note: The app token is regenerated every few minutes, so we
+    # pass an explicit `cache_identity` to allow conditional requests
+    # to reuse cached responses across app tokens.
     installations_from_github = {
-        installation['html_url']: installation for installation in installations_from_github_array
+        installation['html_url']: installation['id']
+        for installation in github_api_items('/app/installations', access_token=app_token, cache_identity='app')
     }
+    logger.info(f'found {len(installations_from_github)} app installations in total')
 
     # Compare the app installation URLs in our database to the
     # installation URLs we retrieved from the GitHub API, to
@@ -157,14 +638,6 @@ def task_sync_github_app_installations_new_and_removed(self):
     installation_urls_to_add = installations_from_github.keys() - installation_urls_in_db
     logger.info(f'found {len(installation_urls_to_add)} new installations')
 
-    # Collect all subtasks to wait for
-    subtasks = []
-    for installation_url in installation_urls_to_add:
-        installation_json = installations_from_github[installation_url]
-        installation_id = installation_json['id']
-        # Create a signature for each subtask
-        subtasks.append(task_sync_github_app_installation.s(installation_id))
-
     installation_urls_to_remove = installation_urls_in_db - installations_from_github.keys()
     logger.info(f'found {len(installation_urls_to_remove)} installations to remove')
 
@@ -176,10 +649,35 @@ def task_sync_github_app_installations_new_and_removed(self):
             else:
                 logger.info(f'skipped removing installation {installation_url}: failed to acquire lock')
 
-    # Use chord to wait for all subtasks to complete before scheduling next iteration
-    if subtasks:
-        logger.info(f'scheduling {len(subtasks)} subtasks with callback')
-        chord(subtasks)(task_sync_github_app_installations_new_and_removed_callback.s())
+    # Sync the new installations, and wait for all of the syncs to
+    # complete before starting the next iteration. Rather than a
+    # Celery chord (which requires a result backend), we use a
+    # counter in Redis, which each sync decrements when it is done,
+    # and a timeout task, in case a sync stalls.
+    if installation_urls_to_add:
+        barrier = task_barrier_key()
+        redis_client.set(barrier, len(installation_urls_to_add), ex=TASK_FAN_OUT_TIMEOUT + TASK_SOFT_TIME_LIMIT)
+
+        logger.info(f'scheduling {len(installation_urls_to_add)} installation syncs')
+        try:
+            for installation_url in installation_urls_to_add:
+                # New installations are synced on the webhook queue,
+                # because a new maintainer is waiting for their page to
+                # show up.
+                task_sync_github_app_installation.apply_async(
+                    args=[installations_from_github[installation_url]],
+                    kwargs={'barrier': barrier})
+
+            task_sync_github_app_installations_new_and_removed_timeout.apply_async(
+                args=[barrier],
+                countdown=TASK_FAN_OUT_TIMEOUT)
+        except Exception:
+            # The caller retries this iteration, so the syncs that were
+            # already enqueued must not start another one. Without the
+            # barrier, they only clean up after themselves when they
+            # arrive (see `task_barrier_arrive`).
+            task_redis_delete(barrier)
+            raise
     else:
         logger.info(f'no work to do, scheduling next task iteration with a delay of {TASK_WAIT_RETRY_TIME} seconds')
-        self.apply_async(countdown=TASK_WAIT_RETRY_TIME)
\ No newline at end of file
+        task.apply_async(countdown=TASK_WAIT_RETRY_TIME)
@@ -0,0 +1,149 @@
+import uuid
+
+from redis.exceptions import LockError, LockNotOwnedError
+from typing import Any
+
+class MockRedisLock:
+    """Mock Redis lock for testing Celery tasks without a Redis server."""
+
+    def __init__(self, mock_redis_db, name, timeout=None, blocking=True, blocking_timeout=None, thread_local=True):
+        self.mock_redis_db = mock_redis_db
+        self.name = name
+        self.timeout = timeout
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.thread_local = thread_local
+        self.reacquired = 0
+        self._uuid = uuid.uuid4()
+
+    def __enter__(self):
+        if self.acquire():
+            return self
+        raise LockError("Unable to acquire lock within the time specified")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self, blocking=None):
+        """Simulate lock acquisition."""
+        if blocking is not None:
+            self.blocking = blocking
+
+        if not self.locked():
+            self.mock_redis_db[self.name] = self._uuid
+            return True
+        elif self.owned():
+            raise LockError("tried to acquire lock we already own")
+        else:
+            if self.blocking:
+                raise RuntimeError("blocked waiting for lock")
+            return False
+
+    def locked(self):
+        return self.mock_redis_db.get(self.name) is not None
+
+    def owned(self):
+        return self.mock_redis_db.get(self.name) == self._uuid
+
+    def reacquire(self):
+        """Simulate resetting the lock timeout."""
+        if not self.owned():
+            raise LockNotOwnedError()
+        self.reacquired += 1
+        return True
+
+    def release(self):
+        """Simulate lock release."""
+        if not self.locked():
+            raise LockError("tried to release a lock that nobody owns")
+        elif not self.owned():
+            raise LockNotOwnedError()
+        del self.mock_redis_db[self.name]
+
+class MockRedisClient:
+    """
+    Mock Redis client for testing without a Redis server.
+
+    Only implements the subset of Redis commands that we use. Key
+    expiry times are recorded in `mock_redis_ttl`, but keys never
+    actually expire.
+    """
+
+    def __init__(self):
+        self.mock_redis_db: dict[str, Any] = {}
+        self.mock_redis_ttl: dict[str, int] = {}
+
+    def lock(self, name: str, timeout=None, blocking=True, blocking_timeout=None, thread_local=True):
+        return MockRedisLock(self.mock_redis_db, name, timeout, blocking, blocking_timeout, thread_local)
+
+    def get(self, name):
+        return self.mock_redis_db.get(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        if nx and name in self.mock_redis_db:
+            return None
+        self.mock_redis_db[name] = str(value)
+        if ex is not None:
+            self.mock_redis_ttl[name] = ex
+        else:
+            self.mock_redis_ttl.pop(name, None)
+        return True
+
+    def delete(self, *names):
+        deleted = 0
+        for name in names:
+            if name in self.mock_redis_db:
+                del self.mock_redis_db[name]
+                self.mock_redis_ttl.pop(name, None)
+                deleted += 1
+        return deleted
+
+    def incr(self, name):
+        value = int(self.mock_redis_db.get(name, 0)) + 1
+        self.mock_redis_db[name] = str(value)
+        return value
+
+    def decr(self, name):
+        value = int(self.mock_redis_db.get(name, 0)) - 1
+        self.mock_redis_db[name] = str(value)
+        return value
+
+    def expire(self, name, time):
+        if name not in self.mock_redis_db:
+            return False
+        self.mock_redis_ttl[name] = time
+        return True
+
+    def zadd(self, name, mapping, nx=False, xx=False):
+        zset = self.mock_redis_db.setdefault(name, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in zset:
+                continue
+            if xx and member not in zset:
+                continue
+            if member not in zset:
+                added += 1
+            zset[member] = score
+        return added
+
+    def zrem(self, name, *members):
+        zset = self.mock_redis_db.get(name, {})
+        return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zscore(self, name, member):
+        return self.mock_redis_db.get(name, {}).get(member)
+
+    def zrange(self, name, start, end):
+        zset = self.mock_redis_db.get(name, {})
+        members = sorted(zset, key=lambda member: zset[member])
+        return members[start:] if end == -1 else members[start:end + 1]
+
+    def zremrangebyscore(self, name, min, max):
+        zset = self.mock_redis_db.get(name, {})
+        min = float(min)
+        max = float(max)
+        removed = [member for member, score in zset.items() if min <= score <= max]
+        for member in removed:
+            del zset[member]
+        return len(removed)
@@ -0,0 +1,265 @@
+import requests
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from unittest.mock import MagicMock, patch
+
+from sponsoredissues.github_api import github_api, github_api_items, github_api_pages
+
+class MockResponse:
+    """Mock `requests.Response` for a GitHub REST API request."""
+
+    def __init__(self, json_data=None, status_code=200, headers=None):
+        self.json_data = json_data
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'HTTP {self.status_code}', response=self)
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@patch('sponsoredissues.github_api.github_rate_limit_update')
+@patch('sponsoredissues.github_api.github_rate_limit_acquire')
+class GitHubApiConditionalRequestTest(TestCase):
+    """Tests for the ETag / `If-None-Match` response cache in `github_api`."""
+
+    def setUp(self):
+        cache.clear()
+        self.mock_session = MagicMock()
+        session_patcher = patch('sponsoredissues.github_api.github_session', return_value=self.mock_session)
+        session_patcher.start()
+        self.addCleanup(session_patcher.stop)
+
+    def test_not_modified_returns_cached_response(self, mock_acquire, mock_update):
+        user_json = {'login': 'octocat', 'id': 1}
+        self.mock_session.get.side_effect = [
+            MockResponse(user_json, headers={'ETag': '"abc"'}),
+            MockResponse(None, status_code=304),
+        ]
+
+        first = github_api('/user/1', access_token='token', auto_paginate=False)
+        second = github_api('/user/1', access_token='token', auto_paginate=False)
+
+        self.assertEqual(first, user_json)
+        self.assertEqual(second, user_json)
+
+        # The second request should revalidate the cached response
+        first_headers = self.mock_session.get.call_args_list[0].kwargs['headers']
+        second_headers = self.mock_session.get.call_args_list[1].kwargs['headers']
+        self.assertNotIn('If-None-Match', first_headers)
+        self.assertEqual(second_headers['If-None-Match'], '"abc"')
+
+    def test_modified_response_replaces_cached_response(self, mock_acquire, mock_update):
+        self.mock_session.get.side_effect = [
+            MockResponse({'login': 'old'}, headers={'ETag': '"v1"'}),
+            MockResponse({'login': 'new'}, headers={'ETag': '"v2"'}),
+            MockResponse(None, status_code=304),
+        ]
+
+        github_api('/user/1', access_token='token', auto_paginate=False)
+        self.assertEqual(github_api('/user/1', access_token='token', auto_paginate=False), {'login': 'new'})
+        self.assertEqual(github_api('/user/1', access_token='token', auto_paginate=False), {'login': 'new'})
+
+        third_headers = self.mock_session.get.call_args_list[2].kwargs['headers']
+        self.assertEqual(third_headers['If-None-Match'], '"v2"')
+
+    def test_cache_is_keyed_by_token_identity(self, mock_acquire, mock_update):
+        self.mock_session.get.side_effect = [
+            MockResponse({'login': 'octocat'}, headers={'ETag': '"abc"'}),
+            MockResponse({'login': 'octocat'}, headers={'ETag': '"abc"'}),
+        ]
+
+        github_api('/user/1', access_token='token1', auto_paginate=False)
+        github_api('/user/1', access_token='token2', auto_paginate=False)
+
+        second_headers = self.mock_session.get.call_args_list[1].kwargs['headers']
+        self.assertNotIn('If-None-Match', second_headers)
+
+    def test_explicit_cache_identity_is_shared_between_tokens(self, mock_acquire, mock_update):
+        self.mock_session.get.side_effect = [
+            MockResponse([{'id': 1}], headers={'ETag': '"abc"'}),
+            MockResponse(None, status_code=304),
+        ]
+
+        github_api('/app/installations', access_token='jwt1', cache_identity='app')
+        installations = github_api('/app/installations', access_token='jwt2', cache_identity='app')
+
+        self.assertEqual(installations, [{'id': 1}])
+
+    def test_conditional_requests_disabled(self, mock_acquire, mock_update):
+        self.mock_session.get.side_effect = [
+            MockResponse({'login': 'octocat'}, headers={'ETag': '"abc"'}),
+            MockResponse({'login': 'octocat'}, headers={'ETag': '"abc"'}),
+        ]
+
+        github_api('/user/1', access_token='token', auto_paginate=False, conditional=False)
+        github_api('/user/1', access_token='token', auto_paginate=False, conditional=False)
+
+        second_headers = self.mock_session.get.call_args_list[1].kwargs['headers']
+        self.assertNotIn('If-None-Match', second_headers)
+
+    def test_http_error_raises(self, mock_acquire, mock_update):
+        self.mock_session.get.return_value = MockResponse({'message': 'Not Found'}, status_code=404)
+
+        with self.assertRaises(RuntimeError):
+            github_api('/user/1', access_token='token', auto_paginate=False)
+
+def mock_page_response(url, pages, key=None):
+    """
+    Return the mock response for `url`, for a paginated endpoint with
+    numbered pages, where `pages` is the list of items on each page.
+    """
+    from urllib.parse import parse_qs, urlparse
+    page = int(parse_qs(urlparse(url).query).get('page', ['1'])[0])
+    base_url = url.split('&page=')[0]
+    links = []
+    if page < len(pages):
+        links.append(f'<{base_url}&page={page + 1}>; rel="next"')
+        links.append(f'<{base_url}&page={len(pages)}>; rel="last"')
+    items = list(pages[page - 1])
+    data = {'total_count': sum(len(p) for p in pages), key: items} if key else items
+    return MockResponse(data, headers={'Link': ', '.join(links)} if links else {})
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    GITHUB_API_MAX_WORKERS=4,
+)
+@patch('sponsoredissues.github_api.github_rate_limit_update')
+@patch('sponsoredissues.github_api.github_rate_limit_acquire')
+class GitHubApiPaginationTest(TestCase):
+    """Tests for automatic pagination in `github_api`."""
+
+    def setUp(self):
+        cache.clear()
+        self.mock_session = MagicMock()
+        session_patcher = patch('sponsoredissues.github_api.github_session', return_value=self.mock_session)
+        session_patcher.start()
+        self.addCleanup(session_patcher.stop)
+
+    def test_numbered_pages_are_merged_in_order(self, mock_acquire, mock_update):
+        pages = [[{'id': page * 10 + i} for i in range(3)] for page in range(12)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages)
+
+        items = github_api('/app/installations', access_token='token')
+
+        self.assertEqual(items, [item for page in pages for item in page])
+        self.assertEqual(self.mock_session.get.call_count, 12)
+
+    def test_numbered_pages_in_dict_response(self, mock_acquire, mock_update):
+        pages = [[{'id': page * 10 + i} for i in range(2)] for page in range(3)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages, key='repositories')
+
+        data = github_api('/installation/repositories', access_token='token')
+
+        self.assertEqual(data['repositories'], [item for page in pages for item in page])
+
+    def test_max_pages_limits_pages_fetched(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(5)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages)
+
+        items = github_api('/app/installations', access_token='token', max_pages=2)
+
+        self.assertEqual(items, [{'id': 0}, {'id': 1}])
+        self.assertEqual(self.mock_session.get.call_count, 2)
+
+    def test_cursor_pages_are_fetched_sequentially(self, mock_acquire, mock_update):
+        # Cursor-based pagination only has `next` links (no `last` link)
+        self.mock_session.get.side_effect = [
+            MockResponse([{'id': 1}], headers={'Link': '<https://api.github.com/x?after=a>; rel="next"'}),
+            MockResponse([{'id': 2}], headers={'Link': '<https://api.github.com/x?after=b>; rel="next"'}),
+            MockResponse([{'id': 3}]),
+        ]
+
+        items = github_api('/x', access_token='token')
+
+        self.assertEqual(items, [{'id': 1}, {'id': 2}, {'id': 3}])
+        requested_urls = [call.args[0] for call in self.mock_session.get.call_args_list]
+        self.assertEqual(requested_urls[1:], ['https://api.github.com/x?after=a', 'https://api.github.com/x?after=b'])
+
+    def test_failed_page_raises(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(3)]
+
+        def get(url, **kwargs):
+            if 'page=2' in url:
+                return MockResponse({'message': 'Server Error'}, status_code=502)
+            return mock_page_response(url, pages)
+        self.mock_session.get.side_effect = get
+
+        with self.assertRaises(RuntimeError):
+            github_api('/app/installations', access_token='token')
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@patch('sponsoredissues.github_api.github_rate_limit_update')
+@patch('sponsoredissues.github_api.github_rate_limit_acquire')
+class GitHubApiPagesTest(TestCase):
+    """Tests for the streaming `github_api_pages` / `github_api_items` generators."""
+
+    def setUp(self):
+        cache.clear()
+        self.mock_session = MagicMock()
+        session_patcher = patch('sponsoredissues.github_api.github_session', return_value=self.mock_session)
+        session_patcher.start()
+        self.addCleanup(session_patcher.stop)
+
+    def test_pages_are_fetched_lazily(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(3)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages, key='repositories')
+
+        iterator = github_api_pages('/installation/repositories', access_token='token')
+        self.mock_session.get.assert_not_called()
+
+        first_page = next(iterator)
+        self.assertEqual(first_page.items, [{'id': 0}])
+        self.assertIsNotNone(first_page.next_url)
+        self.assertEqual(self.mock_session.get.call_count, 1)
+
+        remaining_pages = list(iterator)
+        self.assertEqual([page.items for page in remaining_pages], [[{'id': 1}], [{'id': 2}]])
+        self.assertIsNone(remaining_pages[-1].next_url)
+
+    def test_resume_from_next_url(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(3)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages)
+
+        first_page = next(github_api_pages('/app/installations', access_token='token'))
+        resumed_items = list(github_api_items('/app/installations', access_token='token', start_url=first_page.next_url))
+
+        self.assertEqual(resumed_items, [{'id': 1}, {'id': 2}])
+        self.assertEqual(self.mock_session.get.call_count, 3)
+
+    def test_numbered_pages_are_prefetched_in_order(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(10)]
+        self.mock_session.get.side_effect = lambda url, **kwargs: mock_page_response(url, pages, key='repositories')
+
+        iterator = github_api_pages('/installation/repositories', access_token='token', max_workers=3)
+        next(iterator)
+        next(iterator)
+
+        # The first page, plus up to `max_workers` prefetched pages
+        self.assertLessEqual(self.mock_session.get.call_count, 1 + 3 + 1)
+
+        remaining_pages = list(iterator)
+        self.assertEqual([page.items for page in remaining_pages], pages[2:])
+        self.assertEqual(self.mock_session.get.call_count, 10)
+
+    def test_prefetched_page_error_raises(self, mock_acquire, mock_update):
+        pages = [[{'id': page}] for page in range(3)]
+
+        def get(url, **kwargs):
+            if 'page=2' in url:
+                return MockResponse({'message': 'Server Error'}, status_code=502)
+            return mock_page_response(url, pages)
+        self.mock_session.get.side_effect = get
+
+        with self.assertRaises(RuntimeError):
+            list(github_api_items('/app/installations', access_token='token', max_workers=2))
+
+    def test_non_paginated_response_raises(self, mock_acquire, mock_update):
+        self.mock_session.get.return_value = MockResponse({'login': 'octocat'})
+
+        with self.assertRaises(RuntimeError):
+            list(github_api_items('/user/1', access_token='token'))
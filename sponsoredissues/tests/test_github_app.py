@@ -0,0 +1,355 @@
+import jwt
+import redis
+import requests
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase, override_settings
+from unittest.mock import patch
+
+from sponsoredissues import github_app
+from sponsoredissues.github_api import GitHubGraphQLError
+from sponsoredissues.github_app import (
+    APP_TOKEN_LIFETIME,
+    APP_TOKEN_REFRESH_MARGIN,
+    GITHUB_SEARCH_MAX_RESULTS,
+    INSTALLATION_TOKEN_REFRESH_MARGIN,
+    GitHubIssueQueryError,
+    github_app_installation_query_issue_urls,
+    github_app_installation_query_issues_with_sponsoredissues_label,
+    github_app_token,
+    github_app_installation_forget_token,
+    github_app_installation_query_token,
+)
+from sponsoredissues.tests.mock_redis import MockRedisClient
+
+TEST_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+TEST_PRIVATE_KEY_PEM = TEST_PRIVATE_KEY.private_bytes(
+    encoding=serialization.Encoding.PEM,
+    format=serialization.PrivateFormat.TraditionalOpenSSL,
+    encryption_algorithm=serialization.NoEncryption(),
+).decode()
+
+@override_settings(GITHUB_APP_ID=12345, GITHUB_APP_PRIVATE_KEY=TEST_PRIVATE_KEY_PEM)
+class AppTokenTest(TestCase):
+    """Tests for the per-process cache in `github_app_token`."""
+
+    def setUp(self):
+        for name, value in [('_app_private_key', None), ('_app_token', None), ('_app_token_expires_at', 0)]:
+            patcher = patch.object(github_app, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def decode(self, token):
+        return jwt.decode(token, TEST_PRIVATE_KEY.public_key(), algorithms=['RS256'])
+
+    def test_token_is_valid(self):
+        payload = self.decode(github_app_token())
+        self.assertEqual(payload['iss'], '12345')
+        self.assertEqual(payload['exp'] - payload['iat'], APP_TOKEN_LIFETIME + 60)
+
+    @patch('sponsoredissues.github_app.time.time')
+    def test_token_is_reused(self, mock_time):
+        mock_time.return_value = 1_000_000
+        first = github_app_token()
+        mock_time.return_value = 1_000_000 + APP_TOKEN_LIFETIME - APP_TOKEN_REFRESH_MARGIN - 1
+        self.assertEqual(github_app_token(), first)
+
+    @patch('sponsoredissues.github_app.time.time')
+    def test_token_is_refreshed_before_expiry(self, mock_time):
+        mock_time.return_value = 1_000_000
+        first = github_app_token()
+        mock_time.return_value = 1_000_000 + APP_TOKEN_LIFETIME - APP_TOKEN_REFRESH_MARGIN
+        second = github_app_token()
+        self.assertNotEqual(second, first)
+        self.assertEqual(jwt.decode(second, options={'verify_signature': False})['iat'], mock_time.return_value - 60)
+
+    @patch('sponsoredissues.github_app.time.time')
+    @patch('sponsoredissues.github_app.load_pem_private_key', wraps=github_app.load_pem_private_key)
+    def test_private_key_is_parsed_once(self, mock_load_key, mock_time):
+        mock_time.return_value = 1_000_000
+        github_app_token()
+        mock_time.return_value = 1_000_000 + APP_TOKEN_LIFETIME
+        github_app_token()
+        mock_load_key.assert_called_once()
+
+    def test_single_line_private_key(self):
+        with self.settings(GITHUB_APP_PRIVATE_KEY=TEST_PRIVATE_KEY_PEM.replace('\n', '\\n')):
+            self.assertEqual(self.decode(github_app_token())['iss'], '12345')
+
+    def test_invalid_private_key(self):
+        with self.settings(GITHUB_APP_PRIVATE_KEY='not a key'):
+            with self.assertRaises(RuntimeError):
+                github_app_token()
+
+class InstallationTokenCacheTest(TestCase):
+    """Tests for the Redis cache in `github_app_installation_query_token`."""
+
+    def setUp(self):
+        self.mock_redis_client = MockRedisClient()
+        self.installation_id = 1111
+        redis_patcher = patch('sponsoredissues.github_app.redis_client', self.mock_redis_client)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def token_expiring_in(self, token, seconds):
+        return (token, datetime.now(timezone.utc) + timedelta(seconds=seconds))
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_token_is_reused(self, mock_create_token):
+        mock_create_token.return_value = self.token_expiring_in('token1', 3600)
+
+        first = github_app_installation_query_token(self.installation_id)
+        second = github_app_installation_query_token(self.installation_id)
+
+        self.assertEqual(first, 'token1')
+        self.assertEqual(second, 'token1')
+        mock_create_token.assert_called_once_with(self.installation_id)
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_token_is_refreshed_before_expiry(self, mock_create_token):
+        mock_create_token.return_value = self.token_expiring_in('token1', 3600)
+
+        github_app_installation_query_token(self.installation_id)
+
+        # The cached token should expire `INSTALLATION_TOKEN_REFRESH_MARGIN`
+        # seconds before GitHub expires it.
+        (ttl,) = self.mock_redis_client.mock_redis_ttl.values()
+        self.assertLessEqual(ttl, 3600 - INSTALLATION_TOKEN_REFRESH_MARGIN)
+        self.assertGreater(ttl, 3600 - INSTALLATION_TOKEN_REFRESH_MARGIN - 10)
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_nearly_expired_token_is_not_cached(self, mock_create_token):
+        mock_create_token.side_effect = [
+            self.token_expiring_in('token1', INSTALLATION_TOKEN_REFRESH_MARGIN - 10),
+            self.token_expiring_in('token2', 3600),
+        ]
+
+        self.assertEqual(github_app_installation_query_token(self.installation_id), 'token1')
+        self.assertEqual(github_app_installation_query_token(self.installation_id), 'token2')
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_tokens_are_cached_per_installation(self, mock_create_token):
+        mock_create_token.side_effect = [
+            self.token_expiring_in('token1', 3600),
+            self.token_expiring_in('token2', 3600),
+        ]
+
+        self.assertEqual(github_app_installation_query_token(1), 'token1')
+        self.assertEqual(github_app_installation_query_token(2), 'token2')
+        self.assertEqual(github_app_installation_query_token(1), 'token1')
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_forget_token(self, mock_create_token):
+        mock_create_token.side_effect = [
+            self.token_expiring_in('token1', 3600),
+            self.token_expiring_in('token2', 3600),
+        ]
+
+        github_app_installation_query_token(self.installation_id)
+        github_app_installation_forget_token(self.installation_id)
+
+        self.assertEqual(github_app_installation_query_token(self.installation_id), 'token2')
+
+    @patch('sponsoredissues.github_app._github_app_installation_create_token')
+    def test_fallback_when_redis_unavailable(self, mock_create_token):
+        mock_create_token.return_value = self.token_expiring_in('token1', 3600)
+
+        with patch.object(self.mock_redis_client, 'get', side_effect=redis.ConnectionError()):
+            self.assertEqual(github_app_installation_query_token(self.installation_id), 'token1')
+
+def graphql_issue(number, repo='https://github.com/octocat/hello'):
+    """Return GraphQL data for a labeled issue, as returned by GitHub."""
+    return {
+        'number': number,
+        'title': f'Issue {number}',
+        'body': '',
+        'repository': {'homepageUrl': None, 'url': repo},
+        'state': 'OPEN',
+        'url': f'{repo}/issues/{number}',
+        'createdAt': '2025-01-01T00:00:00Z',
+        'updatedAt': '2025-01-01T00:00:00Z',
+        'labels': {'nodes': [{'name': 'sponsoredissues.org', 'color': 'ffffff'}]},
+        'author': {'login': 'octocat'},
+    }
+
+def search_page(nodes, issue_count, end_cursor=None):
+    return {
+        'search': {
+            'issueCount': issue_count,
+            'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor},
+            'nodes': nodes,
+        }
+    }
+
+def repos_page(issues):
+    return {
+        'user': {
+            'repositories': {
+                'pageInfo': {'hasNextPage': False, 'endCursor': None},
+                'nodes': [{'name': 'hello', 'owner': {'login': 'octocat'}, 'issues': {'nodes': issues}}],
+            }
+        }
+    }
+
+@patch('sponsoredissues.github_app.github_graphql')
+class LabeledIssueDiscoveryTest(TestCase):
+    """Tests for `github_app_installation_query_issues_with_sponsoredissues_label`."""
+
+    def test_search(self, mock_graphql):
+        mock_graphql.side_effect = [
+            search_page([graphql_issue(1), graphql_issue(2)], issue_count=3, end_cursor='cursor1'),
+            # pull requests appear as empty objects
+            search_page([graphql_issue(3), {}], issue_count=3),
+        ]
+
+        issues = github_app_installation_query_issues_with_sponsoredissues_label('token', 'octocat', discovery='search')
+
+        self.assertEqual([issue['number'] for issue in issues], [1, 2, 3])
+        self.assertEqual(issues[0]['html_url'], 'https://github.com/octocat/hello/issues/1')
+        self.assertEqual(issues[0]['state'], 'open')
+
+        # Check that the search is paginated with the cursor
+        self.assertEqual(mock_graphql.call_args_list[1].kwargs['variables']['cursor'], 'cursor1')
+        search_query = mock_graphql.call_args_list[0].kwargs['variables']['searchQuery']
+        self.assertIn('label:"sponsoredissues.org"', search_query)
+        self.assertIn('user:octocat', search_query)
+
+    def test_search_falls_back_to_repos_when_too_many_results(self, mock_graphql):
+        mock_graphql.side_effect = [
+            search_page([graphql_issue(1)], issue_count=GITHUB_SEARCH_MAX_RESULTS + 1, end_cursor='cursor1'),
+            repos_page([graphql_issue(1), graphql_issue(2)]),
+        ]
+
+        issues = github_app_installation_query_issues_with_sponsoredissues_label('token', 'octocat', discovery='search')
+
+        self.assertEqual([issue['number'] for issue in issues], [1, 2])
+        self.assertIn('repositories', mock_graphql.call_args_list[1].args[0])
+
+    def test_repos(self, mock_graphql):
+        mock_graphql.return_value = repos_page([graphql_issue(1)])
+
+        issues = github_app_installation_query_issues_with_sponsoredissues_label('token', 'octocat', discovery='repos')
+
+        self.assertEqual([issue['number'] for issue in issues], [1])
+        mock_graphql.assert_called_once()
+        self.assertNotIn('search', mock_graphql.call_args.args[0])
+
+    def test_discovery_setting(self, mock_graphql):
+        mock_graphql.return_value = repos_page([graphql_issue(1)])
+
+        with self.settings(GITHUB_ISSUE_DISCOVERY='repos'):
+            github_app_installation_query_issues_with_sponsoredissues_label('token', 'octocat')
+
+        self.assertIn('repositories', mock_graphql.call_args.args[0])
+
+def issue_urls_response(query):
+    """
+    Return the mock GraphQL data for a query built by
+    `_github_app_installation_build_query_for_issue_urls`.
+    """
+    import re
+    data = {}
+    repo = None
+    for line in query.splitlines():
+        repo_match = re.search(r'(repo\d+): repository\(owner: "(\w+)", name: "(\w+)"\)', line)
+        issue_match = re.search(r'(issue\d+): issue\(number: (\d+)\)', line)
+        if repo_match:
+            alias, owner, name = repo_match.groups()
+            repo = data[alias] = {'url': f'https://github.com/{owner}/{name}'}
+        elif issue_match:
+            alias, number = issue_match.groups()
+            repo[alias] = graphql_issue(int(number), repo=repo['url'])
+    for repo in data.values():
+        del repo['url']
+    return data
+
+@override_settings(GITHUB_API_MAX_WORKERS=4)
+@patch('sponsoredissues.github_app.ISSUE_URLS_BATCH_SIZE', 3)
+@patch('sponsoredissues.github_app.github_graphql')
+class QueryIssueUrlsTest(TestCase):
+    """Tests for `github_app_installation_query_issue_urls`."""
+
+    def issue_urls(self):
+        return {
+            f'https://github.com/octocat/{repo}/issues/{number}'
+            for repo in ('hello', 'world')
+            for number in range(1, 6)
+        }
+
+    def test_batches_are_merged_in_order(self, mock_graphql):
+        mock_graphql.side_effect = lambda query, *args, **kwargs: issue_urls_response(query)
+
+        issue_urls = self.issue_urls()
+        issues = github_app_installation_query_issue_urls('token', issue_urls)
+
+        self.assertEqual([issue['html_url'] for issue in issues], sorted(issue_urls))
+        self.assertEqual(mock_graphql.call_count, 4)
+
+    def test_failed_batch_does_not_drop_other_batches(self, mock_graphql):
+        def graphql(query, *args, **kwargs):
+            # fail the batch with world/2, world/3, world/4
+            if 'world' in query and 'number: 3)' in query:
+                raise requests.ConnectionError('connection reset')
+            return issue_urls_response(query)
+        mock_graphql.side_effect = graphql
+
+        issue_urls = self.issue_urls()
+        with self.assertRaises(GitHubIssueQueryError) as context:
+            github_app_installation_query_issue_urls('token', issue_urls)
+
+        failed_issue_urls = context.exception.failed_issue_urls
+        self.assertIn('https://github.com/octocat/world/issues/3', failed_issue_urls)
+        self.assertEqual(len(failed_issue_urls), 3)
+        self.assertEqual(
+            [issue['html_url'] for issue in context.exception.issues],
+            [url for url in sorted(issue_urls) if url not in failed_issue_urls])
+
+    def test_partial_errors_only_fail_errored_issues(self, mock_graphql):
+        def graphql(query, *args, **kwargs):
+            data = issue_urls_response(query)
+            if 'world' not in query or 'number: 3)' not in query:
+                return data
+            # world/3 fails, world/4 was deleted, and the other issues
+            # in the batch are fine
+            errors = []
+            for repo_alias, repo in data.items():
+                for issue_alias, issue in repo.items():
+                    if issue['number'] == 3:
+                        repo[issue_alias] = None
+                        errors.append({'path': [repo_alias, issue_alias], 'message': 'Something went wrong'})
+                    elif issue['number'] == 4:
+                        repo[issue_alias] = None
+                        errors.append({'type': 'NOT_FOUND', 'path': [repo_alias, issue_alias], 'message': 'Not found'})
+            raise GitHubGraphQLError('GraphQL errors', errors, data)
+        mock_graphql.side_effect = graphql
+
+        issue_urls = self.issue_urls()
+        with self.assertRaises(GitHubIssueQueryError) as context:
+            github_app_installation_query_issue_urls('token', issue_urls)
+
+        self.assertEqual(context.exception.failed_issue_urls, ['https://github.com/octocat/world/issues/3'])
+        self.assertEqual(
+            [issue['html_url'] for issue in context.exception.issues],
+            [url for url in sorted(issue_urls)
+             if url not in ('https://github.com/octocat/world/issues/3', 'https://github.com/octocat/world/issues/4')])
+
+    def test_repo_not_found_is_skipped(self, mock_graphql):
+        def graphql(query, *args, **kwargs):
+            data = issue_urls_response(query)
+            if 'world' not in query:
+                return data
+            errors = []
+            for repo_alias in data:
+                if 'world' in query.split(f'{repo_alias}:')[1].split('\n')[0]:
+                    data[repo_alias] = None
+                    errors.append({'type': 'NOT_FOUND', 'path': [repo_alias], 'message': 'Not found'})
+            raise GitHubGraphQLError('GraphQL errors', errors, data)
+        mock_graphql.side_effect = graphql
+
+        issues = github_app_installation_query_issue_urls('token', self.issue_urls())
+
+        self.assertEqual(
+            [issue['html_url'] for issue in issues],
+            [f'https://github.com/octocat/hello/issues/{number}' for number in range(1, 6)])
@@ -0,0 +1,142 @@
+import redis
+
+from django.test import TestCase, override_settings
+from unittest.mock import MagicMock, patch
+
+from sponsoredissues.github_rate_limit import (
+    GitHubRateLimitError,
+    github_rate_limit_acquire,
+    github_rate_limit_key,
+    github_rate_limit_update,
+)
+
+class MockResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+@override_settings(GITHUB_RATE_LIMIT_RESERVE=10, GITHUB_RATE_LIMIT_MAX_WAIT=60)
+class GitHubRateLimitAcquireTest(TestCase):
+    """Tests for `github_rate_limit_acquire`."""
+
+    @patch('sponsoredissues.github_rate_limit.time.sleep')
+    @patch('sponsoredissues.github_rate_limit._acquire_script')
+    def test_no_wait_when_budget_available(self, mock_script, mock_sleep):
+        mock_script.return_value = 0
+        github_rate_limit_acquire('token', 'core')
+        mock_sleep.assert_not_called()
+
+    @patch('sponsoredissues.github_rate_limit.time.sleep')
+    @patch('sponsoredissues.github_rate_limit._acquire_script')
+    def test_no_wait_when_budget_unknown(self, mock_script, mock_sleep):
+        mock_script.return_value = -1
+        github_rate_limit_acquire('token', 'core')
+        mock_sleep.assert_not_called()
+
+    @patch('sponsoredissues.github_rate_limit.time.sleep')
+    @patch('sponsoredissues.github_rate_limit.time.time')
+    @patch('sponsoredissues.github_rate_limit._acquire_script')
+    def test_wait_until_reset_when_budget_used_up(self, mock_script, mock_time, mock_sleep):
+        now = 1_000_000
+        mock_time.return_value = now
+        # first attempt: budget used up, resets in 30 seconds
+        # second attempt (after sleeping): budget available
+        mock_script.side_effect = [now + 30, 0]
+
+        github_rate_limit_acquire('token', 'core')
+
+        self.assertEqual(mock_script.call_count, 2)
+        mock_sleep.assert_called_once()
+        seconds = mock_sleep.call_args.args[0]
+        self.assertGreaterEqual(seconds, 30)
+        self.assertLessEqual(seconds, 31)
+
+    @patch('sponsoredissues.github_rate_limit.time.sleep')
+    @patch('sponsoredissues.github_rate_limit.time.time')
+    @patch('sponsoredissues.github_rate_limit._acquire_script')
+    def test_raise_when_reset_too_far_away(self, mock_script, mock_time, mock_sleep):
+        now = 1_000_000
+        mock_time.return_value = now
+        mock_script.return_value = now + 3600
+
+        with self.assertRaises(GitHubRateLimitError):
+            github_rate_limit_acquire('token', 'core')
+
+        mock_sleep.assert_not_called()
+
+    @patch('sponsoredissues.github_rate_limit.time.sleep')
+    @patch('sponsoredissues.github_rate_limit._acquire_script')
+    def test_no_wait_when_redis_unavailable(self, mock_script, mock_sleep):
+        mock_script.side_effect = redis.ConnectionError('connection refused')
+        github_rate_limit_acquire('token', 'core')
+        mock_sleep.assert_not_called()
+
+class GitHubRateLimitUpdateTest(TestCase):
+    """Tests for `github_rate_limit_update`."""
+
+    def setUp(self):
+        self.mock_redis_client = MagicMock()
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+    def test_update_from_headers(self):
+        response = MockResponse(headers={
+            'X-RateLimit-Remaining': '4321',
+            'X-RateLimit-Reset': '1700000000',
+        })
+
+        with patch('sponsoredissues.github_rate_limit.redis_client', self.mock_redis_client):
+            github_rate_limit_update('token', 'core', response)
+
+        key = github_rate_limit_key('token', 'core')
+        self.mock_pipeline.hset.assert_called_once_with(key, mapping={'remaining': 4321, 'reset': 1700000000})
+        self.mock_pipeline.expireat.assert_called_once_with(key, 1700000001)
+
+    def test_update_ignores_other_resource_from_headers(self):
+        response = MockResponse(headers={
+            'X-RateLimit-Remaining': '29',
+            'X-RateLimit-Reset': '1700000000',
+            'X-RateLimit-Resource': 'search',
+        })
+
+        with patch('sponsoredissues.github_rate_limit.redis_client', self.mock_redis_client):
+            github_rate_limit_update('token', 'core', response)
+
+        # The `search` budget is never acquired from, and must not
+        # overwrite the `core` budget
+        self.mock_pipeline.hset.assert_not_called()
+
+    def test_update_matching_resource_from_headers(self):
+        response = MockResponse(headers={
+            'X-RateLimit-Remaining': '29',
+            'X-RateLimit-Reset': '1700000000',
+            'X-RateLimit-Resource': 'core',
+        })
+
+        with patch('sponsoredissues.github_rate_limit.redis_client', self.mock_redis_client):
+            github_rate_limit_update('token', 'core', response)
+
+        key = github_rate_limit_key('token', 'core')
+        self.mock_pipeline.hset.assert_called_once_with(key, mapping={'remaining': 29, 'reset': 1700000000})
+
+    @patch('sponsoredissues.github_rate_limit.time.time')
+    def test_update_from_secondary_rate_limit(self, mock_time):
+        mock_time.return_value = 1_000_000
+        response = MockResponse(status_code=403, headers={'Retry-After': '60'})
+
+        with patch('sponsoredissues.github_rate_limit.redis_client', self.mock_redis_client):
+            github_rate_limit_update('token', 'graphql', response)
+
+        key = github_rate_limit_key('token', 'graphql')
+        self.mock_pipeline.hset.assert_called_once_with(key, mapping={'remaining': 0, 'reset': 1_000_060})
+
+    def test_no_update_without_headers(self):
+        with patch('sponsoredissues.github_rate_limit.redis_client', self.mock_redis_client):
+            github_rate_limit_update('token', 'core', MockResponse())
+
+        self.mock_redis_client.pipeline.assert_not_called()
+
+    def test_tokens_have_separate_budgets(self):
+        self.assertNotEqual(
+            github_rate_limit_key('token1', 'core'),
+            github_rate_limit_key('token2', 'core'))
+        self.assertNotIn('token1', github_rate_limit_key('token1', 'core'))
@@ -1,10 +1,16 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import connection, transaction
+from django.db.models.signals import pre_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from typing import Final
 from unittest.mock import patch
 import time
 
-from sponsoredissues.github_sync import github_sync_app_installation, github_sync_app_installation_issues, github_sync_app_installation_repos, github_sync_issue
-from sponsoredissues.models import GitHubAppInstallation, GitHubRepo, GitHubIssue, IssueSponsorship, Maintainer
+from sponsoredissues.github_app import GitHubIssueQueryError
+from sponsoredissues.github_sync import INCREMENTAL_SYNC_OVERLAP, RECENT_WEBHOOK_PERIOD, github_sync_app_installation_record_webhook, github_sync_app_installation_schedule_next, github_sync_interval, SyncResult, github_sync_issues, github_sync_app_installation, github_sync_app_installation_issues, github_sync_app_installation_needs_full_sync, github_sync_app_installation_repos, github_sync_issue
+from sponsoredissues.models import GitHubAppInstallation, GitHubRepo, GitHubIssue, IssueSponsorship, Maintainer, SiteStats
 from django.contrib.auth.models import User
 from sponsoredissues.tests.mock_data import MockData
 
@@ -39,6 +45,7 @@ class SyncReposForInstallationTest(TestCase):
         mock_query_repos.return_value = [ repo_json ]
 
         github_sync_app_installation_repos(MockData.APP_INSTALLATION_TOKEN, self.installation)
+        mock_query_repos.assert_called_once_with(MockData.APP_INSTALLATION_TOKEN, self.installation.installation_id())
 
         # Verify the repo was created in the database
         self.assertEqual(GitHubRepo.objects.count(), 1)
@@ -87,6 +94,44 @@ class SyncReposForInstallationTest(TestCase):
         self.assertEqual(GitHubRepo.objects.count(), 0)
         self.assertFalse(GitHubRepo.objects.filter(url=repo_url).exists())
 
+    @patch('sponsoredissues.github_sync.github_app_installation_query_repos')
+    def test_remove_repo_keeps_issues(self, mock_query_repos):
+        """Test that removing a repo sets `repo=NULL` on its issues, rather than deleting them."""
+        repo_json = MockData.repo_json()
+        repo = GitHubRepo.objects.create(url=repo_json['html_url'], app_installation=self.installation)
+        issue_json = MockData.issue_json()
+        GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=repo)
+
+        mock_query_repos.return_value = []
+
+        github_sync_app_installation_repos(MockData.APP_INSTALLATION_TOKEN, self.installation)
+
+        issue = GitHubIssue.objects.get(url=issue_json['html_url'])
+        self.assertIsNone(issue.repo)
+
+    @patch('sponsoredissues.github_sync.github_app_installation_query_repos')
+    def test_many_repos_use_constant_number_of_queries(self, mock_query_repos):
+        """Test that adding, updating, and removing repos doesn't use one query per repo."""
+        def repo_json(i):
+            return MockData.repo_json(repo_name=f'repo{i}')
+
+        for i in range(0, 100):
+            GitHubRepo.objects.create(url=repo_json(i)['html_url'], app_installation=self.installation)
+
+        # remove repos 0-49, update repos 50-99, add repos 100-149
+        mock_query_repos.return_value = [repo_json(i) for i in range(50, 150)]
+
+        # select repo URLs (1) + savepoint (1) + insert (1) + update (1)
+        # + delete: select repos, null out issues, delete repos (3)
+        # + release savepoint (1)
+        with self.assertNumQueries(8):
+            changed = github_sync_app_installation_repos(MockData.APP_INSTALLATION_TOKEN, self.installation)
+
+        self.assertTrue(changed)
+        self.assertEqual(
+            set(GitHubRepo.objects.values_list('url', flat=True)),
+            {repo_json(i)['html_url'] for i in range(50, 150)})
+
     @patch('sponsoredissues.github_sync.github_app_installation_query_repos')
     def test_skip_private_repos(self, mock_query_repos):
         """Test that private repositories are skipped and not added to database."""
@@ -361,6 +406,114 @@ class SyncIssuesForInstallationTest(TestCase):
         self.assertFalse(GitHubIssue.objects.filter(url=unfunded_issue_json['html_url']).exists())
         self.assertEqual(GitHubIssue.objects.count(), 1)
 
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issue_urls')
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issues_with_sponsoredissues_label')
+    def test_full_sync_sets_watermark(self, mock_query_issues_with_label, mock_query_issues_with_funding):
+        """Test that a full sync records the latest issue update time and the full sync time."""
+        issue1_json = MockData.issue_json(issue_number=1)
+        issue2_json = MockData.issue_json(issue_number=2)
+        issue2_json['updated_at'] = '2024-02-01T00:00:00Z'
+        mock_query_issues_with_label.return_value = [issue1_json, issue2_json]
+        mock_query_issues_with_funding.return_value = []
+
+        github_sync_app_installation_issues(MockData.APP_INSTALLATION_TOKEN, self.installation, full=True)
+
+        self.assertIsNone(mock_query_issues_with_label.call_args.kwargs['since'])
+        self.installation.refresh_from_db()
+        self.assertEqual(self.installation.issues_updated_at_watermark, datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        self.assertIsNotNone(self.installation.issues_full_sync_at)
+
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issue_urls')
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issues_with_sponsoredissues_label')
+    def test_incremental_sync(self, mock_query_issues_with_label, mock_query_issues_with_funding):
+        """
+        Test that an incremental sync only queries issues updated since
+        the watermark, and doesn't remove issues missing from the results.
+        """
+        watermark = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        full_sync_at = timezone.now()
+        self.installation.issues_updated_at_watermark = watermark
+        self.installation.issues_full_sync_at = full_sync_at
+        self.installation.save()
+
+        unchanged_issue_json = MockData.issue_json(issue_number=1)
+        GitHubIssue.objects.create(
+            url=unchanged_issue_json['html_url'],
+            data=unchanged_issue_json,
+            repo=self.repo
+        )
+
+        updated_issue_json = MockData.issue_json(issue_number=2)
+        updated_issue_json['updated_at'] = '2024-03-01T00:00:00Z'
+        mock_query_issues_with_label.return_value = [updated_issue_json]
+
+        github_sync_app_installation_issues(MockData.APP_INSTALLATION_TOKEN, self.installation, full=False)
+
+        # Check that only recently updated issues were queried
+        since = mock_query_issues_with_label.call_args.kwargs['since']
+        self.assertEqual(since, watermark - INCREMENTAL_SYNC_OVERLAP)
+        mock_query_issues_with_funding.assert_not_called()
+
+        # Check that the updated issue was added, and the unchanged
+        # issue was kept
+        self.assertTrue(GitHubIssue.objects.filter(url=updated_issue_json['html_url']).exists())
+        self.assertTrue(GitHubIssue.objects.filter(url=unchanged_issue_json['html_url']).exists())
+
+        # Check that the watermark advanced, but the full sync time did not
+        self.installation.refresh_from_db()
+        self.assertEqual(self.installation.issues_updated_at_watermark, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.installation.issues_full_sync_at, full_sync_at)
+
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issue_urls')
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issues_with_sponsoredissues_label')
+    def test_incremental_sync_without_watermark_is_full(self, mock_query_issues_with_label, mock_query_issues_with_funding):
+        """Test that an incremental sync falls back to a full sync if the installation was never synced."""
+        mock_query_issues_with_label.return_value = []
+        mock_query_issues_with_funding.return_value = []
+
+        github_sync_app_installation_issues(MockData.APP_INSTALLATION_TOKEN, self.installation, full=False)
+
+        self.assertIsNone(mock_query_issues_with_label.call_args.kwargs['since'])
+        mock_query_issues_with_funding.assert_called_once()
+
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issue_urls')
+    @patch('sponsoredissues.github_sync.github_app_installation_query_issues_with_sponsoredissues_label')
+    def test_full_sync_with_failed_funded_issue_query(self, mock_query_issues_with_label, mock_query_issues_with_funding):
+        """
+        Test that funded issues from successful query batches are still
+        synced when other batches fail, and that the sync is not counted as
+        a full sync.
+        """
+        issue1_json = MockData.issue_json(issue_number=1)
+        issue2_json = MockData.issue_json(issue_number=2)
+        for issue_json in (issue1_json, issue2_json):
+            issue = GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=self.repo)
+            IssueSponsorship.objects.create(cents_usd=500, sponsor=self.user, issue=issue)
+
+        updated_issue1_json = issue1_json.copy()
+        updated_issue1_json['title'] = 'Updated Issue 1'
+        mock_query_issues_with_label.return_value = []
+        mock_query_issues_with_funding.side_effect = GitHubIssueQueryError(
+            'failed', [updated_issue1_json], [issue2_json['html_url']])
+
+        github_sync_app_installation_issues(MockData.APP_INSTALLATION_TOKEN, self.installation, full=True)
+
+        self.assertEqual(GitHubIssue.objects.get(url=issue1_json['html_url']).data['title'], 'Updated Issue 1')
+        self.assertTrue(GitHubIssue.objects.filter(url=issue2_json['html_url']).exists())
+        self.installation.refresh_from_db()
+        self.assertIsNone(self.installation.issues_full_sync_at)
+
+    def test_needs_full_sync(self):
+        """Test the schedule for full issue syncs."""
+        self.assertTrue(github_sync_app_installation_needs_full_sync(self.installation))
+
+        self.installation.issues_full_sync_at = timezone.now()
+        self.assertFalse(github_sync_app_installation_needs_full_sync(self.installation))
+
+        with self.settings(GITHUB_SYNC_FULL_INTERVAL=60):
+            self.installation.issues_full_sync_at = timezone.now() - timedelta(seconds=61)
+            self.assertTrue(github_sync_app_installation_needs_full_sync(self.installation))
+
 class SyncAppInstallationTest(TestCase):
     """Tests for `github_sync_app_installation`."""
 
@@ -474,6 +627,9 @@ class SyncAppInstallationTest(TestCase):
     @patch('sponsoredissues.github_sync.github_sync_app_installation_issues')
     def test_mix_of_suspended_and_active_installations(self, mock_sync_issues, mock_sync_repos, mock_sync_maintainer):
         """Test that mix of suspended and active installations are handled correctly."""
+        mock_sync_repos.return_value = False
+        mock_sync_issues.return_value = 0
+
         # Mock suspended installation
         suspended_user_name = 'suspended-user'
         suspended_installation_json = MockData.installation_json(
@@ -556,6 +712,38 @@ class SyncAppInstallationTest(TestCase):
         self.assertEqual(mock_sync_repos.call_count, 1)
         self.assertEqual(mock_sync_issues.call_count, 1)
 
+    @override_settings(GITHUB_SYNC_MIN_INTERVAL=300, GITHUB_SYNC_MAX_INTERVAL=3600, GITHUB_SYNC_ACTIVE_INTERVAL=1200)
+    @patch('sponsoredissues.github_sync.github_sync_maintainer')
+    @patch('sponsoredissues.github_sync.github_sync_app_installation_repos')
+    @patch('sponsoredissues.github_sync.github_sync_app_installation_issues')
+    def test_keeps_webhook_recorded_during_sync(self, mock_sync_issues, mock_sync_repos, mock_sync_maintainer):
+        """Test that a webhook recorded while syncing is not overwritten by the sync."""
+        mock_sync_maintainer.return_value = self.maintainer1
+        mock_sync_repos.return_value = False
+
+        installation_json = MockData.installation_json(installation_id=1)
+        installation = GitHubAppInstallation.objects.create(
+            url=installation_json['html_url'],
+            data=installation_json,
+            maintainer=self.maintainer1,
+            sync_interval=3600,
+        )
+
+        def sync_issues(*args, **kwargs):
+            github_sync_app_installation_record_webhook(installation.installation_id())
+            return 0
+        mock_sync_issues.side_effect = sync_issues
+
+        with patch('sponsoredissues.github_sync.github_app_installation_query_token', return_value=MockData.APP_INSTALLATION_TOKEN):
+            with patch('sponsoredissues.github_sync.github_app_installation_query_json', return_value=installation_json):
+                github_sync_app_installation(installation_json['id'])
+
+        installation.refresh_from_db()
+        self.assertIsNotNone(installation.last_webhook_at)
+        self.assertLessEqual(
+            installation.next_sync_at,
+            installation.last_webhook_at + timedelta(seconds=1200))
+
 class SyncIssueTest(TestCase):
 
     def setUp(self):
@@ -803,6 +991,65 @@ class SyncIssueTest(TestCase):
         # Verify the issue was not added (closed + unfunded = should not exist)
         self.assertEqual(GitHubIssue.objects.count(), 0)
 
+    def test_skip_unchanged_issue(self):
+        """Test that an issue is not written to the database if its data hasn't changed."""
+        issue_json = MockData.issue_json()
+        GitHubIssue.objects.create(
+            url=issue_json['html_url'],
+            data=issue_json,
+            repo=self.repo
+        )
+
+        with self.assertNumQueries(3):
+            result = github_sync_issue(issue_json.copy())
+        self.assertEqual(result, SyncResult.UNCHANGED)
+
+        # A change to the data (or the repo) is written as usual
+        changed_issue_json = issue_json.copy()
+        changed_issue_json['title'] = 'Updated Issue'
+        self.assertEqual(github_sync_issue(changed_issue_json), SyncResult.UPDATED)
+        issue = GitHubIssue.objects.get(url=issue_json['html_url'])
+        self.assertEqual(issue.data['title'], 'Updated Issue')
+        self.assertEqual(issue.fingerprint, GitHubIssue.fingerprint_for(changed_issue_json, self.repo.id))
+
+    def test_closing_funded_issue_updates_site_stats(self):
+        """Test that closing/reopening a funded issue updates the resolved issue stats."""
+        issue_json = MockData.issue_json()
+        issue = GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=self.repo)
+        IssueSponsorship.objects.create(cents_usd=1000, sponsor=self.user, issue=issue)
+        SiteStats.rebuild()
+
+        closed_issue_json = MockData.issue_json(issue_state='closed')
+        github_sync_issue(closed_issue_json)
+        stats = SiteStats.get()
+        self.assertEqual((stats.num_resolved_issues, stats.resolved_funded_cents), (1, 1000))
+
+        github_sync_issues([issue_json])
+        stats = SiteStats.get()
+        self.assertEqual((stats.num_resolved_issues, stats.resolved_funded_cents), (0, 0))
+
+    def test_update_issue_keeps_funding_counters(self):
+        """Test that updating an issue doesn't overwrite funding counters that changed in the meantime."""
+        issue_json = MockData.issue_json()
+        GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=self.repo)
+
+        changed_issue_json = MockData.issue_json()
+        changed_issue_json['title'] = 'Updated Issue'
+
+        def donate_during_sync(sender, instance, **kwargs):
+            if not IssueSponsorship.objects.exists():
+                IssueSponsorship.objects.create(cents_usd=1000, sponsor=self.user, issue=instance)
+
+        pre_save.connect(donate_during_sync, sender=GitHubIssue)
+        try:
+            self.assertEqual(github_sync_issue(changed_issue_json), SyncResult.UPDATED)
+        finally:
+            pre_save.disconnect(donate_during_sync, sender=GitHubIssue)
+
+        issue = GitHubIssue.objects.get(url=issue_json['html_url'])
+        self.assertEqual(issue.data['title'], 'Updated Issue')
+        self.assertEqual((issue.total_cents, issue.sponsor_count), (1000, 1))
+
     def test_repo_reference_updated_when_repo_reenabled(self):
         """Test that issue's repo reference gets updated when repo is re-enabled."""
         # Create an existing funded issue with repo=None (simulating disabled repo)
@@ -830,4 +1077,239 @@ class SyncIssueTest(TestCase):
         # Verify the issue's repo reference was updated
         updated_issue = GitHubIssue.objects.get(url=issue_json['html_url'])
         self.assertEqual(updated_issue.repo, self.repo)
-        self.assertIsNotNone(updated_issue.repo)
\ No newline at end of file
+        self.assertIsNotNone(updated_issue.repo)
+
+class _Rollback(Exception):
+    pass
+
+class SyncIssuesBulkTest(TestCase):
+    """Tests for `github_sync_issues` (bulk version of `github_sync_issue`)."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = User.objects.create_user(
+            username='sponsor',
+            email='test@example.com'
+        )
+
+        maintainer_user_id = 1
+        maintainer_user_name = 'maintainer'
+        self.maintainer = Maintainer.objects.create(
+            github_account_id = maintainer_user_id,
+            github_user_json = MockData.user_json(maintainer_user_id, maintainer_user_name),
+            github_sponsors_profile_url = f'https://github.com/sponsors/{maintainer_user_name}'
+        )
+
+        installation_json = MockData.installation_json()
+        self.installation = GitHubAppInstallation.objects.create(
+            url=installation_json['html_url'],
+            data=installation_json,
+            maintainer=self.maintainer
+        )
+
+        # Only `enabled-repo` has the GitHub App enabled
+        self.repo = GitHubRepo.objects.create(
+            url=f'https://github.com/{MockData.DEFAULT_USER_NAME}/enabled-repo',
+            app_installation=self.installation,
+        )
+
+    def create_scenario(self):
+        """
+        Create issues in the database for every combination of
+        (exists in DB, funded, repo enabled, open/closed, labeled,
+        changed/unchanged/missing in GitHub results), and
+        return `(issue_jsons, issue_urls_to_remove)` for syncing them.
+        """
+        issue_jsons = []
+        issue_urls_to_remove = []
+        number = 0
+        for exists in (False, True):
+            for funded in ((False, True) if exists else (False,)):
+                for repo_enabled in (False, True):
+                    for state in ('open', 'closed'):
+                        for labeled in (False, True):
+                            for in_results in ('changed', 'unchanged', 'missing'):
+                                if in_results == 'unchanged' and not exists:
+                                    continue
+                                number += 1
+                                issue_json = MockData.issue_json(
+                                    repo_name='enabled-repo' if repo_enabled else 'disabled-repo',
+                                    issue_number=number,
+                                    issue_state=state,
+                                )
+                                if not labeled:
+                                    issue_json['labels'] = []
+                                if exists:
+                                    issue = GitHubIssue.objects.create(
+                                        url=issue_json['html_url'],
+                                        data=issue_json.copy(),
+                                        repo=self.repo if repo_enabled else None
+                                    )
+                                    if funded:
+                                        IssueSponsorship.objects.create(cents_usd=100, sponsor=self.user, issue=issue)
+                                if in_results == 'changed':
+                                    issue_json['title'] = 'Updated'
+                                    issue_jsons.append(issue_json)
+                                elif in_results == 'unchanged':
+                                    issue_jsons.append(issue_json)
+                                elif exists and not funded:
+                                    issue_urls_to_remove.append(issue_json['html_url'])
+        return (issue_jsons, issue_urls_to_remove)
+
+    def snapshot(self):
+        return {
+            issue.url: (
+                issue.data,
+                issue.repo.url if issue.repo else None,
+                *(getattr(issue, field) for field in GitHubIssue.EXTRACTED_FIELDS),
+            )
+            for issue in GitHubIssue.objects.select_related('repo')
+        }
+
+    def run_and_rollback(self, sync):
+        """
+        Create the test scenario, sync it with `sync`, and return
+        `(results, snapshot)`. Database changes are rolled back
+        afterwards.
+        """
+        try:
+            with transaction.atomic():
+                issue_jsons, issue_urls_to_remove = self.create_scenario()
+                results = sync(issue_jsons, issue_urls_to_remove)
+                snapshot = self.snapshot()
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return (results, snapshot)
+
+    def test_equivalent_to_per_issue_sync(self):
+        """Test that `github_sync_issues` has the same effect as `github_sync_issue`."""
+        def sync_per_issue(issue_jsons, issue_urls_to_remove):
+            results = {issue_json['html_url']: github_sync_issue(issue_json) for issue_json in issue_jsons}
+            for issue_url in issue_urls_to_remove:
+                GitHubIssue.objects.get(url=issue_url).delete()
+                results[issue_url] = SyncResult.REMOVED
+            return results
+
+        expected_results, expected_snapshot = self.run_and_rollback(sync_per_issue)
+        results, snapshot = self.run_and_rollback(github_sync_issues)
+
+        self.assertEqual(results, expected_results)
+        self.assertEqual(snapshot, expected_snapshot)
+
+        # Sanity check that the scenario covers every outcome
+        self.assertEqual(set(results.values()), set(SyncResult))
+
+    def count_queries(self, first_number, count):
+        """
+        Sync `count` issues (a mix of added, updated, and removed
+        issues), and return the number of database queries used.
+        """
+        issue_jsons = [MockData.issue_json(repo_name='enabled-repo', issue_number=n) for n in range(first_number, first_number + count)]
+        for i, issue_json in enumerate(issue_jsons):
+            if i % 3 != 0:
+                GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=self.repo)
+            if i % 3 == 1:
+                issue_json['state'] = 'closed'
+            if i % 3 == 2:
+                issue_json['title'] = 'Updated'
+
+        with CaptureQueriesContext(connection) as context:
+            results = github_sync_issues(issue_jsons)
+        self.assertEqual(set(results.values()), {SyncResult.ADDED, SyncResult.UPDATED, SyncResult.REMOVED})
+        return len(context.captured_queries)
+
+    def test_constant_number_of_queries(self):
+        """Test that the number of queries doesn't grow with the number of issues."""
+        self.assertEqual(self.count_queries(1, 10), self.count_queries(1000, 200))
+
+@override_settings(GITHUB_SYNC_MIN_INTERVAL=300, GITHUB_SYNC_MAX_INTERVAL=3600, GITHUB_SYNC_ACTIVE_INTERVAL=1200)
+class SyncIntervalTest(TestCase):
+    """Tests for the adaptive sync cadence (`github_sync_interval`)."""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_first_sync(self):
+        self.assertEqual(github_sync_interval(None, 0, False, None, self.now), 300)
+
+    def test_changes_reset_interval(self):
+        self.assertEqual(github_sync_interval(3600, 5, False, None, self.now), 300)
+
+    def test_backoff_without_changes(self):
+        intervals = []
+        interval = 300
+        for _ in range(5):
+            interval = github_sync_interval(interval, 0, False, None, self.now)
+            intervals.append(interval)
+        self.assertEqual(intervals, [600, 1200, 2400, 3600, 3600])
+
+    def test_funded_open_issues_cap_interval(self):
+        self.assertEqual(github_sync_interval(3600, 0, True, None, self.now), 1200)
+        self.assertEqual(github_sync_interval(300, 0, True, None, self.now), 600)
+
+    def test_recent_webhook_caps_interval(self):
+        recent = self.now - timedelta(hours=1)
+        old = self.now - RECENT_WEBHOOK_PERIOD - timedelta(hours=1)
+        self.assertEqual(github_sync_interval(3600, 0, False, recent, self.now), 1200)
+        self.assertEqual(github_sync_interval(3600, 0, False, old, self.now), 3600)
+
+@override_settings(GITHUB_SYNC_MIN_INTERVAL=300, GITHUB_SYNC_MAX_INTERVAL=3600, GITHUB_SYNC_ACTIVE_INTERVAL=1200)
+class SyncScheduleTest(TestCase):
+    """Tests for scheduling the next sync of an installation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sponsor', email='test@example.com')
+        self.maintainer = Maintainer.objects.create(
+            github_account_id = 1,
+            github_user_json = MockData.user_json(1, 'maintainer'),
+            github_sponsors_profile_url = 'https://github.com/sponsors/maintainer'
+        )
+        installation_json = MockData.installation_json()
+        self.installation = GitHubAppInstallation.objects.create(
+            url=installation_json['html_url'],
+            data=installation_json,
+            maintainer=self.maintainer,
+            sync_interval=3600,
+        )
+
+    def test_schedule_next_with_funded_open_issue(self):
+        issue_json = MockData.issue_json()
+        issue = GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json)
+        IssueSponsorship.objects.create(cents_usd=100, sponsor=self.user, issue=issue)
+
+        github_sync_app_installation_schedule_next(self.installation, changes=0)
+
+        self.assertEqual(self.installation.sync_interval, 1200)
+        self.assertAlmostEqual(
+            (self.installation.next_sync_at - timezone.now()).total_seconds(), 1200, delta=5)
+
+    def test_schedule_next_without_funded_open_issues(self):
+        issue_json = MockData.issue_json(issue_state='closed')
+        issue = GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json)
+        IssueSponsorship.objects.create(cents_usd=100, sponsor=self.user, issue=issue)
+
+        github_sync_app_installation_schedule_next(self.installation, changes=0)
+
+        self.assertEqual(self.installation.sync_interval, 3600)
+
+    def test_record_webhook(self):
+        installation_id = self.installation.installation_id()
+        later = timezone.now() + timedelta(hours=5)
+        GitHubAppInstallation.objects.filter(pk=self.installation.pk).update(next_sync_at=later)
+
+        github_sync_app_installation_record_webhook(installation_id)
+
+        self.installation.refresh_from_db()
+        self.assertIsNotNone(self.installation.last_webhook_at)
+        self.assertAlmostEqual(
+            (self.installation.next_sync_at - timezone.now()).total_seconds(), 1200, delta=5)
+
+    def test_record_webhook_keeps_earlier_sync(self):
+        soon = timezone.now() + timedelta(seconds=60)
+        GitHubAppInstallation.objects.filter(pk=self.installation.pk).update(next_sync_at=soon)
+
+        github_sync_app_installation_record_webhook(self.installation.installation_id())
+
+        self.installation.refresh_from_db()
+        self.assertEqual(self.installation.next_sync_at, soon)
@@ -62,7 +62,7 @@ class GitHubWebhookInstallationEventTest(TestCase):
     respectively.
     """
 
-    @patch('sponsoredissues.views.task_sync_github_app_installation')
+    @patch('sponsoredissues.views.task_sync_github_app_installation_debounced')
     @patch('sponsoredissues.views._verify_webhook_signature')
     def test_installation_action_created(self, mock_verify_webhook_signature, mock_celery_task):
         mock_verify_webhook_signature.return_value = True
@@ -75,9 +75,9 @@ class GitHubWebhookInstallationEventTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verify the background sync task was started with correct installation_id
-        mock_celery_task.delay.assert_called_once_with(installation_id)
+        mock_celery_task.assert_called_once_with(installation_id)
 
-    @patch('sponsoredissues.views.task_sync_github_app_installation')
+    @patch('sponsoredissues.views.task_sync_github_app_installation_debounced')
     @patch('sponsoredissues.views._verify_webhook_signature')
     def test_installation_action_unsuspend(self, mock_verify_webhook_signature, mock_celery_task):
         mock_verify_webhook_signature.return_value = True
@@ -90,11 +90,12 @@ class GitHubWebhookInstallationEventTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
         # Verify the background sync task was started with correct installation_id
-        mock_celery_task.delay.assert_called_once_with(installation_id)
+        mock_celery_task.assert_called_once_with(installation_id)
 
+    @patch('sponsoredissues.views.github_app_installation_forget_token')
     @patch('sponsoredissues.views.GitHubAppInstallation')
     @patch('sponsoredissues.views._verify_webhook_signature')
-    def test_installation_action_deleted(self, mock_verify_webhook_signature, mock_installation_model):
+    def test_installation_action_deleted(self, mock_verify_webhook_signature, mock_installation_model, mock_forget_token):
         mock_verify_webhook_signature.return_value = True
 
         installation_id = 123
@@ -110,9 +111,13 @@ class GitHubWebhookInstallationEventTest(TestCase):
         mock_installation_model.objects.filter.assert_called_once_with(url=expected_url)
         mock_installation_model.objects.filter.return_value.first.return_value.delete.assert_called_once()
 
+        # Verify that the (revoked) cached access token is discarded
+        mock_forget_token.assert_called_once_with(installation_id)
+
+    @patch('sponsoredissues.views.github_app_installation_forget_token')
     @patch('sponsoredissues.views.GitHubAppInstallation')
     @patch('sponsoredissues.views._verify_webhook_signature')
-    def test_installation_action_suspend(self, mock_verify_webhook_signature, mock_installation_model):
+    def test_installation_action_suspend(self, mock_verify_webhook_signature, mock_installation_model, mock_forget_token):
         mock_verify_webhook_signature.return_value = True
 
         installation_id = 123
@@ -128,6 +133,9 @@ class GitHubWebhookInstallationEventTest(TestCase):
         mock_installation_model.objects.filter.assert_called_once_with(url=expected_url)
         mock_installation_model.objects.filter.return_value.first.return_value.delete.assert_called_once()
 
+        # Verify that the (revoked) cached access token is discarded
+        mock_forget_token.assert_called_once_with(installation_id)
+
     @patch('sponsoredissues.views._verify_webhook_signature')
     def test_installation_action_invalid(self, mock_verify_webhook_signature):
         mock_verify_webhook_signature.return_value = True
@@ -1,9 +1,15 @@
+import importlib
+
+from django.apps import apps
 from django.test import TestCase
 from django.contrib.auth.models import User
+from unittest.mock import patch
 
-from sponsoredissues.models import GitHubAppInstallation, GitHubRepo, GitHubIssue, IssueSponsorship, Maintainer
+from sponsoredissues.models import GitHubAppInstallation, GitHubRepo, GitHubIssue, IssueSponsorship, Maintainer, SiteStats
 from sponsoredissues.tests.mock_data import MockData
 
+backfill_migration = importlib.import_module('sponsoredissues.migrations.0009_backfill_extracted_lookup_columns')
+
 
 class GitHubAppInstallationDeleteTest(TestCase):
     """Tests for the GitHubAppInstallation_delete signal handler."""
@@ -633,4 +639,241 @@ class GithubIssueTest(TestCase):
         issue.delete_force()
 
         # confirm issue was deleted
-        self.assertEqual(GitHubIssue.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(GitHubIssue.objects.count(), 0)
+
+class GitHubIssueFundingCountersTest(TestCase):
+    """Tests for the denormalized funding counters on `GitHubIssue`."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'sponsor{i}') for i in range(2)]
+        issue_data = MockData.issue_json()
+        self.issue = GitHubIssue.objects.create(url=issue_data['html_url'], data=issue_data)
+
+    def assertCounters(self, total_cents, sponsor_count):
+        self.issue.refresh_from_db()
+        self.assertEqual((self.issue.total_cents, self.issue.sponsor_count), (total_cents, sponsor_count))
+
+    def test_counters_follow_donations(self):
+        IssueSponsorship.objects.create(cents_usd=100, sponsor=self.users[0], issue=self.issue)
+        donation = IssueSponsorship.objects.create(cents_usd=200, sponsor=self.users[1], issue=self.issue)
+        self.assertCounters(300, 2)
+
+        donation = IssueSponsorship.objects.get(pk=donation.pk)
+        donation.cents_usd = 500
+        donation.save()
+        donation.save()
+        self.assertCounters(600, 2)
+
+        donation.delete()
+        self.assertCounters(100, 1)
+
+        # Donations are also deleted when the sponsor's account is deleted
+        self.users[0].delete()
+        self.assertCounters(0, 0)
+
+    def test_reconcile_funding(self):
+        IssueSponsorship.objects.create(cents_usd=100, sponsor=self.users[0], issue=self.issue)
+        IssueSponsorship.objects.create(cents_usd=200, sponsor=self.users[1], issue=self.issue)
+        issue_data = MockData.issue_json(issue_number=2)
+        unfunded_issue = GitHubIssue.objects.create(url=issue_data['html_url'], data=issue_data)
+
+        GitHubIssue.objects.filter(pk=self.issue.pk).update(total_cents=1, sponsor_count=5)
+        GitHubIssue.objects.filter(pk=unfunded_issue.pk).update(total_cents=1)
+
+        self.assertEqual(GitHubIssue.reconcile_funding(), sorted([self.issue.url, unfunded_issue.url]))
+        self.assertCounters(300, 2)
+        unfunded_issue.refresh_from_db()
+        self.assertEqual((unfunded_issue.total_cents, unfunded_issue.sponsor_count), (0, 0))
+
+        # Nothing left to fix
+        self.assertEqual(GitHubIssue.reconcile_funding(), [])
+
+class ExtractedLookupColumnsTest(TestCase):
+    """
+    Tests for the columns that are extracted from JSON data (e.g.
+    `GitHubIssue.state`, `Maintainer.login`).
+    """
+
+    def assertIssueColumns(self, issue, **expected):
+        issue.refresh_from_db()
+        self.assertEqual({field: getattr(issue, field) for field in expected}, expected)
+
+    def test_issue_columns(self):
+        issue_data = MockData.issue_json(issue_number=7)
+        issue = GitHubIssue.objects.create(url=issue_data['html_url'], data=issue_data)
+        self.assertIssueColumns(issue, state='open', number=7, owner_login=MockData.DEFAULT_USER_NAME,
+                                repo_name=MockData.DEFAULT_REPO_NAME, has_label=True)
+
+        issue.data = {**issue_data, 'state': 'closed', 'labels': []}
+        issue.save(update_fields=['data'])
+        self.assertIssueColumns(issue, state='closed', has_label=False)
+
+    def test_login_columns(self):
+        maintainer, _ = Maintainer.objects.update_or_create(
+            github_account_id=1, defaults={'github_user_json': MockData.user_json(1, 'old-name')})
+        installation, _ = GitHubAppInstallation.objects.update_or_create(
+            url='https://github.com/settings/installations/1',
+            defaults={'data': {'account': {'login': 'old-name'}}, 'maintainer': maintainer})
+
+        # The user renamed their GitHub account
+        Maintainer.objects.update_or_create(
+            github_account_id=1, defaults={'github_user_json': MockData.user_json(1, 'new-name')})
+        GitHubAppInstallation.objects.update_or_create(
+            url=installation.url, defaults={'data': {'account': {'login': 'new-name'}}})
+
+        self.assertEqual(Maintainer.objects.get(login='new-name').pk, maintainer.pk)
+        self.assertEqual(GitHubAppInstallation.objects.get(account_login='new-name').pk, installation.pk)
+
+    @patch.object(backfill_migration, 'BATCH_SIZE', 2)
+    def test_backfill_migration(self):
+        maintainer = Maintainer.objects.create(github_account_id=1, github_user_json=MockData.user_json())
+        GitHubAppInstallation.objects.create(
+            url='https://github.com/settings/installations/1', data=MockData.installation_json(), maintainer=maintainer)
+        issues = []
+        for issue_number in range(1, 6):
+            issue_data = MockData.issue_json(issue_number=issue_number)
+            issues.append(GitHubIssue.objects.create(url=issue_data['html_url'], data=issue_data))
+        GitHubIssue.objects.update(state='', number=None, owner_login='', repo_name='', has_label=False)
+        Maintainer.objects.update(login='')
+        GitHubAppInstallation.objects.update(account_login='')
+
+        backfill_migration.backfill_extracted_lookup_columns(apps, None)
+
+        for issue in issues:
+            self.assertIssueColumns(issue, state='open', number=issue.data['number'],
+                                    owner_login=MockData.DEFAULT_USER_NAME, has_label=True)
+        self.assertEqual(Maintainer.objects.get().login, MockData.DEFAULT_USER_NAME)
+        self.assertEqual(GitHubAppInstallation.objects.get().account_login, MockData.DEFAULT_USER_NAME)
+
+class SiteStatsTest(TestCase):
+    """Tests for the incrementally-maintained `SiteStats`."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'sponsor{i}') for i in range(2)]
+        self.stats_fields = ['total_funded_cents', 'num_funded_repos', 'num_resolved_issues', 'resolved_funded_cents']
+        # Build the (empty) stats, so that they are updated incrementally
+        SiteStats.get()
+
+    def create_issue(self, repo_name, issue_number, issue_state='open'):
+        issue_data = MockData.issue_json(repo_name=repo_name, issue_number=issue_number, issue_state=issue_state)
+        return GitHubIssue.objects.create(url=issue_data['html_url'], data=issue_data)
+
+    def donate(self, issue, user, cents_usd):
+        """Set the donation of `user` to `issue`, like the `donate_to_issue` view."""
+        donation = IssueSponsorship.objects.filter(issue=issue, sponsor=user).first()
+        if donation and cents_usd == 0:
+            donation.delete()
+        elif donation:
+            donation.cents_usd = cents_usd
+            donation.save()
+        else:
+            IssueSponsorship.objects.create(cents_usd=cents_usd, sponsor=user, issue=issue)
+
+    def stats(self):
+        stats = SiteStats.objects.get()
+        return {field: getattr(stats, field) for field in self.stats_fields}
+
+    def assertStatsMatchRebuild(self, expected):
+        self.assertEqual(self.stats(), expected)
+        SiteStats.rebuild()
+        self.assertEqual(self.stats(), expected)
+
+    def test_incremental_updates_match_rebuild(self):
+        issue1 = self.create_issue('repo1', 1)
+        issue2 = self.create_issue('repo1', 2)
+        issue3 = self.create_issue('repo2', 3, issue_state='closed')
+
+        self.donate(issue1, self.users[0], 100)
+        self.donate(issue1, self.users[1], 200)
+        self.donate(issue2, self.users[0], 300)
+        self.donate(issue3, self.users[0], 1000)
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 1600,
+            'num_funded_repos': 2,
+            'num_resolved_issues': 1,
+            'resolved_funded_cents': 1000,
+        })
+
+        self.donate(issue3, self.users[0], 500)
+        self.donate(issue1, self.users[0], 0)
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 1000,
+            'num_funded_repos': 2,
+            'num_resolved_issues': 1,
+            'resolved_funded_cents': 500,
+        })
+
+        self.donate(issue3, self.users[0], 0)
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 500,
+            'num_funded_repos': 1,
+            'num_resolved_issues': 0,
+            'resolved_funded_cents': 0,
+        })
+
+    def test_issue_state_changes(self):
+        issue1 = self.create_issue('repo1', 1)
+        issue2 = self.create_issue('repo1', 2)
+        self.donate(issue1, self.users[0], 100)
+
+        GitHubIssue.objects.filter(pk__in=[issue1.pk, issue2.pk]).update(data={'state': 'closed'}, state='closed')
+        SiteStats.record_issue_state_changes({issue1.pk: ('open', 'closed'), issue2.pk: ('open', 'closed')})
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 100,
+            'num_funded_repos': 1,
+            'num_resolved_issues': 1,
+            'resolved_funded_cents': 100,
+        })
+
+        GitHubIssue.objects.filter(pk=issue1.pk).update(data={'state': 'open'}, state='open')
+        SiteStats.record_issue_state_changes({issue1.pk: ('closed', 'open')})
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 100,
+            'num_funded_repos': 1,
+            'num_resolved_issues': 0,
+            'resolved_funded_cents': 0,
+        })
+
+    def test_delete_force_updates_stats(self):
+        issue = self.create_issue('repo1', 1, issue_state='closed')
+        self.donate(issue, self.users[0], 100)
+        self.donate(issue, self.users[1], 200)
+
+        issue.delete_force()
+
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 0,
+            'num_funded_repos': 0,
+            'num_resolved_issues': 0,
+            'resolved_funded_cents': 0,
+        })
+
+    def test_deleting_user_updates_stats(self):
+        issue1 = self.create_issue('repo1', 1, issue_state='closed')
+        issue2 = self.create_issue('repo2', 2)
+        self.donate(issue1, self.users[0], 100)
+        self.donate(issue1, self.users[1], 200)
+        self.donate(issue2, self.users[0], 400)
+
+        # Deleting the user cascades to their donations
+        self.users[0].delete()
+
+        self.assertStatsMatchRebuild({
+            'total_funded_cents': 200,
+            'num_funded_repos': 1,
+            'num_resolved_issues': 1,
+            'resolved_funded_cents': 200,
+        })
+
+    def test_get_builds_missing_stats(self):
+        issue = self.create_issue('repo1', 1, issue_state='closed')
+        IssueSponsorship.objects.create(cents_usd=300, sponsor=self.users[0], issue=issue)
+        IssueSponsorship.objects.create(cents_usd=200, sponsor=self.users[1], issue=issue)
+        SiteStats.objects.all().delete()
+
+        stats = SiteStats.get()
+
+        self.assertEqual(stats.total_funded_cents, 500)
+        self.assertEqual(stats.num_resolved_issues, 1)
+        self.assertEqual(stats.avg_resolved_cents(), 500)
+
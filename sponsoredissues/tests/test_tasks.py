@@ -1,63 +1,38 @@
-import uuid
+import redis
+import time
 
+from datetime import timedelta
 from unittest.mock import patch
+from django.conf import settings
 from django.test import TestCase, override_settings
-from celery.exceptions import SoftTimeLimitExceeded
-from redis.exceptions import LockError, LockNotOwnedError
-from typing import Any
+from django.utils import timezone
+from celery.exceptions import Retry, SoftTimeLimitExceeded
 
 from sponsoredissues.tasks import (
     task_sync_github_app_installation,
+    task_sync_github_app_installations_new_and_removed,
+    task_sync_github_app_installations_new_and_removed_timeout,
+    task_sync_github_app_installation_debounced,
+    task_sync_github_app_installation_least_recently_updated,
     task_app_installation_lock_acquire,
+    task_retry_countdown,
+    TASK_DEBOUNCE_TIME,
+    TASK_DISPATCH_IDLE_TIME,
+    TASK_DISPATCH_INTERVAL,
+    TASK_FAN_OUT_TIMEOUT,
+    TASK_IN_FLIGHT_KEY,
+    TASK_IN_FLIGHT_TIMEOUT,
+    TASK_LOCK_TIMEOUT,
+    TASK_PRIORITY_HIGH,
+    TASK_PRIORITY_LOW,
+    TASK_QUEUE_SWEEP,
+    TASK_QUEUE_WEBHOOK,
+    TASK_RETRY_BACKOFF_BASE,
+    TASK_RETRY_BACKOFF_MAX,
     TASK_WAIT_RETRY_TIME
 )
 from sponsoredissues.models import GitHubAppInstallation, Maintainer
-
-class MockRedisLock:
-    """Mock Redis lock for testing Celery tasks without a Redis server."""
-
-    def __init__(self, mock_redis_db, name, timeout=None, blocking=True):
-        self.mock_redis_db = mock_redis_db
-        self.name = name
-        self.timeout = timeout
-        self.blocking = blocking
-        self._uuid = uuid.uuid4()
-
-    def acquire(self, blocking=None):
-        """Simulate lock acquisition."""
-        if blocking is not None:
-            self.blocking = blocking
-
-        if not self.locked():
-            self.mock_redis_db[self.name] = self._uuid
-            return True
-        elif self.owned():
-            raise LockError("tried to acquire lock we already own")
-        else:
-            if self.blocking:
-                raise RuntimeError("blocked waiting for lock")
-            return False
-
-    def locked(self):
-        return self.mock_redis_db.get(self.name) is not None
-
-    def owned(self):
-        return self.mock_redis_db.get(self.name) == self._uuid
-
-    def release(self):
-        """Simulate lock release."""
-        if not self.locked():
-            raise LockError("tried to release a lock that nobody owns")
-        elif not self.owned():
-            raise LockNotOwnedError()
-        del self.mock_redis_db[self.name]
-
-class MockRedisClient:
-    def __init__(self):
-        self.mock_redis_db: dict[str, Any] = {}
-
-    def lock(self, name: str, timeout=None, blocking=True):
-        return MockRedisLock(self.mock_redis_db, name, timeout, blocking)
+from sponsoredissues.tests.mock_redis import MockRedisClient
 
 class TaskLockAcquireContextManagerTest(TestCase):
     """Test the task_app_installation_lock_acquire context manager directly."""
@@ -66,8 +41,7 @@ class TaskLockAcquireContextManagerTest(TestCase):
         self.mock_redis_client = MockRedisClient()
         self.lock_url = 'https://example.com'
 
-    @patch('sponsoredissues.tasks.task_sleep_after_unexpected_exception')
-    def test_context_manager_acquires_and_releases_lock(self, mock_sleep):
+    def test_context_manager_acquires_and_releases_lock(self):
         """Test normal lock acquire and release flow."""
         with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
             with task_app_installation_lock_acquire(f'{self.lock_url}') as lock:
@@ -88,24 +62,51 @@ class TaskLockAcquireContextManagerTest(TestCase):
                 self.assertTrue(lock.locked())
                 self.assertFalse(lock.owned())
 
-    @patch('sponsoredissues.tasks.task_sleep_after_unexpected_exception')
-    def test_context_manager_releases_lock_on_exception(self, mock_sleep):
+    def test_context_manager_releases_lock_on_exception(self):
         """Test that lock is released even when exception occurs."""
         with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
-            with task_app_installation_lock_acquire(f'{self.lock_url}') as lock:
-                self.assertTrue(lock.locked())
-                self.assertTrue(lock.owned())
-                # Simulate error during protected operation.
-                # This exception should be caught and logged by
-                # `task_app_installation_lock_acquire`, after which
-                # the lock should be released.
-                raise RuntimeError("Simulated error")
+            with self.assertRaises(RuntimeError):
+                with task_app_installation_lock_acquire(f'{self.lock_url}') as lock:
+                    self.assertTrue(lock.locked())
+                    self.assertTrue(lock.owned())
+                    # Simulate error during protected operation.
+                    # The lock should be released, and the exception
+                    # passed on to the caller.
+                    raise RuntimeError("Simulated error")
 
         # Lock should be released despite exception
         self.assertFalse(lock.locked())
 
-        # Sleep should be called after exception
-        mock_sleep.assert_called_once()
+    @patch('sponsoredissues.tasks.TASK_LOCK_RENEW_INTERVAL', 0.01)
+    def test_heartbeat_renews_lock(self):
+        """Test that the lock is renewed while it is held."""
+        with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
+            with task_app_installation_lock_acquire(f'{self.lock_url}') as lock:
+                self.assertEqual(lock.timeout, TASK_LOCK_TIMEOUT)
+                self.assertFalse(lock.thread_local)
+                deadline = time.monotonic() + 5
+                while lock.reacquired < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertGreaterEqual(lock.reacquired, 2)
+
+        # The heartbeat stops when the lock is released
+        reacquired = lock.reacquired
+        time.sleep(0.05)
+        self.assertEqual(lock.reacquired, reacquired)
+
+    @patch('sponsoredissues.tasks.TASK_LOCK_RENEW_INTERVAL', 0.01)
+    def test_lost_lock_is_not_released(self):
+        """Test that a lock that expired while held doesn't fail the task."""
+        with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
+            with task_app_installation_lock_acquire(f'{self.lock_url}') as lock:
+                # Simulate the lock expiring and another task taking it
+                other_lock = self.mock_redis_client.lock(f'lock:{self.lock_url}')
+                del self.mock_redis_client.mock_redis_db[f'lock:{self.lock_url}']
+                other_lock.acquire()
+                time.sleep(0.05)
+
+        # The other task's lock is left alone
+        self.assertTrue(other_lock.owned())
 
 class TaskIntegrationWithEagerModeTest(TestCase):
     """Test tasks using Celery's eager mode (synchronous execution)."""
@@ -185,19 +186,44 @@ class TaskAppInstallationSyncTest(TestCase):
                 mock_sync.assert_not_called()
 
                 # Verify retry was scheduled
-                mock_apply_async.assert_called_once_with(countdown=TASK_WAIT_RETRY_TIME)
+                mock_apply_async.assert_called_once_with(
+                    args=[self.installation_id],
+                    kwargs={'barrier': None},
+                    countdown=TASK_WAIT_RETRY_TIME)
 
-    @patch('sponsoredissues.tasks.task_sleep_after_unexpected_exception')
     @patch('sponsoredissues.tasks.github_sync_app_installation')
-    def test_soft_timeout_releases_lock(self, mock_sync, mock_sleep):
+    def test_postponed_task_keeps_queue_and_priority(self, mock_sync):
+        self.mock_redis_client.lock(f'lock:{self.installation_url}').acquire()
+
+        with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
+            with patch.object(task_sync_github_app_installation, 'apply_async') as mock_apply_async:
+                task_sync_github_app_installation.push_request(
+                    delivery_info={'routing_key': TASK_QUEUE_SWEEP, 'priority': TASK_PRIORITY_LOW})
+                try:
+                    task_sync_github_app_installation.run(self.installation_id)
+                finally:
+                    task_sync_github_app_installation.pop_request()
+
+        mock_sync.assert_not_called()
+        mock_apply_async.assert_called_once_with(
+            args=[self.installation_id],
+            kwargs={'barrier': None},
+            countdown=TASK_WAIT_RETRY_TIME,
+            queue=TASK_QUEUE_SWEEP,
+            priority=TASK_PRIORITY_LOW)
+
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_soft_timeout_releases_lock(self, mock_sync, mock_retry):
         """Test that soft timeout exception releases the lock properly."""
         # Make sync function raise SoftTimeLimitExceeded
         mock_sync.side_effect = SoftTimeLimitExceeded()
 
-        # Execute task - it should handle the exception
+        # Execute task - it should schedule a retry
         with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
             with self.settings(CELERY_TASK_ALWAYS_EAGER=True):
-                task_sync_github_app_installation(self.installation_id)
+                with self.assertRaises(Retry):
+                    task_sync_github_app_installation(self.installation_id)
 
         # Verify sync was called (and raised exception)
         mock_sync.assert_called_once_with(self.installation_id)
@@ -206,12 +232,12 @@ class TaskAppInstallationSyncTest(TestCase):
         mock_lock = self.mock_redis_client.lock(f'lock:{self.installation_url}')
         self.assertFalse(mock_lock.locked())
 
-        # Verify sleep function was called after exception
-        mock_sleep.assert_called_once()
+        # Verify retry was scheduled instead of blocking the worker
+        mock_retry.assert_called_once()
 
-    @patch('sponsoredissues.tasks.task_sleep_after_unexpected_exception')
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
     @patch('sponsoredissues.tasks.github_sync_app_installation')
-    def test_exception_releases_lock(self, mock_sync, mock_sleep):
+    def test_exception_releases_lock(self, mock_sync, mock_retry):
         """Test that various exception types all release the lock."""
         exceptions_to_test = [
             RuntimeError("Connection error"),
@@ -227,9 +253,428 @@ class TaskAppInstallationSyncTest(TestCase):
             # Execute task
             with patch('sponsoredissues.tasks.redis_client', self.mock_redis_client):
                 with self.settings(CELERY_TASK_ALWAYS_EAGER=True):
-                    task_sync_github_app_installation(self.installation_id)
+                    with self.assertRaises(Retry):
+                        task_sync_github_app_installation(self.installation_id)
 
             # Verify lock was released
             mock_lock = self.mock_redis_client.lock(f'lock:{self.installation_url}')
             self.assertFalse(mock_lock.locked(),
                             f"Lock not released for {type(exception).__name__}")
+
+class TaskSyncRetryTest(TestCase):
+    """Tests for retrying installation syncs after unexpected errors."""
+
+    def setUp(self):
+        self.installation_id = 12345
+        self.installation_url = f'https://github.com/settings/installations/{self.installation_id}'
+        self.failures_key = f'sync:failures:{self.installation_id}'
+        self.mock_redis_client = MockRedisClient()
+        redis_patcher = patch('sponsoredissues.tasks.redis_client', self.mock_redis_client)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def test_retry_countdown_backs_off_exponentially(self):
+        for failures in range(1, 10):
+            backoff = min(TASK_RETRY_BACKOFF_BASE * 2 ** (failures - 1), TASK_RETRY_BACKOFF_MAX)
+            for _ in range(20):
+                countdown = task_retry_countdown(failures)
+                self.assertGreaterEqual(countdown, backoff / 2)
+                self.assertLessEqual(countdown, backoff)
+
+    @patch('sponsoredissues.tasks.random.uniform', side_effect=lambda low, high: high)
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_consecutive_failures_back_off(self, mock_sync, mock_retry, mock_uniform):
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+
+        for _ in range(3):
+            with self.assertRaises(Retry):
+                task_sync_github_app_installation(self.installation_id)
+
+        self.assertEqual(self.mock_redis_client.get(self.failures_key), '3')
+        self.assertEqual(
+            [call.kwargs['countdown'] for call in mock_retry.call_args_list],
+            [TASK_RETRY_BACKOFF_BASE, TASK_RETRY_BACKOFF_BASE * 2, TASK_RETRY_BACKOFF_BASE * 4])
+
+        # A successful sync resets the failure counter
+        mock_sync.side_effect = None
+        task_sync_github_app_installation(self.installation_id)
+        self.assertIsNone(self.mock_redis_client.get(self.failures_key))
+
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_scheduled_sync_stays_in_flight_while_retrying(self, mock_sync, mock_retry):
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+        self.mock_redis_client.zadd(TASK_IN_FLIGHT_KEY, {self.installation_url: 0})
+
+        with self.assertRaises(Retry):
+            task_sync_github_app_installation(self.installation_id, scheduled=True)
+
+        self.assertEqual(self.mock_redis_client.zrange(TASK_IN_FLIGHT_KEY, 0, -1), [self.installation_url])
+
+    @patch('sponsoredissues.tasks.random.uniform', side_effect=lambda low, high: high)
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_retrying_sync_does_not_expire_from_in_flight(self, mock_sync, mock_retry, mock_uniform):
+        """Test that the in-flight entry is moved forward to when the retry is due."""
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+        self.mock_redis_client.zadd(TASK_IN_FLIGHT_KEY, {self.installation_url: 0})
+        self.mock_redis_client.set(self.failures_key, 10)
+
+        now = time.time()
+        with self.assertRaises(Retry):
+            task_sync_github_app_installation(self.installation_id, scheduled=True)
+
+        self.assertGreaterEqual(
+            self.mock_redis_client.zscore(TASK_IN_FLIGHT_KEY, self.installation_url),
+            now + TASK_RETRY_BACKOFF_MAX)
+
+    @patch('sponsoredissues.tasks.random.uniform', side_effect=lambda low, high: high)
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_failed_sync_pushes_next_sync_back(self, mock_sync, mock_retry, mock_uniform):
+        """Test that the scheduler doesn't pick up a failed installation while it's backing off."""
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+        maintainer = Maintainer.objects.create(
+            github_account_id=1,
+            github_user_json='{}',
+            github_sponsors_profile_url='https://github.com/sponsors/maintainer'
+        )
+        installation = GitHubAppInstallation.objects.create(
+            url=self.installation_url,
+            data=f'{{"id": {self.installation_id}}}',
+            maintainer=maintainer,
+            next_sync_at=timezone.now()
+        )
+
+        now = timezone.now()
+        with self.assertRaises(Retry):
+            task_sync_github_app_installation(self.installation_id, scheduled=True)
+
+        installation.refresh_from_db()
+        self.assertGreaterEqual(installation.next_sync_at, now + timedelta(seconds=TASK_RETRY_BACKOFF_BASE))
+
+    @patch('sponsoredissues.tasks.TASK_SYNC_MAX_RETRIES', 0)
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_gives_up_after_max_retries(self, mock_sync, mock_retry):
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+        self.mock_redis_client.zadd(TASK_IN_FLIGHT_KEY, {self.installation_url: 0})
+
+        task_sync_github_app_installation(self.installation_id, scheduled=True)
+
+        mock_retry.assert_not_called()
+        self.assertEqual(self.mock_redis_client.zrange(TASK_IN_FLIGHT_KEY, 0, -1), [])
+        self.assertEqual(self.mock_redis_client.get(self.failures_key), '1')
+
+class TaskQueueTest(TestCase):
+    """Tests for routing tasks to the webhook and sweep queues."""
+
+    def test_tasks_are_routed_to_configured_queues(self):
+        queue_names = {queue.name for queue in settings.CELERY_TASK_QUEUES}
+        self.assertEqual(queue_names, {TASK_QUEUE_WEBHOOK, TASK_QUEUE_SWEEP})
+        self.assertIn(settings.CELERY_TASK_DEFAULT_QUEUE, queue_names)
+
+        self.assertEqual(task_sync_github_app_installation.queue, TASK_QUEUE_WEBHOOK)
+        self.assertEqual(task_sync_github_app_installation_least_recently_updated.queue, TASK_QUEUE_SWEEP)
+        self.assertEqual(task_sync_github_app_installations_new_and_removed.queue, TASK_QUEUE_SWEEP)
+
+    def test_webhook_sync_is_sent_to_webhook_queue(self):
+        with patch.object(task_sync_github_app_installation.app, 'send_task') as mock_send_task:
+            with patch('sponsoredissues.tasks.redis_client', MockRedisClient()):
+                task_sync_github_app_installation_debounced(12345)
+
+        options = mock_send_task.call_args.kwargs
+        self.assertEqual(options['queue'], TASK_QUEUE_WEBHOOK)
+        self.assertEqual(options['priority'], TASK_PRIORITY_HIGH)
+
+@override_settings(GITHUB_SYNC_MAX_IN_FLIGHT=3, GITHUB_SYNC_DISPATCH_BATCH_SIZE=2)
+@patch.object(task_sync_github_app_installation_least_recently_updated, 'apply_async')
+@patch.object(task_sync_github_app_installation, 'apply_async')
+class TaskSyncSchedulerTest(TestCase):
+    """Tests for the `task_sync_github_app_installation_least_recently_updated` scheduler."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.maintainer = Maintainer.objects.create(
+            github_account_id=1,
+            github_user_json='{}',
+            github_sponsors_profile_url='https://github.com/sponsors/maintainer'
+        )
+
+        # Installations 1-5, from least recently to most recently updated
+        self.installation_ids = [1, 2, 3, 4, 5]
+        now = timezone.now()
+        for installation_id in self.installation_ids:
+            installation = GitHubAppInstallation.objects.create(
+                url=f'https://github.com/settings/installations/{installation_id}',
+                data=f'{{"id": {installation_id}}}',
+                maintainer=self.maintainer
+            )
+            GitHubAppInstallation.objects.filter(pk=installation.pk).update(
+                updated_at=now - timedelta(hours=10 - installation_id))
+
+        self.mock_redis_client = MockRedisClient()
+        redis_patcher = patch('sponsoredissues.tasks.redis_client', self.mock_redis_client)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def dispatched_ids(self, mock_dispatch):
+        return [call.kwargs['args'][0] for call in mock_dispatch.call_args_list]
+
+    def test_dispatches_stalest_installations(self, mock_dispatch, mock_apply_async):
+        task_sync_github_app_installation_least_recently_updated()
+
+        self.assertEqual(self.dispatched_ids(mock_dispatch), [1, 2])
+        for call in mock_dispatch.call_args_list:
+            self.assertEqual(call.kwargs['kwargs'], {'scheduled': True})
+            # Routine syncs must not hold up webhook syncs
+            self.assertEqual(call.kwargs['queue'], TASK_QUEUE_SWEEP)
+            self.assertEqual(call.kwargs['priority'], TASK_PRIORITY_LOW)
+        mock_apply_async.assert_called_once_with(countdown=TASK_DISPATCH_INTERVAL)
+
+    def test_skips_installations_not_due(self, mock_dispatch, mock_apply_async):
+        now = timezone.now()
+        GitHubAppInstallation.objects.filter(url__endswith='/1').update(next_sync_at=now + timedelta(minutes=5))
+        GitHubAppInstallation.objects.filter(url__endswith='/2').update(next_sync_at=now - timedelta(minutes=5))
+        GitHubAppInstallation.objects.filter(url__endswith='/3').update(next_sync_at=now - timedelta(minutes=10))
+        GitHubAppInstallation.objects.exclude(url__regex=r'/[123]$').update(next_sync_at=now + timedelta(minutes=5))
+
+        task_sync_github_app_installation_least_recently_updated()
+
+        # Installations that have been due the longest go first
+        self.assertEqual(self.dispatched_ids(mock_dispatch), [3, 2])
+
+    def test_skips_installations_in_flight(self, mock_dispatch, mock_apply_async):
+        task_sync_github_app_installation_least_recently_updated()
+        task_sync_github_app_installation_least_recently_updated()
+
+        # The second iteration may only add one more sync, because of
+        # `GITHUB_SYNC_MAX_IN_FLIGHT`
+        self.assertEqual(self.dispatched_ids(mock_dispatch), [1, 2, 3])
+
+        # Nothing more can be dispatched until a sync finishes
+        task_sync_github_app_installation_least_recently_updated()
+        self.assertEqual(self.dispatched_ids(mock_dispatch), [1, 2, 3])
+        self.assertEqual(mock_apply_async.call_args.kwargs, {'countdown': TASK_DISPATCH_IDLE_TIME})
+
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_finished_sync_frees_slot(self, mock_sync, mock_dispatch, mock_apply_async):
+        task_sync_github_app_installation_least_recently_updated()
+        task_sync_github_app_installation_least_recently_updated()
+
+        def sync(installation_id):
+            GitHubAppInstallation.objects.filter(
+                url=f'https://github.com/settings/installations/{installation_id}'
+            ).update(updated_at=timezone.now())
+        mock_sync.side_effect = sync
+
+        task_sync_github_app_installation(2, scheduled=True)
+        mock_sync.assert_called_once_with(2)
+
+        task_sync_github_app_installation_least_recently_updated()
+        self.assertEqual(self.dispatched_ids(mock_dispatch)[-1], 4)
+
+    @patch('sponsoredissues.tasks.time.time')
+    def test_lost_tasks_expire(self, mock_time, mock_dispatch, mock_apply_async):
+        mock_time.return_value = 1_000_000
+        task_sync_github_app_installation_least_recently_updated()
+        task_sync_github_app_installation_least_recently_updated()
+
+        mock_time.return_value = 1_000_000 + TASK_IN_FLIGHT_TIMEOUT + 1
+        task_sync_github_app_installation_least_recently_updated()
+
+        self.assertEqual(self.dispatched_ids(mock_dispatch), [1, 2, 3, 1, 2])
+
+    @patch('sponsoredissues.tasks.task_in_flight_urls', side_effect=redis.ConnectionError('connection refused'))
+    def test_failed_iteration_schedules_next_iteration(self, mock_in_flight_urls, mock_dispatch, mock_apply_async):
+        task_sync_github_app_installation_least_recently_updated()
+
+        mock_dispatch.assert_not_called()
+        mock_apply_async.assert_called_once_with(countdown=TASK_DISPATCH_IDLE_TIME)
+        # The scheduler lock was released
+        self.assertTrue(self.mock_redis_client.lock('lock:task_sync_scheduler').acquire(blocking=False))
+
+    def test_concurrent_iteration_does_not_schedule_next_iteration(self, mock_dispatch, mock_apply_async):
+        self.mock_redis_client.lock('lock:task_sync_scheduler').acquire()
+
+        task_sync_github_app_installation_least_recently_updated()
+
+        mock_dispatch.assert_not_called()
+        mock_apply_async.assert_not_called()
+
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    def test_scheduled_sync_not_retried_when_locked(self, mock_sync, mock_dispatch, mock_apply_async):
+        installation_url = 'https://github.com/settings/installations/1'
+        self.mock_redis_client.lock(f'lock:{installation_url}').acquire()
+
+        with patch.object(task_sync_github_app_installation, 'apply_async') as mock_retry:
+            task_sync_github_app_installation(1, scheduled=True)
+
+        mock_sync.assert_not_called()
+        mock_retry.assert_not_called()
+
+class TaskSyncDebounceTest(TestCase):
+    """Tests for debounced (webhook-triggered) installation syncs."""
+
+    def setUp(self):
+        self.installation_id = 12345
+        self.installation_url = f'https://github.com/settings/installations/{self.installation_id}'
+        self.mock_redis_client = MockRedisClient()
+        redis_patcher = patch('sponsoredissues.tasks.redis_client', self.mock_redis_client)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    @patch.object(task_sync_github_app_installation, 'apply_async')
+    def test_repeated_requests_are_coalesced(self, mock_apply_async):
+        for _ in range(10):
+            task_sync_github_app_installation_debounced(self.installation_id)
+
+        mock_apply_async.assert_called_once_with(
+            args=[self.installation_id],
+            kwargs={'debounced': True},
+            countdown=TASK_DEBOUNCE_TIME)
+
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    @patch.object(task_sync_github_app_installation, 'apply_async')
+    def test_request_after_sync_starts_is_not_coalesced(self, mock_apply_async, mock_sync):
+        task_sync_github_app_installation_debounced(self.installation_id)
+        task_sync_github_app_installation(self.installation_id, debounced=True)
+        mock_sync.assert_called_once_with(self.installation_id)
+
+        task_sync_github_app_installation_debounced(self.installation_id)
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+    @patch('sponsoredissues.tasks.github_sync_app_installation')
+    @patch.object(task_sync_github_app_installation, 'apply_async')
+    def test_request_during_sync_runs_one_follow_up(self, mock_apply_async, mock_sync):
+        def sync(installation_id):
+            # Two debounced syncs start while this sync is running,
+            # and find the installation locked.
+            for _ in range(2):
+                task_sync_github_app_installation(installation_id, debounced=True)
+            self.assertEqual(mock_apply_async.call_count, 0)
+        mock_sync.side_effect = sync
+
+        task_sync_github_app_installation(self.installation_id, debounced=True)
+
+        # Only the first sync actually ran, and it scheduled exactly one
+        # follow-up sync
+        mock_sync.assert_called_once_with(self.installation_id)
+        mock_apply_async.assert_called_once_with(
+            args=[self.installation_id],
+            kwargs={'debounced': True},
+            countdown=TASK_DEBOUNCE_TIME)
+
+        # The follow-up sync doesn't schedule another one
+        mock_sync.side_effect = None
+        task_sync_github_app_installation(self.installation_id, debounced=True)
+        self.assertEqual(mock_apply_async.call_count, 1)
+
+@patch('sponsoredissues.tasks.github_sync_app_installation')
+@patch.object(task_sync_github_app_installations_new_and_removed, 'apply_async')
+class TaskSyncNewAndRemovedTest(TestCase):
+    """Tests for `task_sync_github_app_installations_new_and_removed`."""
+
+    def setUp(self):
+        self.installation_ids = [1, 2, 3]
+        self.mock_redis_client = MockRedisClient()
+        redis_patcher = patch('sponsoredissues.tasks.redis_client', self.mock_redis_client)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def run_iteration(self):
+        """
+        Run an iteration that finds `self.installation_ids` on GitHub,
+        and return the barrier key and the enqueued syncs.
+        """
+        installations = [
+            {'id': installation_id, 'html_url': f'https://github.com/settings/installations/{installation_id}'}
+            for installation_id in self.installation_ids
+        ]
+        with patch('sponsoredissues.tasks.github_app_token', return_value='token'), \
+             patch('sponsoredissues.tasks.github_api_items', return_value=installations), \
+             patch.object(task_sync_github_app_installations_new_and_removed_timeout, 'apply_async') as mock_timeout, \
+             patch.object(task_sync_github_app_installation, 'apply_async') as mock_sync_task:
+            task_sync_github_app_installations_new_and_removed()
+
+        barrier = mock_timeout.call_args.kwargs['args'][0]
+        self.assertEqual(mock_timeout.call_args.kwargs['countdown'], TASK_FAN_OUT_TIMEOUT)
+        self.assertEqual(self.mock_redis_client.get(barrier), str(len(self.installation_ids)))
+        return barrier, mock_sync_task.call_args_list
+
+    def test_next_iteration_starts_when_all_syncs_complete(self, mock_next_iteration, mock_sync):
+        barrier, syncs = self.run_iteration()
+
+        self.assertCountEqual([call.kwargs['args'][0] for call in syncs], self.installation_ids)
+        for call in syncs:
+            self.assertEqual(call.kwargs['kwargs'], {'barrier': barrier})
+
+        for call in syncs:
+            mock_next_iteration.assert_not_called()
+            task_sync_github_app_installation(*call.kwargs['args'], **call.kwargs['kwargs'])
+
+        mock_next_iteration.assert_called_once_with()
+        self.assertIsNone(self.mock_redis_client.get(barrier))
+
+    def test_next_iteration_starts_after_timeout(self, mock_next_iteration, mock_sync):
+        barrier, syncs = self.run_iteration()
+
+        # One sync completes, the others stall
+        task_sync_github_app_installation(*syncs[0].kwargs['args'], **syncs[0].kwargs['kwargs'])
+        mock_next_iteration.assert_not_called()
+
+        task_sync_github_app_installations_new_and_removed_timeout(barrier)
+        mock_next_iteration.assert_called_once_with()
+
+        # Syncs that complete after the timeout don't start another
+        # iteration
+        for call in syncs[1:]:
+            task_sync_github_app_installation(*call.kwargs['args'], **call.kwargs['kwargs'])
+        mock_next_iteration.assert_called_once_with()
+        self.assertIsNone(self.mock_redis_client.get(barrier))
+
+    def test_timeout_after_completion_does_nothing(self, mock_next_iteration, mock_sync):
+        barrier, syncs = self.run_iteration()
+        for call in syncs:
+            task_sync_github_app_installation(*call.kwargs['args'], **call.kwargs['kwargs'])
+
+        task_sync_github_app_installations_new_and_removed_timeout(barrier)
+        mock_next_iteration.assert_called_once_with()
+
+    @patch.object(task_sync_github_app_installation, 'retry', side_effect=Retry())
+    def test_retrying_sync_has_not_completed(self, mock_retry, mock_next_iteration, mock_sync):
+        self.installation_ids = [1]
+        barrier, syncs = self.run_iteration()
+
+        mock_sync.side_effect = RuntimeError('GitHub is down')
+        with self.assertRaises(Retry):
+            task_sync_github_app_installation(*syncs[0].kwargs['args'], **syncs[0].kwargs['kwargs'])
+        mock_next_iteration.assert_not_called()
+
+        mock_sync.side_effect = None
+        task_sync_github_app_installation(*syncs[0].kwargs['args'], **syncs[0].kwargs['kwargs'])
+        mock_next_iteration.assert_called_once_with()
+
+    @patch.object(task_sync_github_app_installations_new_and_removed, 'retry', side_effect=Retry())
+    def test_failed_enqueue_does_not_arm_timeout(self, mock_retry, mock_next_iteration, mock_sync):
+        installations = [
+            {'id': installation_id, 'html_url': f'https://github.com/settings/installations/{installation_id}'}
+            for installation_id in self.installation_ids
+        ]
+        with patch('sponsoredissues.tasks.github_app_token', return_value='token'), \
+             patch('sponsoredissues.tasks.github_api_items', return_value=installations), \
+             patch.object(task_sync_github_app_installations_new_and_removed_timeout, 'apply_async') as mock_timeout, \
+             patch.object(task_sync_github_app_installation, 'apply_async') as mock_sync_task:
+            mock_sync_task.side_effect = [None, redis.ConnectionError('connection refused')]
+            with self.assertRaises(Retry):
+                task_sync_github_app_installations_new_and_removed()
+
+        # The iteration is retried, so neither the timeout nor the sync
+        # that was already enqueued may start another one.
+        mock_retry.assert_called_once()
+        mock_timeout.assert_not_called()
+        sync = mock_sync_task.call_args_list[0]
+        self.assertIsNone(self.mock_redis_client.get(sync.kwargs['kwargs']['barrier']))
+        task_sync_github_app_installation(*sync.kwargs['args'], **sync.kwargs['kwargs'])
+        mock_next_iteration.assert_not_called()
@@ -0,0 +1,251 @@
+from allauth.socialaccount.models import SocialAccount, SocialToken
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+
+from sponsoredissues.models import GitHubAppInstallation, GitHubRepo, GitHubIssue, IssueSponsorship, Maintainer, SiteStats
+from sponsoredissues.tests.mock_data import MockData
+from sponsoredissues.views import calculate_trending_issues
+
+# Note: The default static files storage requires running
+# `collectstatic` first.
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class OwnerIssuesViewTest(TestCase):
+    """Tests for the `owner_issues` view."""
+
+    def setUp(self):
+        self.owner = MockData.DEFAULT_USER_NAME
+        self.maintainer = Maintainer.objects.create(
+            github_account_id=MockData.DEFAULT_USER_ID,
+            github_user_json=MockData.user_json(),
+            github_sponsors_profile_url=f'https://github.com/sponsors/{self.owner}'
+        )
+        self.installation = GitHubAppInstallation.objects.create(
+            url='https://github.com/settings/installations/1111',
+            data=MockData.installation_json(),
+            maintainer=self.maintainer
+        )
+        self.repo = GitHubRepo.objects.create(
+            url=f'https://github.com/{self.owner}/{MockData.DEFAULT_REPO_NAME}',
+            app_installation=self.installation
+        )
+        self.sponsor = User.objects.create_user(username='sponsor')
+        self.other_sponsor = User.objects.create_user(username='other-sponsor')
+
+    def create_issue(self, issue_number, issue_state='open', repo=None):
+        issue_json = MockData.issue_json(issue_number=issue_number, issue_state=issue_state)
+        return GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json, repo=repo or self.repo)
+
+    def get_issues(self, *path):
+        response = self.client.get('/' + '/'.join([self.owner, *path]))
+        self.assertEqual(response.status_code, 200)
+        return response.context['issues']
+
+    def test_issues_sorted_by_funding(self):
+        issue1 = self.create_issue(1)
+        issue2 = self.create_issue(2)
+        self.create_issue(3)
+        self.create_issue(4, issue_state='closed')
+        IssueSponsorship.objects.create(cents_usd=500, sponsor=self.sponsor, issue=issue1)
+        IssueSponsorship.objects.create(cents_usd=1000, sponsor=self.sponsor, issue=issue2)
+        IssueSponsorship.objects.create(cents_usd=1000, sponsor=self.other_sponsor, issue=issue2)
+
+        issues = self.get_issues()
+
+        self.assertEqual([issue['number'] for issue in issues], [2, 1, 3])
+        self.assertEqual([issue['donation_total_cents'] for issue in issues], [2000, 500, 0])
+        self.assertEqual([issue['num_sponsors'] for issue in issues], [2, 1, 0])
+        self.assertEqual([issue['rank'] for issue in issues], [1, 2, 3])
+        self.assertEqual(issues[0]['title'], 'Test Issue')
+        self.assertEqual(issues[0]['repo'], MockData.DEFAULT_REPO_NAME)
+        self.assertTrue(issues[0]['has_sponsoredissues_label'])
+        self.assertTrue(issues[0]['github_app_enabled_on_repo'])
+        self.assertEqual(issues[0]['user_donation_cents'], 0)
+
+    @patch('sponsoredissues.views.GitHubSponsorService.calculate_allocated_sponsor_cents', return_value=(1500, 5000))
+    def test_user_donation(self, mock_calculate):
+        issue1 = self.create_issue(1)
+        issue2 = self.create_issue(2)
+        IssueSponsorship.objects.create(cents_usd=500, sponsor=self.sponsor, issue=issue1)
+        IssueSponsorship.objects.create(cents_usd=1000, sponsor=self.sponsor, issue=issue2)
+        IssueSponsorship.objects.create(cents_usd=3000, sponsor=self.other_sponsor, issue=issue2)
+        # Note: `github_autorefresh_token` middleware requires a
+        # GitHub access token for signed-in users.
+        account = SocialAccount.objects.create(user=self.sponsor, provider='github', uid='42')
+        SocialToken.objects.create(account=account, token='token', expires_at=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.sponsor)
+
+        issues = self.get_issues()
+
+        self.assertEqual([issue['donation_total_cents'] for issue in issues], [4000, 500])
+        self.assertEqual([issue['user_donation_cents'] for issue in issues], [1000, 500])
+
+    @patch('sponsoredissues.views.GitHubSponsorService.calculate_allocated_sponsor_cents', return_value=(1500, 5000))
+    def test_user_donation_sums_multiple_donations(self, mock_calculate):
+        issue = self.create_issue(1)
+        IssueSponsorship.objects.create(cents_usd=500, sponsor=self.sponsor, issue=issue)
+        IssueSponsorship.objects.create(cents_usd=700, sponsor=self.sponsor, issue=issue)
+        account = SocialAccount.objects.create(user=self.sponsor, provider='github', uid='42')
+        SocialToken.objects.create(account=account, token='token', expires_at=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.sponsor)
+
+        issues = self.get_issues()
+
+        self.assertEqual([issue['user_donation_cents'] for issue in issues], [1200])
+
+    def test_selected_issue(self):
+        self.create_issue(1)
+        self.create_issue(2)
+
+        issues = self.get_issues(MockData.DEFAULT_REPO_NAME, 'issues', '2')
+
+        self.assertEqual({issue['number']: issue['is_selected'] for issue in issues}, {1: False, 2: True})
+
+    def test_not_found(self):
+        self.create_issue(1, issue_state='closed')
+
+        for path in ['unknown-owner',
+                     f'{self.owner}/unknown-repo',
+                     f'{self.owner}/{MockData.DEFAULT_REPO_NAME}/issues/1',
+                     f'{self.owner}/{MockData.DEFAULT_REPO_NAME}/issues/2']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f'/{path}').status_code, 404)
+
+    def test_frozen_repo(self):
+        """Test that a repo with funded issues is shown after the app is disabled on it."""
+        issue = self.create_issue(1)
+        IssueSponsorship.objects.create(cents_usd=500, sponsor=self.sponsor, issue=issue)
+        self.repo.delete()
+
+        issues = self.get_issues(MockData.DEFAULT_REPO_NAME)
+
+        self.assertEqual(len(issues), 1)
+        self.assertFalse(issues[0]['github_app_enabled_on_repo'])
+
+    @patch('sponsoredissues.views.GitHubSponsorService.calculate_allocated_sponsor_cents', return_value=(0, 5000))
+    def test_donation_updates_site_stats(self, mock_calculate):
+        self.create_issue(1)
+        account = SocialAccount.objects.create(user=self.sponsor, provider='github', uid='42')
+        SocialToken.objects.create(account=account, token='token', expires_at=timezone.now() + timedelta(hours=1))
+        self.client.force_login(self.sponsor)
+        SiteStats.get()
+
+        donate_url = f'/{self.owner}/{MockData.DEFAULT_REPO_NAME}/issues/1/donate'
+        self.client.post(donate_url, {'donation_dollars': '12.50'})
+        stats = SiteStats.get()
+        self.assertEqual((stats.total_funded_cents, stats.num_funded_repos), (1250, 1))
+
+        self.client.post(donate_url, {'donation_dollars': '0'})
+        stats = SiteStats.get()
+        self.assertEqual((stats.total_funded_cents, stats.num_funded_repos), (0, 0))
+
+    def test_query_count_is_constant(self):
+        for issue_number in range(1, 21):
+            issue = self.create_issue(issue_number)
+            IssueSponsorship.objects.create(cents_usd=issue_number, sponsor=self.sponsor, issue=issue)
+
+        # One query for the maintainer (including the existence
+        # checks), one for the issues, and one for the GitHub login
+        # link in the page template
+        with self.assertNumQueries(3):
+            issues = self.get_issues(MockData.DEFAULT_REPO_NAME, 'issues', '1')
+        self.assertEqual(len(issues), 20)
+
+class CalculateTrendingIssuesTest(TestCase):
+    """Tests for `calculate_trending_issues`."""
+
+    def setUp(self):
+        self.sponsors = [User.objects.create_user(username=f'sponsor{i}') for i in range(3)]
+        self.now = timezone.now()
+
+    def create_issue(self, issue_number, issue_state='open'):
+        issue_json = MockData.issue_json(issue_number=issue_number, issue_state=issue_state)
+        return GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json)
+
+    def donate(self, issue, sponsor, cents_usd, days_ago):
+        sponsorship = IssueSponsorship.objects.create(cents_usd=cents_usd, sponsor=sponsor, issue=issue)
+        IssueSponsorship.objects.filter(pk=sponsorship.pk).update(
+            created_at=self.now - timedelta(days=days_ago, hours=1))
+
+    def test_trending_issues(self):
+        # Recently funded by two sponsors, plus two old donations from
+        # the same sponsor
+        issue1 = self.create_issue(1)
+        self.donate(issue1, self.sponsors[0], 100, days_ago=1)
+        self.donate(issue1, self.sponsors[1], 200, days_ago=3)
+        self.donate(issue1, self.sponsors[2], 5000, days_ago=30)
+        self.donate(issue1, self.sponsors[2], 1000, days_ago=40)
+
+        # Big but old donation
+        issue2 = self.create_issue(2)
+        self.donate(issue2, self.sponsors[0], 10000, days_ago=20)
+
+        # Small recent donation
+        issue3 = self.create_issue(3)
+        self.donate(issue3, self.sponsors[1], 50, days_ago=0)
+
+        # Not trending: closed, or no donations
+        issue4 = self.create_issue(4, issue_state='closed')
+        self.donate(issue4, self.sponsors[0], 100000, days_ago=0)
+        self.create_issue(5)
+
+        with self.assertNumQueries(1):
+            trending_issues = calculate_trending_issues(limit=10)
+
+        self.assertEqual([issue['number'] for issue in trending_issues], [1, 3, 2])
+
+        issue = trending_issues[0]
+        self.assertEqual(issue['owner'], MockData.DEFAULT_USER_NAME)
+        self.assertEqual(issue['repo'], MockData.DEFAULT_REPO_NAME)
+        self.assertEqual(issue['title'], 'Test Issue')
+        self.assertEqual(issue['recent_funding_cents'], 300)
+        self.assertEqual(issue['unique_sponsor_count'], 2)
+        self.assertEqual(issue['days_since_last_donation'], 1)
+        self.assertEqual(issue['total_funding_cents'], 6300)
+        self.assertEqual(issue['total_sponsors'], 3)
+        self.assertEqual(issue['trending_score'], 300 + 2 * 50 - 1 * 10)
+
+        self.assertEqual(trending_issues[1]['trending_score'], 50 + 50)
+        self.assertEqual(trending_issues[2]['recent_funding_cents'], 0)
+        self.assertEqual(trending_issues[2]['unique_sponsor_count'], 0)
+        self.assertEqual(trending_issues[2]['trending_score'], -200)
+
+    def test_limit(self):
+        for issue_number in range(1, 6):
+            self.donate(self.create_issue(issue_number), self.sponsors[0], issue_number * 100, days_ago=1)
+
+        trending_issues = calculate_trending_issues(limit=2)
+
+        self.assertEqual([issue['number'] for issue in trending_issues], [5, 4])
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class IndexViewTest(TestCase):
+    """Tests for the `index` view."""
+
+    def test_site_stats(self):
+        sponsor = User.objects.create_user(username='sponsor')
+        for issue_number, issue_state in [(1, 'open'), (2, 'closed'), (3, 'closed')]:
+            issue_json = MockData.issue_json(issue_number=issue_number, issue_state=issue_state)
+            issue = GitHubIssue.objects.create(url=issue_json['html_url'], data=issue_json)
+            IssueSponsorship.objects.create(cents_usd=issue_number * 100, sponsor=sponsor, issue=issue)
+        SiteStats.rebuild()
+
+        # One query for the site stats, one for the trending issues,
+        # and one for the GitHub login link in the page template
+        with self.assertNumQueries(3):
+            response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_funded_cents'], 600)
+        self.assertEqual(response.context['num_funded_repos'], 1)
+        self.assertEqual(response.context['num_resolved_issues'], 2)
+        self.assertEqual(response.context['avg_resolved_cents'], 250)
+
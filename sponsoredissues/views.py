@@ -4,18 +4,21 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import BadRequest
-from django.db.models import Sum, Count
+from django.db import transaction
+from django.db.models import Count, DateTimeField, Exists, ExpressionWrapper, F, FloatField, Func, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, Http404
 from django.utils import timezone
 from datetime import timedelta
 from pprint import pformat
-from .models import GitHubAppInstallation, GitHubIssue, GitHubRepo, IssueSponsorship, Maintainer
-from .github_api import github_issue_has_sponsoredissues_label
-from .github_sync import github_sync_issue
+from .models import GitHubAppInstallation, GitHubIssue, GitHubRepo, IssueSponsorship, Maintainer, SiteStats
+from .github_app import github_app_installation_forget_token
+from .github_sync import github_sync_app_installation_record_webhook, github_sync_issue
 from .github_sponsors import GitHubSponsorService
-from .tasks import task_sync_github_app_installation
+from .tasks import task_sync_github_app_installation_debounced
 import json
 import hmac
 import hashlib
@@ -24,6 +27,25 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+class DaysSince(Func):
+    """
+    Number of whole days from the datetime `expression` until `now` (a
+    Python datetime), as an integer.
+    """
+    template = 'CAST(FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400) AS INTEGER)'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def __init__(self, expression, now, **extra):
+        super().__init__(Value(now, output_field=DateTimeField()), expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context)
+
 def calculate_trending_issues(limit=10):
     """
     Calculate trending issues using a hybrid approach that considers:
@@ -32,132 +54,94 @@ def calculate_trending_issues(limit=10):
     3. Recency of last donation
     4. Only open issues
 
+    The trending score is calculated in a single query (using
+    conditional aggregation), and the issues are sorted and limited
+    in the database.
+
     Returns a list of trending issues with their details and trending score.
     """
     now = timezone.now()
     two_weeks_ago = now - timedelta(days=14)
+    recent = Q(sponsor_amounts__created_at__gte=two_weeks_ago)
 
     # Get all open issues with funding
-    open_issues = GitHubIssue.objects.filter(
-        data__state='open',
-        sponsor_amounts__isnull=False
-    ).distinct()
-
-    trending_issues = []
-
-    for issue in open_issues:
-        # Get recent donations (last 14 days)
-        recent_donations = issue.sponsor_amounts.filter(
-            created_at__gte=two_weeks_ago
-        )
-
-        # Calculate recent funding amount and unique sponsor count
-        recent_stats = recent_donations.aggregate(
-            total_cents=Sum('cents_usd'),
-            unique_sponsors=Count('sponsor', distinct=True)
-        )
-
-        recent_funding_cents = recent_stats['total_cents'] or 0
-        unique_sponsor_count = recent_stats['unique_sponsors'] or 0
-
-        # Get the most recent donation date for this issue
-        latest_donation = issue.sponsor_amounts.order_by('-created_at').first()
-        if latest_donation:
-            days_since_last_donation = (now - latest_donation.created_at).days
-        else:
-            continue  # Skip if no donations
-
-        # Calculate trending score
-        # Formula: (recent_funding_cents * 1.0) + (unique_sponsors * 50) - (days_since_last_donation * 10)
-        trending_score = (
-            recent_funding_cents * 1.0 +
-            unique_sponsor_count * 50 -
-            days_since_last_donation * 10
+    #
+    # Note: The total all-time funding is denormalized onto the issue
+    # (see `GitHubIssue.total_cents`), so we only aggregate over the
+    # donations for the recent funding, the sponsor counts, and the
+    # last donation date. (`GitHubIssue.sponsor_count` counts
+    # donations, not distinct sponsors.)
+    open_issues = (
+        GitHubIssue.objects
+        .filter(state='open', sponsor_count__gt=0)
+        .annotate(
+            # Recent funding amount and unique sponsor count
+            recent_funding_cents=Coalesce(Sum('sponsor_amounts__cents_usd', filter=recent), 0),
+            unique_sponsor_count=Count('sponsor_amounts__sponsor', filter=recent, distinct=True),
+            # All-time unique sponsor count
+            total_sponsors=Count('sponsor_amounts__sponsor', distinct=True),
+            # Days since the most recent donation
+            days_since_last_donation=DaysSince(Max('sponsor_amounts__created_at'), now),
         )
-
-        # Get total all-time funding for display
-        total_stats = issue.sponsor_amounts.aggregate(
-            total_cents=Sum('cents_usd'),
-            total_sponsors=Count('sponsor', distinct=True)
+        .annotate(
+            # Formula: (recent_funding_cents * 1.0) + (unique_sponsors * 50) - (days_since_last_donation * 10)
+            trending_score=ExpressionWrapper(
+                F('recent_funding_cents') * 1.0 +
+                F('unique_sponsor_count') * 50 -
+                F('days_since_last_donation') * 10,
+                output_field=FloatField()
+            ),
         )
+        .order_by('-trending_score', '-created_at')
+        .values(
+            'url',
+            'trending_score',
+            'recent_funding_cents',
+            'unique_sponsor_count',
+            'days_since_last_donation',
+            'owner_login',
+            'repo_name',
+            'number',
+            'total_sponsors',
+            # Total all-time funding for display
+            total_funding_cents=F('total_cents'),
+            title=KT('data__title'),
+        )[:limit]
+    )
 
-        try:
-            issue_data = issue.data
-
-            # Extract owner/repo from URL (e.g., "benvvalk/qutebrowser")
-            url_parts = issue.url.split('/')
-            if len(url_parts) >= 5:
-                owner = url_parts[3]
-                repo = url_parts[4]
-
-            trending_issues.append({
-                'owner': owner,
-                'repo': repo,
-                'title': issue_data.get('title', 'No title'),
-                'number': issue_data.get('number', 0),
-                'url': issue.url,
-                'trending_score': trending_score,
-                'recent_funding_cents': recent_funding_cents,
-                'unique_sponsor_count': unique_sponsor_count,
-                'total_funding_cents': total_stats['total_cents'] or 0,
-                'total_sponsors': total_stats['total_sponsors'] or 0,
-                'days_since_last_donation': days_since_last_donation,
-            })
-        except (json.JSONDecodeError, AttributeError):
-            continue
-
-    # Sort by trending score (descending) and limit to top N
-    trending_issues.sort(key=lambda x: x['trending_score'], reverse=True)
-    return trending_issues[:limit]
+    trending_issues = []
+    for issue in open_issues:
+        trending_issues.append({
+            'owner': issue['owner_login'],
+            'repo': issue['repo_name'],
+            'title': issue['title'] if issue['title'] is not None else 'No title',
+            'number': issue['number'] if issue['number'] is not None else 0,
+            'url': issue['url'],
+            'trending_score': issue['trending_score'],
+            'recent_funding_cents': issue['recent_funding_cents'],
+            'unique_sponsor_count': issue['unique_sponsor_count'],
+            'total_funding_cents': issue['total_funding_cents'],
+            'total_sponsors': issue['total_sponsors'],
+            'days_since_last_donation': issue['days_since_last_donation'],
+        })
+
+    return trending_issues
 
 def index(request):
-    # Calculate total funded amount across all issues
-    total_funded_cents = IssueSponsorship.objects.aggregate(
-        total=Sum('cents_usd')
-    )['total'] or 0
-
-    # Get all issues that have been funded (have at least one IssueSponsorship)
-    funded_issues = GitHubIssue.objects.filter(
-        sponsor_amounts__isnull=False
-    ).distinct()
-
-    # Count unique repositories that have received funding
-    # Extract repo from URL pattern: https://github.com/{owner}/{repo}/issues/{number}
-    funded_repos = set()
-    for issue in funded_issues:
-        url_parts = issue.url.split('/')
-        if len(url_parts) >= 5:
-            owner = url_parts[3]
-            repo = url_parts[4]
-            funded_repos.add(f"{owner}/{repo}")
-
-    num_funded_repos = len(funded_repos)
-
-    # Calculate resolved issues statistics
-    # An issue is "resolved" if it's closed and has funding
-    resolved_issues = funded_issues.filter(data__state='closed')
-    num_resolved_issues = resolved_issues.count()
-
-    # Calculate average funding for resolved issues
-    if num_resolved_issues > 0:
-        resolved_total_cents = 0
-        for issue in resolved_issues:
-            issue_total = issue.sponsor_amounts.aggregate(
-                total=Sum('cents_usd')
-            )['total'] or 0
-            resolved_total_cents += issue_total
-        avg_resolved_cents = resolved_total_cents // num_resolved_issues
-    else:
-        avg_resolved_cents = 0
+    # Site-wide stats are precomputed (see `SiteStats`), so that the
+    # homepage doesn't need to aggregate over all funded issues.
+    #
+    # An issue is "resolved" if it's closed and has funding.
+    site_stats = SiteStats.get()
 
     # Get trending issues
     trending_issues = calculate_trending_issues(limit=10)
 
     context = {
-        'total_funded_cents': total_funded_cents,
-        'num_funded_repos': num_funded_repos,
-        'num_resolved_issues': num_resolved_issues,
-        'avg_resolved_cents': avg_resolved_cents,
+        'total_funded_cents': site_stats.total_funded_cents,
+        'num_funded_repos': site_stats.num_funded_repos,
+        'num_resolved_issues': site_stats.num_resolved_issues,
+        'avg_resolved_cents': site_stats.avg_resolved_cents(),
         'trending_issues': trending_issues,
     }
 
@@ -178,114 +162,123 @@ def owner_issues(request, owner, repo=None, issue_number=None):
     #
     # (1) the GitHub App is still installed/enabled, *OR*
     # (2) the maintainer has issues with non-zero funding.
-    maintainer = Maintainer.objects.filter(github_user_json__login=owner).first()
+    #
+    # The existence checks for the app installation and the repo (see
+    # below) are evaluated in the same query.
+    existence_checks = {
+        'has_app_installation': Exists(
+            GitHubAppInstallation.objects.filter(account_login=owner)
+        ),
+    }
+    if repo:
+        repo_url=f"https://github.com/{owner}/{repo}"
+        existence_checks['has_repo'] = Exists(
+            GitHubRepo.objects.filter(url=repo_url)
+        ) | Exists(
+            GitHubIssue.get_by_repo_url(repo_url)
+        )
+    maintainer = Maintainer.objects.filter(login=owner).annotate(**existence_checks).first()
     if not maintainer:
         raise Http404(f'GitHub account "{owner}" has not installed the "sponsoredissues-maintainer" GitHub App')
 
     # Existence check for app installation: Return HTTP 404 unless our
     # database shows that `owner` has installed the
     # "sponsoredissues-maintainer" GitHub App.
-    if not GitHubAppInstallation.objects.filter(data__account__login=owner).exists():
+    if not maintainer.has_app_installation:
         raise Http404(f'GitHub account "{owner}" has not installed the "sponsoredissues-maintainer" GitHub App')
 
     # Existence check for repo: If optional repo component is included
     # in URL, validate that either: (1) The
     # "sponsoredissues-maintainer" GitHub App is enabled on the repo,
     # or (2) we have one or more "frozen" issues for that repo.
-    if repo:
-        repo_url=f"https://github.com/{owner}/{repo}"
-        if not GitHubRepo.objects.filter(url=repo_url).exists() and not GitHubIssue.get_by_repo_url(repo_url).exists():
-            raise Http404(f'GitHub account "{owner}" has not enabled the "sponsoredissues-maintainer" GitHub App on repo "{owner}/{repo}"')
+    if repo and not maintainer.has_repo:
+        raise Http404(f'GitHub account "{owner}" has not enabled the "sponsoredissues-maintainer" GitHub App on repo "{owner}/{repo}"')
+
+    # Query the open issues for this owner (across all repos), along
+    # with their funding, in a single query. We only select the parts
+    # of the issue JSON that we display, rather than loading the full
+    # JSON for every issue.
+    #
+    # The total funding of each issue is denormalized onto the issue
+    # (see `GitHubIssue.total_cents`), so we only need a subquery for
+    # the current user's donation (if any).
+    if request.user.is_authenticated:
+        user_donation_cents = Coalesce(Subquery(
+            IssueSponsorship.objects
+            .filter(issue=OuterRef('pk'), sponsor=request.user)
+            .order_by()
+            .values('issue')
+            .annotate(total=Sum('cents_usd'))
+            .values('total')
+        ), 0)
+    else:
+        user_donation_cents = Value(0)
+    issues = (
+        GitHubIssue.objects
+        .filter(owner_login=owner, state='open')
+        .annotate(user_donation_cents=user_donation_cents)
+        .order_by('-total_cents', '-created_at')
+        .values(
+            'url',
+            'repo_id',
+            'user_donation_cents',
+            'number',
+            'repo_name',
+            'has_label',
+            donation_total_cents=F('total_cents'),
+            num_sponsors=F('sponsor_count'),
+            title=KT('data__title'),
+            labels=F('data__labels'),
+        )
+    )
+
+    parsed_issues = []
+    for issue in issues:
+        issue_repo = issue['repo_name']
+        this_issue_number = issue['number']
+        labels = issue['labels'] or []
+
+        # Determine if this issue should be highlighted:
+        # - If repo and issue_number are both provided, highlight only that specific issue
+        # - If only repo is provided, highlight all issues from that repo
+        is_selected = False
+        if repo and issue_number:
+            is_selected = (issue_repo == repo and this_issue_number == issue_number)
+        elif repo:
+            is_selected = (issue_repo == repo)
+
+        # Maintainer may have accidentally removed "sponsoredissues.org"
+        # label from an issue that has non-zero funding. In that
+        # case, we show the issue with a special "frozen" state
+        # with the "Add or Remove Funds" button disabled.
+        parsed_issue = {
+            'is_selected': is_selected,
+            'github_app_enabled_on_repo': issue['repo_id'] != None,
+            'has_sponsoredissues_label': issue['has_label'],
+            'owner': owner,
+            'repo': issue_repo,
+            'title': issue['title'] if issue['title'] is not None else 'No title',
+            'number': this_issue_number,
+            'state': 'open',
+            'labels': labels,
+            'url': issue['url'],
+            'donation_total_cents': issue['donation_total_cents'],
+            'user_donation_cents': issue['user_donation_cents'],
+            'num_sponsors': issue['num_sponsors'],
+        }
+        parsed_issues.append(parsed_issue)
 
     # Existence check for issue number: If optional issue number
     # component is included in URL, validate that issue exists in
-    # our database.
+    # our database (i.e. is one of the open issues above).
     if issue_number:
         assert repo # this should always be set, due to our URL scheme
         issue_url=f"https://github.com/{owner}/{repo}/issues/{issue_number}"
-        if not GitHubIssue.objects.filter(url=issue_url, data__state="open").exists():
+        if not any(issue['url'] == issue_url for issue in parsed_issues):
             raise Http404(f'GitHub account "{owner}" has not added "sponsoredissues.org" label to issue, or issue is closed.')
 
-    # Filter issues for this owner (across all repos)
-    owner_url_pattern = f"https://github.com/{owner}/"
-    issues = GitHubIssue.objects.filter(url__startswith=owner_url_pattern)
-
-    # Parse issue data
-    parsed_issues = []
-    for issue in issues:
-        try:
-            issue_data = issue.data
-
-            # Only show open issues for now
-            state = issue_data['state']
-            if state != 'open':
-                continue
-
-            # Extract owner/repo from URL (e.g., https://github.com/benvvalk/qutebrowser/issues/123)
-            url_parts = issue.url.split('/')
-            if len(url_parts) >= 5:
-                issue_owner = url_parts[3]
-                issue_repo = url_parts[4]
-            else:
-                continue  # Skip malformed URLs
-
-            # Calculate donation amount and contributors for this issue
-            donation_stats = issue.sponsor_amounts.aggregate(
-                total_cents=Sum('cents_usd'),
-                sponsor_count=Count('id')
-            )
-
-            # Amount that current user has donated to the issue (if any).
-            user_donation_cents = 0
-            if request.user.is_authenticated:
-                user_donation_cents = issue.sponsor_amounts.filter(
-                    sponsor=request.user
-                ).aggregate(
-                    total=Sum('cents_usd')
-                )['total'] or 0
-
-            this_issue_number = issue_data.get('number')
-
-            # Determine if this issue should be highlighted:
-            # - If repo and issue_number are both provided, highlight only that specific issue
-            # - If only repo is provided, highlight all issues from that repo
-            is_selected = False
-            if repo and issue_number:
-                is_selected = (issue_repo == repo and this_issue_number == issue_number)
-            elif repo:
-                is_selected = (issue_repo == repo)
-
-            # Maintainer may have accidentally removed "sponsoredissues.org"
-            # label from an issue that has non-zero funding. In that
-            # case, we show the issue with a special "frozen" state
-            # with the "Add or Remove Funds" button disabled.
-            has_sponsoredissues_label = github_issue_has_sponsoredissues_label(issue_data)
-
-            # Note: `or 0` is needed below because `Sum('cents_usd')`
-            # returns `None` when there are no `IssueSponsorship` records for
-            # the GitHub issue.
-            parsed_issue = {
-                'is_selected': is_selected,
-                'github_app_enabled_on_repo': issue.repo != None,
-                'has_sponsoredissues_label': has_sponsoredissues_label,
-                'rank': len(parsed_issues) + 1,  # Simple ranking by order
-                'owner': issue_owner,
-                'repo': issue_repo,
-                'title': issue_data.get('title', 'No title'),
-                'number': this_issue_number,
-                'state': issue_data.get('state', 'open'),
-                'labels': issue_data.get('labels', []),
-                'url': issue.url,
-                'donation_total_cents': donation_stats['total_cents'] or 0,
-                'user_donation_cents': user_donation_cents,
-                'num_sponsors': donation_stats['sponsor_count'],
-            }
-            parsed_issues.append(parsed_issue)
-        except (json.JSONDecodeError, AttributeError):
-            continue
-
-    # Sort issues by donation amount in descending order
-    parsed_issues.sort(key=lambda issue: issue['donation_total_cents'], reverse=True)
+    # Note: Issues are already sorted by donation amount in descending
+    # order (see `order_by` above).
 
     # Update ranks after sorting
     rank = 1
@@ -374,24 +367,28 @@ def donate_to_issue(request, owner, repo, issue_number):
     if donation_cents > unallocated_sponsor_cents:
         raise BadRequest("You tried to spend more than you've donated on GitHub Sponsors")
 
-    if existing_donation:
-        if donation_cents == 0:
-            # Remove donation from database if amount == 0
-            existing_donation.delete()
-            messages.success(request, f"Removed your donation for {owner}/{repo}#{issue_number}.")
-        else:
-            # Update donation amount.
-            existing_donation.cents_usd = donation_cents
-            existing_donation.save()
+    # Note: Saving/deleting the donation also updates the funding
+    # counters of the issue and the site-wide stats, in the same
+    # transaction (see `IssueSponsorship.save`).
+    with transaction.atomic():
+        if existing_donation:
+            if donation_cents == 0:
+                # Remove donation from database if amount == 0
+                existing_donation.delete()
+                messages.success(request, f"Removed your donation for {owner}/{repo}#{issue_number}.")
+            else:
+                # Update donation amount.
+                existing_donation.cents_usd = donation_cents
+                existing_donation.save()
+                messages.success(request, f"Updated your amount for {owner}/{repo}#{issue_number} to {donation_dollars} USD.")
+        elif donation_cents > 0:
+            # Create new donation in database if amount > 0
+            IssueSponsorship.objects.create(
+                cents_usd=donation_cents,
+                sponsor=request.user,
+                issue=github_issue,
+            )
             messages.success(request, f"Updated your amount for {owner}/{repo}#{issue_number} to {donation_dollars} USD.")
-    elif donation_cents > 0:
-        # Create new donation in database if amount > 0
-        IssueSponsorship.objects.create(
-            cents_usd=donation_cents,
-            sponsor=request.user,
-            issue=github_issue,
-        )
-        messages.success(request, f"Updated your amount for {owner}/{repo}#{issue_number} to {donation_dollars} USD.")
 
     return redirect('owner_issues', owner, repo, issue_number)
 
@@ -465,6 +462,12 @@ def github_webhook(request):
     action = payload.get('action')
     logger.info(f'webhook: event_type: {event_type}, action: {action}')
 
+    # Webhook activity makes an installation count as "active" when
+    # deciding how often to sync it (see `github_sync_interval()`).
+    installation_id = (payload.get('installation') or {}).get('id')
+    if installation_id and not (event_type == 'installation' and action in ['deleted', 'suspend']):
+        github_sync_app_installation_record_webhook(installation_id)
+
     # Handle app installation events.
     #
     # Types of installation events:
@@ -515,6 +518,9 @@ def github_webhook(request):
         installation_url = payload['installation']['html_url']
         assert action
         if action in ['deleted', 'suspend']:
+            # GitHub revokes the installation's access tokens, so make
+            # sure we don't reuse a cached one later.
+            github_app_installation_forget_token(installation_id)
             installation = GitHubAppInstallation.objects.filter(url=installation_url).first()
             if installation:
                 installation.delete()
@@ -523,7 +529,7 @@ def github_webhook(request):
             return HttpResponse(f"Processed event: event_type={event_type}, action={action}", status=200)
         elif action in ['created', 'unsuspend']:
             # start background sync task via Celery
-            task_sync_github_app_installation.delay(installation_id)
+            task_sync_github_app_installation_debounced(installation_id)
             return HttpResponse(f"Processed event: event_type={event_type}, action={action}", status=200)
         else:
             logger.info(f"Ignoring unsupported action: {action}")
@@ -532,7 +538,7 @@ def github_webhook(request):
     if event_type == 'installation_repositories':
         installation_id = payload['installation']['id']
         # start background sync task via Celery
-        task_sync_github_app_installation.delay(installation_id)
+        task_sync_github_app_installation_debounced(installation_id)
 
     # Handle issue events
     if event_type == 'issues':